@@ -2,39 +2,6 @@
 Configurações de todas as APIs
 Cada API define seu próprio payload e processamento
 """
-def processar_composicaoDeCustos(dados, unidade):
-    """
-    Processa resposta da API de Composição de Custos
-    Retorna múltiplos DataFrames consolidados
-    """
-    import pandas as pd
-    
-    dfs = []
-    nome_unidade = unidade['nome']
-    competencia = unidade['competencia']
-    
-    # Mapeia cada tipo de composição
-    tipos_composicao = {
-        'composicaoPorItem': 'POR_ITEM',
-        'composicaoPorVolume': 'POR_VOLUME',
-        'composicaoPorServico': 'POR_SERVICO',
-        'composicaoDosServicos': 'DOS_SERVICOS',
-        'composicaoPorNatureza': 'POR_NATUREZA'
-    }
-    
-    for chave, tipo in tipos_composicao.items():
-        if chave in dados and dados[chave]:
-            df = pd.DataFrame(dados[chave])
-            df['tipo_composicao'] = tipo
-            df['unidade'] = nome_unidade
-            df['competencia'] = competencia
-            dfs.append(df)
-    
-    if dfs:
-        return pd.concat(dfs, ignore_index=True)
-    else:
-        return None
-
 def payload_consumo(unidade):
     """Payload específico para API de Consumo"""
     return {
@@ -219,109 +186,294 @@ def payload_benchmarkComposicaoDeCustos(unidade):
         "custoComRecursosExternos": True
     }
 
+# Limites de taxa (token bucket adaptativo, em requisições por segundo por token)
+# A taxa sobe 'incremento' a cada resposta limpa e é multiplicada por 'fator_reducao' a cada 403/429.
+# Opcional por endpoint ("rate_limit": RATE_LIMIT_PADRAO): quando declarado, o bucket substitui
+# os delay_entre_chamadas/delay_entre_unidades do wrapper. O bucket de cada token é dividido
+# por todos os endpoints que o usam.
+RATE_LIMIT_PADRAO = {
+    "taxa_inicial": 1.0,
+    "taxa_minima": 0.1,
+    "taxa_maxima": 5.0,
+    "incremento": 0.1,
+    "fator_reducao": 0.5
+}
+
+RATE_LIMIT_LENTO = {
+    "taxa_inicial": 0.5,
+    "taxa_minima": 0.05,
+    "taxa_maxima": 2.0,
+    "incremento": 0.05,
+    "fator_reducao": 0.5
+}
+
+# Políticas de retry e circuit breakers
+# - politicas: tentativas e espera (espera_inicial * fator^(tentativa-1)) por status HTTP,
+#   'timeout' ou 'conexao'. O 403 e o timeout usam max_tentativas_403 do wrapper (o 403 também
+#   o backoff_inicial), a não ser que sejam declarados aqui. Status sem política não são
+#   repetidos (ex.: 401, 404, 500).
+# - orcamento_retries: máximo de retries do endpoint na execução inteira
+# - circuito_unidade / circuito_endpoint: após 'falhas' seguidas com um dos 'status', as
+#   requisições da unidade (ou do endpoint) são ignoradas por 'reabrir_apos_s' segundos;
+#   depois passa uma requisição de teste, que fecha ou reabre o circuito. Timeout não abre o
+#   circuito do endpoint: endpoints lentos (QuantidadeLeito, QuantidadeCirurgia) estouram o
+#   timeout em sequência sem estarem fora do ar, e as competências puladas ficariam 'ignorado'
+RETRY_PADRAO = {
+    "politicas": {
+        "conexao": {"tentativas": 3, "espera_inicial": 2.0, "fator": 2.0},
+        "429": {"tentativas": 4, "espera_inicial": 2.0, "fator": 2.0},
+        "502": {"tentativas": 3, "espera_inicial": 2.0, "fator": 2.0},
+        "503": {"tentativas": 3, "espera_inicial": 2.0, "fator": 2.0},
+        "504": {"tentativas": 3, "espera_inicial": 5.0, "fator": 2.0}
+    },
+    "orcamento_retries": 200,
+    "circuito_unidade": {"status": [401, 500], "falhas": 3, "reabrir_apos_s": 600},
+    "circuito_endpoint": {"status": [404, "conexao"], "falhas": 5, "reabrir_apos_s": 120}
+}
+
+# Relatórios que não se aplicam a parte das unidades (UBS/UPA respondem 500):
+# o circuito da unidade abre mais cedo
+RETRY_APLICABILIDADE = {
+    **RETRY_PADRAO,
+    "circuito_unidade": {"status": [401, 500], "falhas": 2, "reabrir_apos_s": 600}
+}
+
+# max_competencias_por_requisicao (opcional, padrão 1): competências consecutivas de uma unidade
+# enviadas numa única requisição (competenciaInicial → competenciaFinal) e separadas depois por
+# competenciaDescr. Só declare depois de conferir na API que o endpoint aceita faixas e devolve
+# competenciaDescr em todas as linhas; se alguma linha não cair num mês pedido, a faixa é
+# refeita mês a mês.
+
+# Respostas muito grandes (um mês de uma unidade pode ter centenas de milhares de linhas):
+# 'items' é lido do socket incrementalmente e gravado em lotes de 'tamanho_lote' registros
+STREAMING_RESPOSTAS_GRANDES = {
+    "tamanho_lote": 20000
+}
+
+# schema (opcional): "chaves" identificam um registro na consolidação incremental (ponto.py),
+# "categorias" são lidas como 'category' (colunas descritivas repetitivas, muito menos memória)
+# e "tipos" ({coluna: dtype}) são aplicados na extração e na leitura dos arquivos.
+
+# achatamento (opcional): para respostas sem uma lista plana em 'items'. "caminhos" mapeia
+# cada lista aninhada (chaves separadas por '.') para o valor gravado em "coluna_tag";
+# "colunas_unidade" são colunas constantes {coluna: campo da competência}. Ver modules/achatamento.py
+
+# filtro_unidades (opcional): unidades do plano de extração que o endpoint atende.
+# "incluir" são palavras-chave (basta o nome da unidade conter uma delas) e "excluir"
+# são nomes de unidades ignoradas, ambos sem diferenciar maiúsculas.
+
 # Dicionário de configuração de todas as APIs
 APIS_CONFIG = {
     "Consumo": {
         "env_var": "url_consumo",
         "payload_func": payload_consumo,
         "processar_func": None, 
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "streaming": STREAMING_RESPOSTAS_GRANDES,
+        "schema": {
+            "chaves": ["contaDeCustoDescr", "centroDeCustoDescr", "competenciaDescr", "itemDeEstoque", "codigoTUSS", "unidade"],
+            "categorias": ["contaDeCustoDescr", "centroDeCustoDescr", "competenciaDescr", "unidade"]
+        }
     },
     "QuantidadeLeito": {
         "env_var": "url_quantidadeLeito",
         "payload_func": payload_quantidadeLeito,
         "processar_func": None, 
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["centroDeCustoDescr", "competenciaDescr", "unidade"],
+            "categorias": ["centroDeCustoDescr", "competenciaDescr", "unidade"]
+        }
     },
     "QuantidadeCirurgia": {
         "env_var": "url_quantidadeCirurgia",
         "payload_func": payload_quantidadeCirurgia,
         "processar_func": None,
-        "timeout": 90
+        "timeout": 90,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["centroDeCustoDescr", "competenciaDescr", "unidade"],
+            "categorias": ["centroDeCustoDescr", "competenciaDescr", "unidade"]
+        }
     },
     "NotasFiscais": {
         "env_var": "url_notasFiscais",
         "payload_func": payload_notasFiscais,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "streaming": STREAMING_RESPOSTAS_GRANDES,
+        "schema": {
+            "chaves": ["contaDeCustoDescr", "centroDeCustoDescr", "competenciaDescr", "numero", "fornecedor", "unidade"],
+            "categorias": ["contaDeCustoDescr", "centroDeCustoDescr", "competenciaDescr", "unidade"]
+        }
     },
     "FolhadePagamento": {
         "env_var": "url_folhaPagamento",
         "payload_func": payload_folhaPagamento,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "streaming": STREAMING_RESPOSTAS_GRANDES,
+        "schema": {
+            "chaves": ["contaDeCustoDescr", "centroDeCustoDescr", "competenciaDescr", "nomeFuncionario", "unidade"],
+            "categorias": ["contaDeCustoDescr", "centroDeCustoDescr", "competenciaDescr", "unidade"]
+        }
     },
     "custosIndividualizadoPorCentro": { 
         "env_var": "url_custosIndividualizadoPorCentro",
         "payload_func": payload_custosIndividualizadoPorCentro,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["centroDeCustoDescr", "competenciaDescr", "contaDescr", "grupoContaDescr", "tipoDescr", "classificacaoDescr", "unidade"],
+            "categorias": ["centroDeCustoDescr", "competenciaDescr", "contaDescr", "grupoContaDescr", "tipoDescr", "classificacaoDescr", "unidade"]
+        }
     },
     "producoes": { 
         "env_var": "url_producoes",
         "payload_func": payload_producoes,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["centroDeCustoDescr", "competenciaDescr", "unidadeDeProducaoDescr", "unidade"],
+            "categorias": ["centroDeCustoDescr", "competenciaDescr", "unidadeDeProducaoDescr", "unidade"]
+        }
     },
      "estatistica": { 
         "env_var": "url_estatistica",
         "payload_func": payload_estatistica,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["grupoDoCentroDescr", "centroDeCustoDescr", "competenciaDescr", "criterioDeRateioDescr", "unidade"],
+            "categorias": ["grupoDoCentroDescr", "centroDeCustoDescr", "competenciaDescr", "criterioDeRateioDescr", "unidade"]
+        }
     },
     "rankingDeCusto": { 
         "env_var": "url_rankingDeCusto",
         "payload_func": payload_rankingDeCusto,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["grupoDoCentroDescr", "centroDeCustoDescr", "competenciaDescr", "unidade"],
+            "categorias": ["grupoDoCentroDescr", "centroDeCustoDescr", "competenciaDescr", "unidade"]
+        }
     },
     "evolucaoDeCustos": { 
         "env_var": "url_evolucaoDeCustos",
         "payload_func": payload_evolucaoDeCustos,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["grupoDaContaDescr", "contaDeCustoDescr", "competenciaDescr", "tipoContaDeCustoDescr", "classificacaoDoCustoDescr", "unidade"],
+            "categorias": ["grupoDaContaDescr", "contaDeCustoDescr", "competenciaDescr", "tipoContaDeCustoDescr", "classificacaoDoCustoDescr", "unidade"]
+        }
     },
     "demonstracaoCustoUnitario": { 
         "env_var": "url_demonstracaoCustoUnitario",
         "payload_func": payload_demonstracaoCustoUnitario,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["centroDeCustoDescr", "competenciaDescr", "unidade"],
+            "categorias": ["centroDeCustoDescr", "competenciaDescr", "unidade"]
+        }
     },
     "demonstracaoCustoUnitarioPorSaida": { 
         "env_var": "url_demonstracaoCustoUnitarioPorSaida",
         "payload_func": payload_demonstracaoCustoUnitarioPorSaida,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["especialidadeDescr", "competenciaDescr", "unidade"],
+            "categorias": ["especialidadeDescr", "competenciaDescr", "unidade"]
+        }
     },
     "painelComparativoDeCustos": { 
         "env_var": "url_painelComparativoDeCustos",
         "payload_func": payload_painelComparativoDeCustos,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["unidadeDeProducaoId", "unidadeDeProducaoDescr", "competencia"],
+            "categorias": ["unidadeDeProducaoDescr", "competencia"],
+            "tipos": {"unidadeDeProducaoId": "Int64"}
+        }
     },
     "custoPorEspecialidade": { 
         "env_var": "url_custoPorEspecialidade",
         "payload_func": payload_custoPorEspecialidade,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["especialidadeDescr", "centroCustoDestinoDescr", "centroCustoOrigenDescr", "unidadeProducaoDescr", "competenciaDescr", "unidade"],
+            "categorias": ["especialidadeDescr", "centroCustoDestinoDescr", "centroCustoOrigenDescr", "unidadeProducaoDescr", "competenciaDescr", "unidade"]
+        }
     },
     "analisedepartamental": { 
         "env_var": "url_analisedepartamental",
         "payload_func": payload_analisedepartamental,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["grupoContaDeCustoDescr", "centroDeCustoDescr", "competenciaDescr", "unidade"],
+            "categorias": ["grupoContaDeCustoDescr", "centroDeCustoDescr", "competenciaDescr", "unidade"]
+        }
     },
     "composicaoDeCustos": { 
         "env_var": "url_composicaoDeCustos",
         "payload_func": payload_composicaoDeCustos,
-        "processar_func": processar_composicaoDeCustos,
-        "timeout": 60
+        "processar_func": None,
+        "achatamento": {
+            "caminhos": {
+                "composicaoPorItem": "POR_ITEM",
+                "composicaoPorVolume": "POR_VOLUME",
+                "composicaoPorServico": "POR_SERVICO",
+                "composicaoDosServicos": "DOS_SERVICOS",
+                "composicaoPorNatureza": "POR_NATUREZA"
+            },
+            "coluna_tag": "tipo_composicao",
+            "colunas_unidade": {"unidade": "nome", "competencia": "competencia"}
+        },
+        "timeout": 60,
+        "retry": RETRY_APLICABILIDADE,
+        "schema": {
+            "chaves": ["grupoDaContaDescr", "contaDeCustoDescr", "tipoContaDeCustoDescr", "competenciaDescr", "tipo_composicao", "unidade"],
+            "categorias": ["grupoDaContaDescr", "contaDeCustoDescr", "tipoContaDeCustoDescr", "competenciaDescr", "tipo_composicao", "unidade"]
+        },
+        # Relatório só disponível para unidades com linha de contratação (Hospital/AME/LUCY/CER)
+        "filtro_unidades": {
+            "incluir": ["HOSPITAL", "AME", "LUCY", "CER"],
+            "excluir": [
+                "Filial 40 - HOSPITAL DIA CAMPO LIMPO - CEJAM",
+                "Filial 40 - HOSPITAL DIA M´BOI MIRIM I - CEJAM",
+                "Filial 40 - HOSPITAL DIA M´BOI MIRIM II - CEJAM"
+            ]
+        }
     },
     "composicaoEvolucaoDeReceita": { 
         "env_var": "url_composicaoEvolucaoDeReceita",
         "payload_func": payload_composicaoEvolucaoDeReceita,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["tipo", "grupoDaContaDescr", "contaDescr", "competenciaDescr", "unidade"],
+            "categorias": ["tipo", "grupoDaContaDescr", "contaDescr", "competenciaDescr", "unidade"]
+        }
     },
     "exercicioOrcamento": { 
         "env_var": "url_exercicioOrcamento",
@@ -334,18 +486,33 @@ APIS_CONFIG = {
         "env_var": "url_custoUnitarioPorPonderacao",
         "payload_func": payload_custoUnitarioPorPonderacao,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["competenciaDescr", "centroDeCustoDescr", "criterioDeRateioDescr", "ponderacaoDeRateioDescr", "unidade"],
+            "categorias": ["competenciaDescr", "centroDeCustoDescr", "criterioDeRateioDescr", "ponderacaoDeRateioDescr", "unidade"]
+        }
     },
     "demonstracaoCustoUnitarioDosServicosAuxiliares": { 
         "env_var": "url_demonstracaoCustoUnitarioDosServicosAuxiliares",
         "payload_func": payload_demonstracaoCustoUnitarioDosServicosAuxiliares,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["competenciaDescr", "grupo", "descricao", "unidade"],
+            "categorias": ["competenciaDescr", "grupo", "unidade"]
+        }
     },
     "benchmarkComposicaoDeCustos": { 
         "env_var": "url_benchmarkComposicaoDeCustos",
         "payload_func": payload_benchmarkComposicaoDeCustos,
         "processar_func": None,
-        "timeout": 60
+        "timeout": 60,
+        "retry": RETRY_PADRAO,
+        "schema": {
+            "chaves": ["tipoCentroCusto", "unidade", "competencia"],
+            "categorias": ["tipoCentroCusto", "unidade", "competencia"]
+        }
     }
 }
\ No newline at end of file
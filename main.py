@@ -1,89 +1,229 @@
-from modules.api_competecia import api_competencia
+import sys
+
+# --profile-startup: o cronômetro precisa estar ativo antes das demais importações
+if '--profile-startup' in sys.argv:
+    from modules.perfil_inicializacao import iniciar_perfil
+    iniciar_perfil()
+
 from modules.diretorio import to_save
-from modules.conectar_vpn import conectar_vpn
-from modules.api_consumo import api_consumo
-from modules.api_quantidadeLeito import api_quantidadeLeito
-from modules.api_quantidadeCirurgia import api_quantidadeCirurgia
-from modules.api_notasFiscais import api_notasFiscais
-from modules.api_folhadepagamento import api_folhadepagamento
-from modules.api_custosIndividualizadoPorCentro import api_custosIndividualizadoPorCentro
-from modules.api_producoes import api_producoes
-from modules.api_estatistica import api_estatistica
-from modules.api_rankingDeCusto import api_rankingDeCusto
-from modules.api_evolucaoDeCustos import api_evolucaoDeCustos
-from modules.api_demonstracaoCustoUnitario import api_demonstracaoCustoUnitario
-from modules.api_demonstracaoCustoUnitarioPorSaida import api_demonstracaoCustoUnitarioPorSaida
-from modules.api_painelComparativoDeCustos import api_painelComparativoDeCustos
-from modules.api_custoPorEspecialidade import api_custoPorEspecialidade
-from modules.api_analisedepartamental import api_analisedepartamental
-from modules.api_composicaoDeCustos import api_composicaoDeCustos
-from modules.api_composicaoEvolucaoDeReceita import api_composicaoEvolucaoDeReceita
-from modules.api_exercicioOrcamento import api_exercicioOrcamento
-from modules.api_custoUnitarioPorPonderacao import api_custoUnitarioPorPonderacao
-from modules.api_demonstracaoCustoUnitarioDosServicosAuxiliares import api_demonstracaoCustoUnitarioDosServicosAuxiliares
-from modules.api_benchmarkComposicaoDeCustos import api_benchmarkComposicaoDeCustos
-from modules.execution_tracker import ExecutionTracker
-from modules.google_drive_upload import salvar_arquivos_no_drive
-from modules.ponto import consolidar_apos_extracao, processar_incremental
+from modules.registro_endpoints import obter_endpoints, modulos_endpoints
 from dotenv import load_dotenv
-import sys
+from functools import partial
+import argparse
 import os
 
+# Os demais módulos são importados no ponto de uso: o pyautogui só na conexão
+# da VPN, o extrator e os wrappers só se houver extração (não no modo cópia),
+# as bibliotecas do Google só se houver upload
+MODULOS_ADIADOS = [
+    'modules.execution_tracker',
+    'modules.http_session',
+    'modules.rate_limiter',
+    'modules.response_cache',
+    'modules.formato_saida',
+    'modules.de_para',
+    'modules.conectar_vpn',
+    'modules.api_competecia',
+    'modules.ponto',
+    'modules.pipeline',
+    'modules.agendador',
+    *modulos_endpoints(),
+    'modules.google_drive_upload'
+]
+
+
+# Arquivos enviados ao Google Drive (alimentam os dashboards)
+PADROES_UPLOAD = [
+    'api_benchmarkcomposicaodecustos', 
+    'api_evolucaodecustos', 
+    'api_rankingdecusto', 
+    'api_demonstracaocustounitariodosservicosauxiliares'
+]
+
+
+def deve_enviar_para_drive(nome_arquivo):
+    """
+    Indica se um arquivo (ou o nome base 'api_<endpoint>') deve ser enviado ao Google Drive
+    
+    Args:
+        nome_arquivo: Nome do arquivo
+    
+    Returns:
+        bool: True se corresponde a algum padrão de PADROES_UPLOAD
+    """
+    return any(padrao in nome_arquivo.lower() for padrao in PADROES_UPLOAD)
+
 
-def filtrar_arquivos_para_upload(arquivos_gerados):
+def gerar_relatorio_execucao(tracker, caminho):
     """
-    Filtra apenas os arquivos que devem ser enviados ao Google Drive
+    PASSO 5: Gera os relatórios resumo (CSV e TXT) da execução
     
     Args:
-        arquivos_gerados: Lista com todos os arquivos gerados
+        tracker: ExecutionTracker com as execuções de todos os endpoints
+        caminho: Diretório do mês vigente
     
     Returns:
-        Lista com arquivos filtrados
+        tuple: (caminho_csv, caminho_txt) ou (None, None)
     """
-    padroes_incluir = [
-        'api_benchmarkcomposicaodecustos', 
-        'api_evolucaodecustos', 
-        'api_rankingdecusto', 
-        'api_demonstracaocustounitariodosservicosauxiliares'
-    ]
-    
-    arquivos_filtrados = []
-    arquivos_excluidos = []
-    
-    for arquivo in arquivos_gerados:
-        # Verifica se o arquivo corresponde a algum padrão
-        deve_incluir = any(padrao in arquivo.lower() for padrao in padroes_incluir)
+    print("\n" + "="*60)
+    print("📝 GERANDO RELATÓRIO RESUMO")
+    print("="*60 + "\n")
+
+    caminho_csv = None 
+    caminho_txt = None
+    
+    try:
+        caminho_csv, caminho_txt = tracker.gerar_relatorio(caminho)
         
-        if deve_incluir:
-            arquivos_filtrados.append(arquivo)
+        if caminho_csv and caminho_txt:
+            print(f"✅ Relatório CSV gerado: {caminho_csv}")
+            print(f"✅ Relatório TXT gerado: {caminho_txt}\n")
         else:
-            arquivos_excluidos.append(arquivo)
+            print("⚠️ Não foi possível gerar relatórios\n")
+    except Exception as e:
+        print(f"❌ Erro ao gerar relatório: {e}\n")
     
-    # Exibe resumo do filtro
-    if arquivos_excluidos:
-        print(f"\n📋 Filtro de Upload:")
-        print(f"   ✅ Arquivos a enviar: {len(arquivos_filtrados)}")
-        print(f"   ⏭️  Arquivos excluídos: {len(arquivos_excluidos)}")
-        print(f"\n   Excluídos:")
-        for arq in arquivos_excluidos:
-            print(f"      • {arq}")
-        print()
+    return caminho_csv, caminho_txt
+
+
+def enviar_arquivo_para_drive(uploader, resultado_endpoint):
+    """
+    PASSO 6: Envia ao Google Drive o arquivo (já consolidado) de um endpoint
     
-    return arquivos_filtrados
+    Args:
+        uploader: UploadDrive da execução
+        resultado_endpoint: Resultado da extração do endpoint ({'arquivo': caminho ou None})
+    
+    Returns:
+        bool: True se o arquivo foi enviado
+    """
+    arquivo = (resultado_endpoint or {}).get("arquivo")
+    if not arquivo:
+        return False
+    
+    from modules.formato_saida import exportar_csv
+    
+    # O upload (e as planilhas Google) usa CSV: gera a partir do Parquet só aqui
+    caminho_csv = exportar_csv(arquivo)
+    return uploader.enviar(os.path.basename(caminho_csv))
+
+
+def configurar_cache_respostas():
+    """Ativa o cache de respostas conforme o .env (diretório e tamanho máximo)"""
+    from modules.response_cache import configurar_cache
+    
+    configurar_cache(
+        os.getenv('diretorio_cache_respostas') or os.path.join(os.getenv('caminho_fixo', '.'), '_cache_respostas'),
+        float(os.getenv('tamanho_cache_respostas_mb', '500'))
+    )
 
 
-def main():
+def planejar_execucao(argumentos):
+    """
+    --plan: lista as requisições que a execução faria e estima a duração, sem VPN e sem rede
+    
+    Usa o arquivo de competências já baixado no mês (o PASSO 1 precisa da API) e
+    aplica a mesma seleção da execução: análise incremental (ou a reextração
+    seletiva), --apis, filtro de unidades, checkpoint, faixas e cache.
+    
+    Args:
+        argumentos: Opções de linha de comando (analisar_argumentos)
+    """
+    print("\n" + "="*60)
+    print("🗺️ PLANEJAMENTO DA EXECUÇÃO (--plan: sem VPN e sem requisições)")
+    print("="*60 + "\n")
+    
+    load_dotenv()
+    configurar_cache_respostas()
+    
+    caminho = to_save()
+    arquivo_competencia = os.path.join(caminho, "competencias_todas_unidades.xlsx")
+    if not os.path.exists(arquivo_competencia):
+        print(f"❌ Arquivo de competências do mês não encontrado: {arquivo_competencia}")
+        print("   O --plan usa o arquivo baixado pelo PASSO 1 de uma execução deste mês")
+        return
+    
+    from modules.ponto import AnalisadorIncremental, planejar_reextracao
+    from modules.plano_extracao import PlanoExtracao
+    from modules.planejador import planejar_endpoint, carregar_historico, estimar_tempos, imprimir_plano, salvar_requisicoes
+    
+    if argumentos.unidades or argumentos.competencias:
+        plano, _ = planejar_reextracao(arquivo_competencia, argumentos.unidades, argumentos.competencias)
+    else:
+        # Mesmo filtro da execução, sem gravar o Excel filtrado
+        analisador = AnalisadorIncremental(caminho)
+        plano = None
+        if analisador.filtrar_competencias_nao_processadas(arquivo_competencia, salvar=False):
+            plano = PlanoExtracao(
+                analisador.df_filtrado,
+                arquivo=arquivo_competencia,
+                competencias_sem_cache=analisador.competencias_reabertas
+            )
+    
+    if plano is None:
+        print("\n✅ Nenhuma competência a extrair: a execução seria só a cópia do mês anterior\n")
+        return
+    
+    print(f"\n🗺️ Plano de extração: {len(plano)} competência(s) fechada(s)")
+    
+    planos = [planejar_endpoint(nome_api, plano, caminho) for nome_api, _ in obter_endpoints(argumentos.apis)]
+    tempos = estimar_tempos(carregar_historico(os.getenv('caminho_fixo') or caminho))
+    
+    imprimir_plano(planos, tempos)
+    
+    caminho_csv = salvar_requisicoes(planos, caminho)
+    print(f"💾 Lista de requisições: {caminho_csv}\n")
+
+
+def main(argumentos=None):
+    """
+    Args:
+        argumentos: Opções de linha de comando (analisar_argumentos); None = execução completa
+    """
+    if argumentos is None:
+        argumentos = analisar_argumentos([])
+    
+    # Reextração seletiva: unidades/competências pedidas, sem análise do histórico
+    reextracao_seletiva = bool(argumentos.unidades or argumentos.competencias)
+    
     print("\n" + "="*60)
     print("🚀 INICIANDO AUTOMAÇÃO DE EXTRAÇÃO DE DADOS")
     print("="*60 + "\n")
     
+    from modules.execution_tracker import ExecutionTracker
+    from modules.http_session import configurar_pool, imprimir_estatisticas_conexoes
+    from modules.rate_limiter import configurar_limite_global
+    from modules.formato_saida import configurar_formato_saida
+    from modules.de_para import configurar_snapshot_de_para
+    
     tracker = ExecutionTracker()
     
     # Setup inicial
     load_dotenv()
     print("✅ Variáveis de ambiente carregadas\n")
+    
+    # Pool de conexões keep-alive compartilhado por todas as APIs
+    # (deve ser >= número de unidades processadas em paralelo)
+    max_workers = int(os.getenv('max_workers_extracao', '1'))
+    configurar_pool(int(os.getenv('tamanho_pool_http', max(10, max_workers))))
+    
+    # Limite global de requisições/s somado aos limites por token do APIS_CONFIG (0 = desativado)
+    configurar_limite_global(float(os.getenv('taxa_global_req_s', '0')))
+    
+    # Cache em disco das respostas de competências FECHADAS (0 MB = desativado)
+    configurar_cache_respostas()
+
+    # Formato dos arquivos das APIs: 'csv' (padrão) ou 'parquet' (requer pyarrow).
+    # Com Parquet, o CSV só é gerado para os arquivos enviados ao Google Drive
+    configurar_formato_saida(os.getenv('formato_saida', 'csv'))
+
+    # Snapshot do DE-PARA de unidades (evita reler o Unidades.xlsx a cada execução)
+    configurar_snapshot_de_para(
+        os.getenv('diretorio_cache_de_para') or os.path.join(os.getenv('caminho_fixo', '.'), '_cache_de_para')
+    )
     print("🔐 Verificando conexão VPN...")
     try:
+        from modules.conectar_vpn import conectar_vpn
         conectar_vpn()
         print("✅ VPN conectada\n")
     except Exception as e:
@@ -104,6 +244,7 @@ def main():
     print("📅 PASSO 1: Extraindo competências")
     print("="*60)
     
+    from modules.api_competecia import api_competencia
     diretorio_arquivo_competencia = api_competencia(caminho)
 
     if not diretorio_arquivo_competencia:
@@ -141,13 +282,37 @@ def main():
         'api_producoes.csv'
     ]   
 
-    # Analisa competências e decide: processar ou copiar
-    arquivo_filtrado, resultados, modo = processar_incremental(
-        caminho_atual=caminho,
-        arquivo_competencia_atual=diretorio_arquivo_competencia,
-        nomes_arquivos_apis=arquivos_apis_para_consolidar,
-        processar_somente_fechadas=True
-    )
+    # --apis: só os endpoints pedidos (e os arquivos deles)
+    apis_para_executar = obter_endpoints(argumentos.apis)
+    if argumentos.apis:
+        arquivos_selecionados = {f"api_{nome_api}.csv".lower() for nome_api, _ in apis_para_executar}
+        arquivos_apis_para_consolidar = [
+            nome_arquivo for nome_arquivo in arquivos_apis_para_consolidar
+            if nome_arquivo.lower() in arquivos_selecionados
+        ]
+        print(f"🎯 Endpoints selecionados: {', '.join(nome_api for nome_api, _ in apis_para_executar)}")
+
+    from modules.ponto import AnalisadorIncremental, processar_incremental, planejar_reextracao
+    
+    competencias_reprocessadas = None
+    if reextracao_seletiva:
+        plano, competencias_reprocessadas = planejar_reextracao(
+            diretorio_arquivo_competencia,
+            unidades=argumentos.unidades,
+            competencias=argumentos.competencias
+        )
+        if plano is None:
+            print("\n✅ Nada a reextrair para a seleção informada\n")
+            sys.exit(0)
+        modo = 'processar'
+    else:
+        # Analisa competências e decide: processar ou copiar
+        plano, resultados, modo = processar_incremental(
+            caminho_atual=caminho,
+            arquivo_competencia_atual=diretorio_arquivo_competencia,
+            nomes_arquivos_apis=arquivos_apis_para_consolidar,
+            processar_somente_fechadas=True
+        )
 
     # ====================================================================
     # DECISÃO: COPIAR OU PROCESSAR
@@ -161,12 +326,20 @@ def main():
         sys.exit(0)
 
     # Se chegou aqui, há competências novas para processar
-    if arquivo_filtrado is None:
+    if plano is None:
         print("\n❌ Erro ao filtrar competências")
         sys.exit(1)
 
-    # Atualiza para usar o arquivo filtrado
-    diretorio_arquivo_competencia = arquivo_filtrado
+    # Atualiza para usar o arquivo filtrado; os endpoints recebem o plano já em
+    # memória (competências filtradas e ordenadas), sem reler o Excel
+    diretorio_arquivo_competencia = plano.arquivo
+    print(f"\n🗺️ Plano de extração: {len(plano)} competência(s) fechada(s) para todos os endpoints")
+    
+    # Competências reabertas (ou reextraídas de propósito) não podem vir do cache
+    from modules.response_cache import invalidar_competencias
+    invalidadas = invalidar_competencias(plano.competencias_sem_cache)
+    if invalidadas:
+        print(f"💾 Cache: {invalidadas} resposta(s) de competências reabertas/reextraídas invalidada(s)")
 
     # ====================================================================
     # PASSO 3: EXTRAIR DADOS DAS APIs
@@ -175,34 +348,40 @@ def main():
     print("📡 PASSO 3: Extraindo dados das APIs (apenas competências novas)")
     print("="*60)
     
-    # Executar todas as APIs
-    apis_para_executar = [
-        ("Consumo", api_consumo),
-        ("QuantidadeLeito", api_quantidadeLeito),
-        ("QuantidadeCirurgia", api_quantidadeCirurgia),
-        ("NotasFiscais", api_notasFiscais),
-        ("FolhadePagamento", api_folhadepagamento),
-        ("custosIndividualizadoPorCentro", api_custosIndividualizadoPorCentro),
-        ("producoes", api_producoes), 
-        ("estatistica", api_estatistica),
-        ("rankingDeCusto", api_rankingDeCusto),
-        ("evolucaoDeCustos", api_evolucaoDeCustos),
-        ("demonstracaoCustoUnitario", api_demonstracaoCustoUnitario),
-        ("demonstracaoCustoUnitarioPorSaida", api_demonstracaoCustoUnitarioPorSaida),
-        ("painelComparativoDeCustos", api_painelComparativoDeCustos),
-        ("custoPorEspecialidade", api_custoPorEspecialidade),
-        ("analisedepartamental", api_analisedepartamental),
-        ("composicaoDeCustos", api_composicaoDeCustos),
-        ("composicaoEvolucaoDeReceita", api_composicaoEvolucaoDeReceita),
-        ("custoUnitarioPorPonderacao", api_custoUnitarioPorPonderacao),
-        ("demonstracaoCustoUnitarioDosServicosAuxiliares", api_demonstracaoCustoUnitarioDosServicosAuxiliares),
-        ("benchmarkComposicaoDeCustos", api_benchmarkComposicaoDeCustos)
-    ]
+    from modules.pipeline import PipelineDAG
+    from modules.agendador import AgendadorGlobal
+    
+    
+    # Unidades processadas em paralelo por endpoint (1 = serial)
+    # backend_extracao: 'serial', 'threads' ou 'async' (vazio = conforme max_workers)
+    backend = os.getenv('backend_extracao') or None
+    
+    # Agendador global (opcional, agendador_global=1): uma única fila endpoint × unidade ×
+    # competência, intercalando os endpoints, com no máximo max_lanes_por_unidade lanes
+    # por token. Sem ele, um endpoint de cada vez. Com o agendador, backend_extracao=async
+    # roda todos os endpoints num único event loop; os demais valores usam threads
+    agendador = None
+    if os.getenv('agendador_global', '0') == '1':
+        max_lanes_por_unidade = int(os.getenv('max_lanes_por_unidade', '1'))
+        agendador = AgendadorGlobal(
+            max_workers=max_workers,
+            max_lanes_por_unidade=max_lanes_por_unidade,
+            backend='async' if backend == 'async' else 'threads'
+        )
+        print(f"🗓️ Agendador global ({agendador.backend}): até {max_workers} em paralelo, "
+              f"{max_lanes_por_unidade} lane(s) por unidade\n")
+    elif backend:
+        print(f"⚙️ Backend de extração: {backend} ({max_workers} em paralelo)\n")
+    elif max_workers > 1:
+        print(f"🧵 Extração concorrente: {max_workers} unidades em paralelo\n")
     
     resultados = {}
-    arquivos_gerados = []
     
-    for nome_api, funcao_api in apis_para_executar:
+    def registrar_resultado(nome_api, resultado):
+        resultados[nome_api] = resultado
+        return resultado
+    
+    def extrair(nome_api, funcao_api):
         try:
             if nome_api in ["QuantidadeLeito", "QuantidadeCirurgia"]:
                 arquivo = funcao_api(
@@ -213,98 +392,141 @@ def main():
                     max_tentativas_403=4,
                     backoff_inicial=3.0,
                     agrupar_por_unidade=True,
-                    delay_entre_unidades=5.0
+                    delay_entre_unidades=5.0,
+                    max_workers=max_workers,
+                    backend=backend,
+                    agendador=agendador,
+                    plano=plano
                 )
             else:
-                arquivo = funcao_api(diretorio_arquivo_competencia, caminho, tracker)
+                arquivo = funcao_api(
+                    diretorio_arquivo_competencia,
+                    caminho,
+                    tracker,
+                    max_workers=max_workers,
+                    backend=backend,
+                    agendador=agendador,
+                    plano=plano
+                )
             
-            resultados[nome_api] = {
+            return registrar_resultado(nome_api, {
                 "sucesso": arquivo is not None,
                 "arquivo": arquivo
-            }
-
-            if arquivo:
-                arquivos_gerados.append(os.path.basename(arquivo))
+            })
 
         except Exception as e:
             print(f"❌ Erro ao executar {nome_api}: {e}")
-            resultados[nome_api] = {
+            return registrar_resultado(nome_api, {
                 "sucesso": False,
                 "erro": str(e)
-            }
-
-    # ====================================================================
-    # PASSO 4: CONSOLIDAR DADOS (NOVOS + MÊS ANTERIOR)
-    # ====================================================================
-    consolidar_apos_extracao(
-        caminho_atual=caminho,
-        nomes_arquivos_apis=arquivos_apis_para_consolidar
-    )
-
+            })
+    
     # ====================================================================
-    # PASSO 5: GERAR RELATÓRIO
+    # GRAFO DE ETAPAS: EXTRAÇÃO → CONSOLIDAÇÃO → RELATÓRIO → UPLOAD
     # ====================================================================
-    print("\n" + "="*60)
-    print("📝 GERANDO RELATÓRIO RESUMO")
-    print("="*60 + "\n")
-
-    caminho_csv = None 
-    caminho_txt = None
+    # Cada etapa começa assim que as suas dependências terminam: a consolidação
+    # de um endpoint roda enquanto os demais ainda extraem
+    pipeline = PipelineDAG(max_paralelas=int(os.getenv('max_etapas_paralelas', '4')))
+    # Um endpoint (ou o agendador) extraindo por vez, como antes; a concorrência
+    # das requisições continua dentro da extração (max_workers)
+    pipeline.limitar_grupo('extracao', 1)
+    # Consolidações simultâneas somam o pico de memória dos DataFrames
+    pipeline.limitar_grupo('consolidacao', int(os.getenv('max_consolidacoes_paralelas', '1')))
+    # O serviço do Drive é um só: um upload por vez
+    pipeline.limitar_grupo('upload', 1)
     
-    try:
-        caminho_csv, caminho_txt = tracker.gerar_relatorio(caminho)
+    etapas_extracao = [f"extrair:{nome_api}" for nome_api, _ in apis_para_executar]
+    
+    if agendador:
+        # Os wrappers só preparam as extrações; as requisições de todos os endpoints
+        # rodam numa fila única e o agendador conclui a etapa de cada endpoint
+        # assim que o arquivo dele fica pronto
+        for nome_api, funcao_api in apis_para_executar:
+            extrair(nome_api, funcao_api)
+        preparados = {extracao.nome_api for extracao in agendador.extracoes}
         
-        if caminho_csv and caminho_txt:
-            print(f"✅ Relatório CSV gerado: {caminho_csv}")
-            print(f"✅ Relatório TXT gerado: {caminho_txt}\n")
-            arquivos_gerados.append(os.path.basename(caminho_csv))
-            arquivos_gerados.append(os.path.basename(caminho_txt))
-        else:
-            print("⚠️ Não foi possível gerar relatórios\n")
-    except Exception as e:
-        print(f"❌ Erro ao gerar relatório: {e}\n")
-
-    # ====================================================================
-    # PASSO 6: UPLOAD PARA GOOGLE DRIVE - COM FILTRO
-    # ====================================================================
-    print("="*60)
-    print("📤 PASSO 6: Upload para Google Drive")
-    print("="*60)
+        def endpoint_finalizado(nome_api, resultado):
+            pipeline.concluir(f"extrair:{nome_api}", registrar_resultado(nome_api, resultado))
+        
+        pipeline.adicionar('agendador', partial(agendador.executar, ao_finalizar=endpoint_finalizado), grupo='extracao')
+        for nome_api, _ in apis_para_executar:
+            if nome_api in preparados:
+                pipeline.adicionar(f"extrair:{nome_api}", concluida_por='agendador')
+            else:
+                # Falhou já na preparação: nada a esperar
+                pipeline.adicionar(f"extrair:{nome_api}", partial(resultados.get, nome_api))
+    else:
+        for nome_api, funcao_api in apis_para_executar:
+            pipeline.adicionar(f"extrair:{nome_api}", partial(extrair, nome_api, funcao_api), grupo='extracao')
     
-    if arquivos_gerados:
-        try:
-            # APLICA O FILTRO - Apenas arquivos específicos
-            arquivos_para_enviar = filtrar_arquivos_para_upload(arquivos_gerados)
-            
-            if not arquivos_para_enviar:
-                print("⚠️ Nenhum arquivo corresponde aos critérios de upload\n")
+    # PASSO 4: consolidação (novos + mês anterior) de cada arquivo, após a extração do seu endpoint
+    analisador = AnalisadorIncremental(caminho)
+    endpoints_por_arquivo = {f"api_{nome_api}.csv".lower(): nome_api for nome_api, _ in apis_para_executar}
+    etapas_consolidacao = []
+    for nome_arquivo in arquivos_apis_para_consolidar:
+        nome_api = endpoints_por_arquivo.get(nome_arquivo.lower())
+        consolidar = partial(analisador.consolidar_dados_api_inteligente, nome_arquivo)
+        if reextracao_seletiva:
+            # O arquivo completo do mês atual sai do caminho da extração parcial e
+            # depois recebe só as competências reextraídas
+            arquivo_separado = analisador.separar_arquivo_atual(nome_arquivo)
+            if arquivo_separado:
+                consolidar = partial(analisador.reconsolidar_reextracao, nome_arquivo,
+                                     arquivo_separado, competencias_reprocessadas)
             else:
-                diretorio_com_competencia = os.path.join(caminho)
-                
-                print(f"📁 Diretório dos arquivos: {diretorio_com_competencia}")
-                print(f"📊 Total de arquivos para enviar: {len(arquivos_para_enviar)}\n")
-                
-                folder_id = os.getenv('GOOGLE_DRIVE_FOLDER_ID')
-                
-                # Faz o upload dos arquivos FILTRADOS
-                resultados_upload = salvar_arquivos_no_drive(
-                    bases=arquivos_para_enviar,
-                    diretorio=diretorio_com_competencia,
-                    folder_id=folder_id,
-                    criar_google_sheets=True
-                )
-                
-                if resultados_upload:
-                    print(f"\n✅ Upload para Google Drive concluído!")
-                else:
-                    print(f"\n⚠️ Houve problemas no upload para o Google Drive")
-                    
-        except Exception as e:
-            print(f"\n❌ Erro ao fazer upload para Google Drive: {e}")
-            import traceback
-            traceback.print_exc()
+                consolidar = partial(analisador.consolidar_dados_api_inteligente, nome_arquivo,
+                                     competencias_reprocessadas)
+        etapas_consolidacao.append(pipeline.adicionar(
+            f"consolidar:{nome_api or nome_arquivo}",
+            consolidar,
+            dependencias=[f"extrair:{nome_api}"] if nome_api else [],
+            grupo='consolidacao'
+        ))
+    
+    # PASSO 5: relatório (o tracker está completo quando todas as extrações terminam)
+    pipeline.adicionar('relatorio', partial(gerar_relatorio_execucao, tracker, caminho),
+                       dependencias=etapas_extracao)
+    
+    # PASSO 6: cada arquivo dos dashboards vai para o Drive assim que a consolidação
+    # dele termina, enquanto os demais endpoints ainda extraem
+    endpoints_upload = [nome_api for nome_api, _ in apis_para_executar if deve_enviar_para_drive(f"api_{nome_api}")]
+    if argumentos.skip_upload:
+        endpoints_upload = []
+        print("\n⏭️ Upload para o Google Drive desativado (--skip-upload)")
+    uploader = None
+    if endpoints_upload:
+        from modules.google_drive_upload import UploadDrive
+        uploader = UploadDrive(caminho)
+    for nome_api in endpoints_upload:
+        etapa_anterior = f"consolidar:{nome_api}"
+        if etapa_anterior not in etapas_consolidacao:
+            etapa_anterior = f"extrair:{nome_api}"
+        pipeline.adicionar(
+            f"upload:{nome_api}",
+            lambda nome_api=nome_api: enviar_arquivo_para_drive(uploader, resultados.get(nome_api)),
+            dependencias=[etapa_anterior],
+            grupo='upload'
+        )
+    
+    print(f"\n📋 Filtro de Upload: {len(endpoints_upload)} endpoint(s) enviados ao Google Drive assim que consolidados")
+    for nome_api in endpoints_upload:
+        print(f"   • {nome_api}")
+    
+    print()
+    pipeline.imprimir_grafo()
+    print()
+    
+    pipeline.executar()
+    
+    caminho_csv, caminho_txt = pipeline.resultado('relatorio') or (None, None)
+    
+    print("\n" + "="*60)
+    print("📤 PASSO 6: Upload para Google Drive")
+    print("="*60)
+    if uploader:
+        uploader.imprimir_resumo()
     else:
-        print("⚠️ Nenhum arquivo foi gerado para fazer upload\n")
+        print("⚠️ Nenhum arquivo foi enviado ao Google Drive\n")
 
     # ====================================================================
     # RELATÓRIO FINAL NO CONSOLE
@@ -321,7 +543,18 @@ def main():
     print(f"   • Erros: {resumo['erros']}")
     print(f"   • Timeouts: {resumo['timeouts']}")
     print(f"   • Sem dados: {resumo['sem_dados']}")
-    print(f"   • Total de registros extraídos: {resumo['total_registros']:,}\n")
+    if resumo['ignorados']:
+        print(f"   • Ignorados (circuito aberto): {resumo['ignorados']}")
+    print(f"   • Total de registros extraídos: {resumo['total_registros']:,}")
+    print(f"   • Cache de respostas: {resumo['cache_hits']} hit(s) | {resumo['cache_misses']} miss(es)")
+    print(f"   • Tráfego de respostas: {resumo['bytes_comprimidos'] / 1024 / 1024:.1f} MB pela rede | "
+          f"{resumo['bytes_descomprimidos'] / 1024 / 1024:.1f} MB descomprimidos\n")
+    
+    imprimir_estatisticas_conexoes()
+    print()
+    
+    pipeline.imprimir_tempos()
+    print()
     
     print(f"🔌 ENDPOINTS PROCESSADOS:")
     for endpoint in resumo['endpoints']:
@@ -351,9 +584,110 @@ def main():
             print(f"   {caminho_txt}\n")
 
 
+def normalizar_competencia_argumento(valor):
+    """
+    Aceita a competência como 'MM/YYYY', 'M/YYYY', 'MM_YYYY' ou 'YYYY-MM'
+    
+    Args:
+        valor: Competência digitada na linha de comando
+    
+    Returns:
+        str: Competência 'MM/YYYY' (valores em outro formato voltam como vieram)
+    """
+    valor = valor.strip().replace('_', '/')
+    if '-' in valor:
+        ano, _, mes = valor.partition('-')
+        valor = f"{mes}/{ano}"
+    mes, _, ano = valor.partition('/')
+    if mes.isdigit() and ano.isdigit():
+        return f"{int(mes):02d}/{ano}"
+    return valor
+
+
+def analisar_argumentos(argumentos=None):
+    """
+    Lê as opções de linha de comando
+    
+    Args:
+        argumentos: Lista de argumentos (None = sys.argv)
+    
+    Returns:
+        argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description="Automação de extração de dados das APIs")
+    parser.add_argument(
+        '--apis',
+        nargs='+',
+        metavar='ENDPOINT',
+        help="Extrai só estes endpoints (ex.: --apis Consumo rankingDeCusto)"
+    )
+    parser.add_argument(
+        '--unidades',
+        nargs='+',
+        metavar='UNIDADE',
+        help="Reextrai só estas unidades (ID ou trecho do nome), sem análise do histórico"
+    )
+    parser.add_argument(
+        '--competencias',
+        nargs='+',
+        metavar='MM/YYYY',
+        help="Reextrai só estas competências (fechadas ou reabertas), sem análise do histórico"
+    )
+    parser.add_argument(
+        '--skip-upload',
+        action='store_true',
+        help="Não envia os arquivos ao Google Drive"
+    )
+    parser.add_argument(
+        '--plan',
+        action='store_true',
+        help="Lista as requisições da execução e estima a duração pelo histórico, sem VPN e sem rede"
+    )
+    parser.add_argument(
+        '--profile-startup',
+        action='store_true',
+        help="Mede o custo de importação de cada módulo (inicialização e etapas adiadas) e sai"
+    )
+    opcoes = parser.parse_args(argumentos)
+    
+    # Listas aceitam valores separados por espaço ou vírgula
+    for campo in ('apis', 'unidades', 'competencias'):
+        valores = getattr(opcoes, campo)
+        if valores:
+            setattr(opcoes, campo, [item.strip() for valor in valores for item in valor.split(',') if item.strip()])
+    
+    if opcoes.competencias:
+        opcoes.competencias = [normalizar_competencia_argumento(valor) for valor in opcoes.competencias]
+    
+    try:
+        obter_endpoints(opcoes.apis)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    return opcoes
+
+
+def perfilar_inicializacao():
+    """Importa os módulos adiados medindo cada um e exibe o relatório do --profile-startup"""
+    from modules.perfil_inicializacao import obter_perfil, iniciar_perfil
+    
+    perfil = obter_perfil() or iniciar_perfil()
+    perfil.marcar_fim_inicializacao()
+    perfil.imprimir(perfil.medir_importacoes(MODULOS_ADIADOS))
+
+
 if __name__ == "__main__":
+    argumentos = analisar_argumentos()
+    
+    if argumentos.profile_startup:
+        perfilar_inicializacao()
+        sys.exit(0)
+    
     try:
-        main()
+        if argumentos.plan:
+            planejar_execucao(argumentos)
+        else:
+            main(argumentos)
     except KeyboardInterrupt:
         print("\n⚠️ Interrompido pelo usuário")
         sys.exit(130)
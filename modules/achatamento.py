@@ -0,0 +1,128 @@
+"""
+Módulo de achatamento declarativo de respostas aninhadas
+
+Para endpoints cuja resposta não é uma lista plana em 'items', o APIS_CONFIG
+pode declarar um "achatamento":
+
+    "achatamento": {
+        "caminhos": {"composicaoPorItem": "POR_ITEM", "resumo.detalhes": "DETALHE"},
+        "coluna_tag": "tipo_composicao",
+        "colunas_unidade": {"unidade": "nome", "competencia": "competencia"}
+    }
+
+- caminhos: caminho JSON (chaves separadas por '.') de cada lista de registros
+  → valor gravado na coluna_tag para os registros daquela lista;
+- coluna_tag: coluna que identifica de qual lista veio cada registro;
+- colunas_unidade: colunas constantes {coluna: campo da linha de competências}.
+
+Todas as listas viram um único DataFrame montado de uma vez, coluna a coluna,
+sem um DataFrame intermediário por caminho. O resultado equivale ao pd.concat
+dos DataFrames de cada lista (mesmas colunas, na mesma ordem); a diferença é
+que os tipos são inferidos uma vez sobre a coluna inteira, e não lista a lista.
+"""
+from itertools import chain, repeat
+from operator import itemgetter
+import numpy as np
+import pandas as pd
+
+
+def _resolver_caminho(dados, caminho):
+    """Percorre 'a.b.c' num JSON de dicts; None se algum trecho não existir"""
+    valor = dados
+    for chave in caminho.split('.'):
+        if not isinstance(valor, dict):
+            return None
+        valor = valor.get(chave)
+    return valor
+
+
+def achatar_resposta(dados, unidade, achatamento):
+    """
+    Achata as listas declaradas de uma resposta num único DataFrame
+
+    Args:
+        dados: JSON decodificado da resposta
+        unidade: Linha do DataFrame de competências
+        achatamento: Dicionário 'achatamento' do APIS_CONFIG
+
+    Returns:
+        DataFrame ou None se nenhuma lista tiver registros
+    """
+    coluna_tag = achatamento.get('coluna_tag')
+    colunas_unidade = achatamento.get('colunas_unidade', {'unidade': 'nome', 'competencia': 'competencia'})
+
+    listas = []
+    for caminho, tag in achatamento['caminhos'].items():
+        registros = _resolver_caminho(dados, caminho)
+        if registros:
+            listas.append((registros, tag))
+
+    if not listas:
+        return None
+
+    if not all(all(map(isinstance, registros, repeat(dict))) for registros, _ in listas):
+        return _achatar_com_concat(listas, unidade, coluna_tag, colunas_unidade)
+
+    # Colunas na ordem em que o pd.concat as colocaria: as da primeira lista,
+    # depois as constantes e por fim as que só aparecem nas listas seguintes
+    colunas_constantes = ([coluna_tag] if coluna_tag else []) + list(colunas_unidade)
+    chaves_por_lista = [dict.fromkeys(chain.from_iterable(registros)) for registros, _ in listas]
+    ordem = dict(chaves_por_lista[0])
+    ordem.update(dict.fromkeys(colunas_constantes))
+    for chaves in chaves_por_lista[1:]:
+        ordem.update(chaves)
+    colunas = list(ordem)
+
+    colunas_dados = [coluna for coluna in colunas if coluna not in colunas_constantes]
+    valores = {coluna: [] for coluna in colunas_dados}
+    tags = []
+
+    for (registros, tag), chaves in zip(listas, chaves_por_lista):
+        # Todos os registros com todas as colunas: leitura direta, sem .get por célula
+        completa = chaves.keys() >= set(colunas_dados) and set(map(len, registros)) == {len(chaves)}
+
+        for coluna in colunas_dados:
+            if completa:
+                valores[coluna].extend(map(itemgetter(coluna), registros))
+            elif coluna in chaves:
+                valores[coluna].extend(registro.get(coluna, np.nan) for registro in registros)
+            else:
+                valores[coluna].extend(repeat(np.nan, len(registros)))
+        tags.extend(repeat(tag, len(registros)))
+
+    if coluna_tag:
+        valores[coluna_tag] = tags
+    for coluna, campo in colunas_unidade.items():
+        valores[coluna] = unidade[campo]
+
+    return pd.DataFrame(valores, columns=colunas, index=pd.RangeIndex(len(tags)))
+
+
+def _achatar_com_concat(listas, unidade, coluna_tag, colunas_unidade):
+    """Caminho de compatibilidade para listas com registros que não são dicts"""
+    dfs = []
+    for registros, tag in listas:
+        df = pd.DataFrame(registros)
+        if coluna_tag:
+            df[coluna_tag] = tag
+        for coluna, campo in colunas_unidade.items():
+            df[coluna] = unidade[campo]
+        dfs.append(df)
+
+    return pd.concat(dfs, ignore_index=True)
+
+
+def criar_processador(achatamento):
+    """
+    Cria a processar_func (dados, unidade) → DataFrame de um achatamento
+
+    Args:
+        achatamento: Dicionário 'achatamento' do APIS_CONFIG
+
+    Returns:
+        Função usada pelo extrator no lugar do processamento padrão de 'items'
+    """
+    def processar(dados, unidade):
+        return achatar_resposta(dados, unidade, achatamento)
+
+    return processar
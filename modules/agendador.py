@@ -0,0 +1,289 @@
+"""
+Agendador global de requisições entre endpoints
+
+Em vez de rodar os endpoints um após o outro, cada wrapper api_* apenas
+prepara sua extração (ExtracaoEndpoint) e a registra aqui. O agendador monta
+uma única fila com todo o produto endpoint × unidade × competência e a
+distribui entre as threads, intercalando endpoints e unidades: um endpoint
+preso em backoff de 403 ocupa só a sua lane, sem segurar os outros. Cada
+endpoint é consolidado no seu próprio CSV, como antes, assim que a última
+lane dele termina — numa thread à parte, que não ocupa a vaga da unidade nem
+um worker de extração.
+
+Todas as lanes de uma unidade usam o mesmo token: no máximo
+max_lanes_por_unidade delas rodam ao mesmo tempo (padrão 1, o mesmo ritmo por
+token da execução endpoint a endpoint). Uma thread livre pega a próxima lane
+da fila cuja unidade ainda tem vaga, em vez de ficar parada esperando.
+
+Com backend='async' (requer aiohttp), as mesmas lanes rodam num único event
+loop, com max_workers requisições em voo somando todos os endpoints.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AgendadorGlobal:
+    """Fila única de requisições de todos os endpoints registrados"""
+
+    def __init__(self, max_workers=4, max_lanes_por_unidade=1, backend='threads'):
+        """
+        Args:
+            max_workers: Lanes (endpoint + unidade) executadas ao mesmo tempo; no backend
+                         'async', requisições em voo ao mesmo tempo
+            max_lanes_por_unidade: Lanes da mesma unidade (mesmo token) executadas ao mesmo tempo
+            backend: 'threads' ou 'async' (um único event loop para todos os endpoints)
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.max_lanes_por_unidade = max(1, int(max_lanes_por_unidade))
+        self.extracoes = []
+
+        if backend == 'async':
+            from modules.api_extractor_async import backend_async_disponivel
+            if not backend_async_disponivel():
+                print("⚠️ Backend 'async' requer o pacote aiohttp - agendador usando threads")
+                backend = 'threads'
+        self.backend = backend
+
+    def adicionar(self, extracao):
+        """
+        Registra a extração preparada de um endpoint
+
+        Args:
+            extracao: ExtracaoEndpoint criada por extrair_dados_api
+        """
+        self.extracoes.append(extracao)
+
+    def _montar_lanes(self):
+        """
+        Monta a fila de lanes intercalando endpoints e unidades
+
+        Cada lane é (índice da extração, tarefas de uma unidade). A lista de
+        unidades de cada endpoint é rotacionada, para que a primeira rodada da
+        fila não mande todos os endpoints para a mesma unidade (mesmo token).
+
+        Returns:
+            list: [(indice_extracao, tarefas_lane)]
+        """
+        lanes_por_extracao = []
+
+        for indice, extracao in enumerate(self.extracoes):
+            lanes = {}
+            for tarefa in extracao.tarefas:
+                lanes.setdefault(tarefa[0][1]['unidade_id'], []).append(tarefa)
+
+            lanes = list(lanes.values())
+            if lanes:
+                deslocamento = indice % len(lanes)
+                lanes = lanes[deslocamento:] + lanes[:deslocamento]
+            lanes_por_extracao.append([(indice, tarefas_lane) for tarefas_lane in lanes])
+
+        # Round-robin: uma lane de cada endpoint por rodada
+        fila = []
+        rodada = 0
+        while any(rodada < len(lanes) for lanes in lanes_por_extracao):
+            for lanes in lanes_por_extracao:
+                if rodada < len(lanes):
+                    fila.append(lanes[rodada])
+            rodada += 1
+
+        return fila
+
+    def executar(self, ao_finalizar=None):
+        """
+        Executa todas as requisições registradas e consolida cada endpoint
+
+        Args:
+            ao_finalizar: Função opcional (nome_api, resultado) chamada assim que o
+                          arquivo de cada endpoint fica pronto, enquanto os demais
+                          ainda extraem (usada pelo pipeline do main.py)
+
+        Returns:
+            dict: {nome_api: {'sucesso': bool, 'arquivo': caminho ou None, 'erro': mensagem (se houver)}}
+        """
+        if not self.extracoes:
+            return {}
+
+        fila = self._montar_lanes()
+        total_requisicoes = sum(len(extracao.tarefas) for extracao in self.extracoes)
+
+        print(f"\n{'='*60}")
+        print(f"🗓️ Agendador global: {total_requisicoes} requisição(ões) de {len(self.extracoes)} endpoint(s)")
+        print(f"   {len(fila)} lane(s) (endpoint + unidade) | até {self.max_workers} em paralelo, "
+              f"{self.max_lanes_por_unidade} por unidade | backend: {self.backend}")
+        print(f"{'='*60}\n")
+
+        estados = [
+            {
+                'resultados': [None] * extracao.total,
+                'pendentes': sum(1 for indice, _ in fila if indice == posicao),
+                'erro': None
+            }
+            for posicao, extracao in enumerate(self.extracoes)
+        ]
+        resultados_endpoints = {}
+        lock = threading.Lock()
+        estado_thread = threading.local()
+
+        def finalizar(indice):
+            extracao = self.extracoes[indice]
+            estado = estados[indice]
+
+            if estado['erro'] is not None:
+                print(f"❌ Erro ao executar {extracao.nome_api}: {estado['erro']}")
+                resultado = {"sucesso": False, "erro": str(estado['erro'])}
+            else:
+                try:
+                    # Acumula na ordem original: mesmo CSV e mesmos registros do modo serial
+                    for resultado_linha in estado['resultados']:
+                        extracao.acumular_resultado(resultado_linha)
+                    arquivo = extracao.finalizar()
+                    resultado = {"sucesso": arquivo is not None, "arquivo": arquivo}
+                except Exception as e:
+                    print(f"❌ Erro ao consolidar {extracao.nome_api}: {e}")
+                    resultado = {"sucesso": False, "erro": str(e)}
+
+            with lock:
+                resultados_endpoints[extracao.nome_api] = resultado
+
+            if ao_finalizar:
+                ao_finalizar(extracao.nome_api, resultado)
+
+        # Consolidação (acumular + gravar o arquivo) fora das threads de extração:
+        # uma thread própria, para não segurar a vaga da unidade nem um worker
+        finalizador = ThreadPoolExecutor(max_workers=1)
+        finalizacoes = []
+
+        def lane_terminada(indice):
+            estado = estados[indice]
+            with lock:
+                estado['pendentes'] -= 1
+                ultima_lane = estado['pendentes'] == 0
+
+            # A última lane do endpoint manda gerar o arquivo dele
+            if ultima_lane:
+                finalizacoes.append(finalizador.submit(finalizar, indice))
+
+        def executar_lane(indice, tarefas_lane):
+            extracao = self.extracoes[indice]
+            estado = estados[indice]
+
+            if estado['erro'] is not None:
+                return
+
+            try:
+                # Troca de lane na mesma thread: respeita o delay entre unidades do endpoint
+                if getattr(estado_thread, 'ja_executou', False) and extracao.delay_entre_unidades:
+                    time.sleep(extracao.delay_entre_unidades)
+                estado_thread.ja_executou = True
+
+                for i, tarefa in enumerate(tarefas_lane):
+                    for posicao, resultado in extracao.processar_tarefa(tarefa):
+                        estado['resultados'][posicao] = resultado
+                    if i < len(tarefas_lane) - 1 and extracao.delay_entre_chamadas:
+                        time.sleep(extracao.delay_entre_chamadas)
+
+            except Exception as e:
+                estado['erro'] = e
+
+        # Lanes em execução por unidade (token)
+        pendentes = list(fila)
+        em_execucao = {}
+        condicao = threading.Condition()
+
+        def proxima_lane():
+            with condicao:
+                while pendentes:
+                    for posicao, (indice, tarefas_lane) in enumerate(pendentes):
+                        unidade_id = tarefas_lane[0][0][1]['unidade_id']
+                        if em_execucao.get(unidade_id, 0) < self.max_lanes_por_unidade:
+                            em_execucao[unidade_id] = em_execucao.get(unidade_id, 0) + 1
+                            del pendentes[posicao]
+                            return unidade_id, indice, tarefas_lane
+                    # Todas as unidades pendentes no limite: espera uma lane terminar
+                    condicao.wait()
+                return None
+
+        def liberar(unidade_id):
+            with condicao:
+                em_execucao[unidade_id] -= 1
+                condicao.notify_all()
+
+        def trabalhador():
+            erro = None
+            while True:
+                lane = proxima_lane()
+                if lane is None:
+                    return erro
+                unidade_id, indice, tarefas_lane = lane
+                try:
+                    executar_lane(indice, tarefas_lane)
+                except Exception as e:
+                    # Falha fora da extração: não interrompe as demais lanes
+                    erro = erro or e
+                finally:
+                    liberar(unidade_id)
+                    lane_terminada(indice)
+
+        try:
+            # Endpoints sem nada pendente (tudo recuperado do checkpoint) são consolidados direto
+            for indice, estado in enumerate(estados):
+                if estado['pendentes'] == 0:
+                    finalizacoes.append(finalizador.submit(finalizar, indice))
+
+            if self.backend == 'async':
+                erros = [self._executar_async(fila, estados, lane_terminada)]
+            else:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    futuros = [executor.submit(trabalhador) for _ in range(min(self.max_workers, len(fila)))]
+                    erros = [futuro.result() for futuro in futuros]
+        finally:
+            finalizador.shutdown(wait=True)
+
+        # Falha no ao_finalizar de algum endpoint
+        erros += [futuro.exception() for futuro in finalizacoes]
+
+        for erro in erros:
+            if erro is not None:
+                raise erro
+
+        return resultados_endpoints
+
+    def _executar_async(self, fila, estados, lane_terminada):
+        """
+        Executa a fila de lanes num único event loop
+
+        Args:
+            fila: Lanes montadas por _montar_lanes
+            estados: Estado de cada extração (resultados, pendentes, erro)
+            lane_terminada: Função (indice) chamada ao fim de cada lane
+
+        Returns:
+            Exception ou None: Falha do próprio loop (as das extrações ficam no estado)
+        """
+        from modules.api_extractor_async import executar_lanes_async
+
+        contextos = []
+        for indice, extracao in enumerate(self.extracoes):
+            contexto = extracao.contexto_async()
+            # Endpoint com erro: as lanes restantes dele são puladas, como nas threads
+            contexto['interrompida'] = lambda estado=estados[indice]: estado['erro'] is not None
+            contextos.append(contexto)
+
+        def ao_terminar_lane(indice, erro):
+            if erro is not None and estados[indice]['erro'] is None:
+                estados[indice]['erro'] = erro
+            lane_terminada(indice)
+
+        try:
+            executar_lanes_async(
+                fila,
+                contextos,
+                [estado['resultados'] for estado in estados],
+                max_concorrencia=self.max_workers,
+                max_lanes_por_unidade=self.max_lanes_por_unidade,
+                ao_terminar_lane=ao_terminar_lane
+            )
+        except Exception as e:
+            return e
+        return None
@@ -5,6 +5,8 @@ from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import os
 import sys
+from modules.http_session import obter_sessao
+from modules.competencia import montar_competencia
 
 def get_resource_path(relative_path):
     """Obtém caminho correto tanto em desenvolvimento quanto em executável"""
@@ -53,7 +55,7 @@ def api_competencia(caminho):
         headers = {"Authorization": f"Bearer {token}"}
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = obter_sessao().get(url, headers=headers, timeout=30)
             response.raise_for_status()
             
             competencias = response.json()
@@ -91,10 +93,7 @@ def api_competencia(caminho):
     
     # Filtros e transformações
     df_consolidado = df_consolidado[df_consolidado['ano'].astype(int) >= 2024]
-    df_consolidado['competencia'] = (
-        df_consolidado['mes'].astype(str).str.zfill(2) + '/' + 
-        df_consolidado['ano'].astype(str)
-    )
+    df_consolidado['competencia'] = montar_competencia(df_consolidado['mes'], df_consolidado['ano'])
     
     # Salvamento
     nome_arquivo = "competencias_todas_unidades.xlsx"
@@ -1,6 +1,5 @@
 from modules.api_extractor import extrair_dados_api
 from config.api_config import APIS_CONFIG
-import pandas as pd
 
 def api_composicaoDeCustos(
     diretorio_arquivo_competencia, 
@@ -11,7 +10,11 @@ def api_composicaoDeCustos(
     backoff_inicial=3.0,
     agrupar_por_unidade=True,
     delay_entre_unidades=5.0,
-    filtrar_tipo_unidade=True  # ← NOVO: opção para filtrar tipos de unidade
+    filtrar_tipo_unidade=True,  # ← NOVO: opção para filtrar tipos de unidade
+    max_workers=1,
+    backend=None,
+    agendador=None,
+    plano=None
 ):
     """
     Extrai dados de Composição de Custos com retry automático
@@ -28,76 +31,13 @@ def api_composicaoDeCustos(
         backoff_inicial: Tempo inicial de espera no retry (padrão: 3.0s)
         agrupar_por_unidade: Agrupa processamento por unidade (padrão: True)
         delay_entre_unidades: Delay ao mudar de unidade (padrão: 5.0s)
-        filtrar_tipo_unidade: Filtra apenas unidades aplicáveis (padrão: True)
+        filtrar_tipo_unidade: Filtra apenas unidades aplicáveis - "filtro_unidades" do APIS_CONFIG (padrão: True)
+        max_workers: Unidades processadas em paralelo (padrão: 1 = serial)
+        backend: 'serial', 'threads' ou 'async' (padrão: conforme max_workers)
+        agendador: AgendadorGlobal opcional (registra a extração em vez de executá-la)
+        plano: PlanoExtracao já montado (evita reler o arquivo de competências)
     """
     
-    # Se filtrar_tipo_unidade estiver ativado, validar o arquivo antes
-    if filtrar_tipo_unidade:
-        try:
-            df_temp = pd.read_excel(diretorio_arquivo_competencia)
-            
-            # Verifica se existe coluna 'nome'
-            if 'nome' in df_temp.columns:
-                # Palavras-chave que indicam unidades COM composição de custos
-                palavras_chave_validas = [
-                    'HOSPITAL',
-                    'AME',
-                    'LUCY',
-                    'CER'
-                ]
-
-                palavras_chave_invalidas = ["Filial 40 - HOSPITAL DIA CAMPO LIMPO - CEJAM", "Filial 40 - HOSPITAL DIA M´BOI MIRIM I - CEJAM", "Filial 40 - HOSPITAL DIA M´BOI MIRIM II - CEJAM"]
-
-                # Remove unidades inválidas
-                pattern_invalidas = '|'.join(palavras_chave_invalidas)
-                df_temp = df_temp[~df_temp['nome'].str.contains(pattern_invalidas, case=False, na=False)]
-                
-                # Cria regex pattern: busca qualquer uma das palavras (case-insensitive)
-                # Exemplo: 'HOSPITAL|AME|LUCI'
-                pattern = '|'.join(palavras_chave_validas)
-                
-                total_antes = len(df_temp)
-                
-                # Filtra linhas onde o nome contém alguma das palavras-chave
-                df_temp_filtrado = df_temp[
-                    df_temp['nome'].str.contains(pattern, case=False, na=False, regex=True)
-                ]
-                
-                total_depois = len(df_temp_filtrado)
-                
-                if total_depois < total_antes:
-                    print(f"\n⚠️ AVISO: Composição de Custos - Filtro por Nome de Unidade")
-                    print(f"   📊 Total de competências no arquivo: {total_antes}")
-                    print(f"   ✅ Competências aplicáveis (Hospital/AME/LUCI): {total_depois}")
-                    print(f"   ⏭️ Competências ignoradas (UBS/UPA/outros): {total_antes - total_depois}")
-                    print(f"   💡 Filtrado por palavras-chave: {', '.join(palavras_chave_validas)}\n")
-                
-                if total_depois == 0:
-                    print(f"❌ ERRO: Nenhuma unidade aplicável encontrada para Composição de Custos")
-                    print(f"   Este relatório requer unidades com: {', '.join(palavras_chave_validas)}")
-                    return None
-                
-                # Salva arquivo filtrado temporariamente para usar na extração
-                import tempfile
-                import os
-                
-                # Cria arquivo temporário com apenas as unidades válidas
-                temp_dir = os.path.dirname(diretorio_arquivo_competencia)
-                temp_file = os.path.join(temp_dir, 'temp_composicao_filtrado.xlsx')
-                df_temp_filtrado.to_excel(temp_file, index=False)
-                
-                # Atualiza caminho para usar arquivo filtrado
-                diretorio_arquivo_competencia = temp_file
-                    
-            else:
-                print(f"\n❌ ERRO: Coluna 'nome' não encontrada no arquivo")
-                print(f"   Não é possível filtrar unidades sem a coluna de nome")
-                return None
-                
-        except Exception as e:
-            print(f"⚠️ Não foi possível validar tipos de unidade: {e}")
-            print(f"   Continuando com todas as unidades...\n")
-    
     config = APIS_CONFIG["composicaoDeCustos"]
     
     print(f"📋 Informações do Relatório:")
@@ -113,21 +53,23 @@ def api_composicaoDeCustos(
         payload_func=config["payload_func"],
         processar_func=config["processar_func"],
         timeout=config["timeout"],
+        limites_taxa=config.get("rate_limit"),
+        politica_retry=config.get("retry"),
+        schema=config.get("schema"),
+        filtro_unidades=config.get("filtro_unidades") if filtrar_tipo_unidade else None,
+        achatamento=config.get("achatamento"),
+        streaming=config.get("streaming"),
+        max_competencias_por_requisicao=config.get("max_competencias_por_requisicao", 1),
         tracker=tracker,
         delay_entre_chamadas=delay_entre_chamadas,
         max_tentativas_403=max_tentativas_403,
         backoff_inicial=backoff_inicial,
         agrupar_por_unidade=agrupar_por_unidade,
-        delay_entre_unidades=delay_entre_unidades
+        delay_entre_unidades=delay_entre_unidades,
+        max_workers=max_workers,
+        backend=backend,
+        agendador=agendador,
+        plano=plano
     )
     
-    # Remove arquivo temporário se foi criado
-    if filtrar_tipo_unidade:
-        try:
-            temp_file = os.path.join(os.path.dirname(diretorio_arquivo_competencia), 'temp_composicao_filtrado.xlsx')
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-        except:
-            pass
-    
     return resultado
\ No newline at end of file
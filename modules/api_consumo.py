@@ -9,7 +9,11 @@ def api_consumo(
     max_tentativas_403=3,               
     backoff_inicial=3.0,                
     agrupar_por_unidade=True,           
-    delay_entre_unidades=5.0            
+    delay_entre_unidades=5.0,
+    max_workers=1,
+    backend=None,
+    agendador=None,
+    plano=None
 ):
     """
     Extrai dados de Quantidade de Leito com retry automático
@@ -23,6 +27,10 @@ def api_consumo(
         backoff_inicial: Tempo inicial de espera no retry (padrão: 3.0s)
         agrupar_por_unidade: Agrupa processamento por unidade (padrão: True)
         delay_entre_unidades: Delay ao mudar de unidade (padrão: 5.0s)
+        max_workers: Unidades processadas em paralelo (padrão: 1 = serial)
+        backend: 'serial', 'threads' ou 'async' (padrão: conforme max_workers)
+        agendador: AgendadorGlobal opcional (registra a extração em vez de executá-la)
+        plano: PlanoExtracao já montado (evita reler o arquivo de competências)
     """
     config = APIS_CONFIG["Consumo"]
     
@@ -34,10 +42,21 @@ def api_consumo(
         payload_func=config["payload_func"],
         processar_func=config["processar_func"],
         timeout=config["timeout"],
+        limites_taxa=config.get("rate_limit"),
+        politica_retry=config.get("retry"),
+        schema=config.get("schema"),
+        filtro_unidades=config.get("filtro_unidades"),
+        achatamento=config.get("achatamento"),
+        streaming=config.get("streaming"),
+        max_competencias_por_requisicao=config.get("max_competencias_por_requisicao", 1),
         tracker=tracker,
         delay_entre_chamadas=delay_entre_chamadas,
         max_tentativas_403=max_tentativas_403,
         backoff_inicial=backoff_inicial,
         agrupar_por_unidade=agrupar_por_unidade,
-        delay_entre_unidades=delay_entre_unidades
+        delay_entre_unidades=delay_entre_unidades,
+        max_workers=max_workers,
+        backend=backend,
+        agendador=agendador,
+        plano=plano
     )
\ No newline at end of file
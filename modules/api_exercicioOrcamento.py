@@ -3,6 +3,7 @@ import pandas as pd
 from datetime import datetime
 import os
 import time
+from modules.http_session import obter_sessao
 
 def api_exercicioOrcamento(caminho):
     """
@@ -57,7 +58,7 @@ def api_exercicioOrcamento(caminho):
         headers = {"Authorization": f"Bearer {token}"}
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = obter_sessao().get(url, headers=headers, timeout=30)
             
             if response.status_code == 200:
                 dados = response.json()
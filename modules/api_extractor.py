@@ -4,7 +4,28 @@ from datetime import datetime
 import os
 import time
 import json
-import random
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from modules.http_session import obter_sessao, medir_trafego
+from modules.rate_limiter import LimitadorAdaptativo
+from modules.checkpoint import JournalExtracao
+from modules.streaming_writer import EscritorPartes
+from modules.response_cache import obter_cache, SITUACAO_CACHEAVEL
+from modules.retry_policy import PoliticaRetry
+from modules.competencia import padronizar_competencia, padronizar_serie_competencia
+from modules.json_rapido import carregar_json
+from modules.json_streaming import blocos_resposta, iterar_lotes, TAMANHO_LOTE_PADRAO
+from modules.schema import aplicar_schema
+from modules.formato_saida import extensao_saida, salvar_partes_parquet
+from modules.plano_extracao import PlanoExtracao
+from modules.achatamento import criar_processador
+from modules.de_para import (
+    carregar_de_para_unidades,
+    aplicar_de_para_unidades,
+    identificar_coluna_de_para,
+    imprimir_resumo_de_para
+)
 
 # def gerar_curl(url, headers, payload):
 #     """Gera comando cURL para debug"""
@@ -27,276 +48,1080 @@ def fazer_requisicao_com_retry(
     max_tentativas=4,
     backoff_inicial=2.0,
     nome_unidade="",
-    competencia=""
+    competencia="",
+    limitador=None,
+    nome_api="",
+    unidade_id=None,
+    situacao=None,
+    competencias=None,
+    politica=None,
+    stream=False
 ):
     """
-    Faz requisição com retry automático em caso de erro 403
+    Faz requisição com retry automático conforme a política do endpoint
+    
+    Sem política, repete apenas 403 (backoff exponencial) e timeout (3s), como
+    originalmente. Com uma PoliticaRetry, cada status HTTP / timeout / erro de
+    conexão tem seu número de tentativas e sua espera, limitados pelo orçamento
+    de retries do endpoint.
+    
+    Competências FECHADAS são atendidas pelo cache de respostas em disco (se
+    configurado), sem nenhum acesso à rede; respostas 200 novas são guardadas nele.
     
     Args:
         url: URL da requisição
         headers: Headers da requisição
         payload: Payload JSON
         timeout: Timeout da requisição
-        max_tentativas: Número máximo de tentativas
-        backoff_inicial: Tempo inicial de espera (será multiplicado a cada tentativa)
+        max_tentativas: Número máximo de tentativas para 403/timeout (sem política)
+        backoff_inicial: Tempo inicial de espera do 403 (sem política)
         nome_unidade: Nome da unidade (para logs)
         competencia: Competência (para logs)
+        limitador: LimitadorAdaptativo opcional; quando informado, controla o ritmo
+                   das tentativas no lugar do backoff exponencial fixo
+        nome_api: Nome da API (compõe a chave do cache)
+        unidade_id: ID da unidade (compõe a chave do cache)
+        situacao: Situação da competência; só 'FECHADA' usa o cache
+        competencias: Competências cobertas pelo payload (padrão: [competencia])
+        politica: PoliticaRetry do endpoint (opcional)
+        stream: Se True, o corpo da resposta 200 não é lido aqui (leitura em streaming
+                pelo chamador); com cache, a resposta leva em 'gravacao_cache' o destino
+                dos blocos lidos
     
     Returns:
         tuple: (response, tempo_execucao, tentativa_sucesso)
     """
+    chave_limitador = headers.get("Authorization", "")
+    
+    if politica is None:
+        politica = PoliticaRetry(None, max_tentativas, backoff_inicial, nome_api)
     
-    for tentativa in range(1, max_tentativas + 1):
+    cache = obter_cache() if situacao == SITUACAO_CACHEAVEL else None
+    if cache:
+        chave_cache = cache.gerar_chave(nome_api, unidade_id, payload, situacao)
+        resposta_cache = cache.obter(chave_cache, nome_api, stream=stream)
+        if resposta_cache is not None:
+            print(f"   💾 Resposta obtida do cache (competência fechada)")
+            return resposta_cache, 0.0, 1
+    
+    tentativa = 0
+    
+    while True:
+        tentativa += 1
+        
+        if limitador:
+            limitador.adquirir(chave_limitador)
+        
         inicio = time.time()
         
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=timeout)
+            response = obter_sessao().post(url, headers=headers, json=payload, timeout=timeout, stream=stream)
             tempo_execucao = time.time() - inicio
             
-            # Se não for 403, retorna imediatamente (sucesso ou outro erro)
-            if response.status_code != 403:
-                if tentativa > 1:
+            if limitador:
+                limitador.registrar_resposta(chave_limitador, response.status_code)
+            
+            status_code = response.status_code
+            
+            # Sucesso ou status sem política de retry: retorna imediatamente
+            if status_code == 200 or politica.regra(status_code) is None:
+                if tentativa > 1 and status_code == 200:
                     print(f"   ✅ Sucesso na tentativa {tentativa}")
+                if cache and status_code == 200 and stream:
+                    response.gravacao_cache = cache.gravacao(
+                        chave_cache, nome_api, unidade_id, competencias or [competencia],
+                        situacao, status_code
+                    )
+                elif cache and status_code == 200:
+                    cache.gravar(
+                        chave_cache, nome_api, unidade_id, competencias or [competencia],
+                        situacao, status_code, response.content
+                    )
                 return response, tempo_execucao, tentativa
             
-            # Se for 403 e não for a última tentativa, faz retry
-            if tentativa < max_tentativas:
-                # Backoff exponencial com jitter
-                tempo_espera = backoff_inicial * (2 ** (tentativa - 1))
-                jitter = random.uniform(0, 0.5)
-                tempo_total = tempo_espera + jitter
-                
-                print(f"   ⚠️ HTTP 403 (tentativa {tentativa}/{max_tentativas})")
+            limite = politica.tentativas(status_code)
+            
+            if not politica.deve_repetir(status_code, tentativa):
+                # Última tentativa falhou (ou o orçamento de retries acabou)
+                print(f"   ❌ HTTP {status_code} após {tentativa} tentativa(s)")
+                return response, tempo_execucao, tentativa
+            
+            if stream:
+                # Libera a conexão antes de tentar de novo (o corpo não será lido)
+                response.close()
+            
+            if status_code == 403 and limitador:
+                # O limitador já reduziu a taxa; a próxima tentativa aguarda no bucket
+                print(f"   ⚠️ HTTP 403 (tentativa {tentativa}/{limite}) - reduzindo taxa")
+            else:
+                # Backoff conforme a política do status (com jitter)
+                tempo_total = politica.tempo_espera(status_code, tentativa)
+                print(f"   ⚠️ HTTP {status_code} (tentativa {tentativa}/{limite})")
                 print(f"   ⏳ Aguardando {tempo_total:.1f}s antes de tentar novamente...")
                 time.sleep(tempo_total)
-            else:
-                # Última tentativa falhou
-                print(f"   ❌ HTTP 403 após {max_tentativas} tentativas")
-                return response, tempo_execucao, tentativa
                 
         except requests.exceptions.Timeout:
-            tempo_execucao = time.time() - inicio
-            if tentativa < max_tentativas:
-                print(f"   ⏱️ Timeout (tentativa {tentativa}/{max_tentativas})")
-                print(f"   ⏳ Aguardando 3s antes de tentar novamente...")
-                time.sleep(3)
-            else:
+            if not politica.deve_repetir('timeout', tentativa):
                 raise
+            tempo_total = politica.tempo_espera('timeout', tentativa)
+            print(f"   ⏱️ Timeout (tentativa {tentativa}/{politica.tentativas('timeout')})")
+            print(f"   ⏳ Aguardando {tempo_total:.0f}s antes de tentar novamente...")
+            time.sleep(tempo_total)
         
-        except requests.exceptions.RequestException:
-            # Erros de conexão não devem fazer retry
-            raise
-    
-    # Não deveria chegar aqui, mas por segurança
-    return response, tempo_execucao, max_tentativas
+        except requests.exceptions.ConnectionError:
+            # Erros de conexão só são repetidos se a política declarar 'conexao'
+            if not politica.deve_repetir('conexao', tentativa):
+                raise
+            tempo_total = politica.tempo_espera('conexao', tentativa)
+            print(f"   🔌 Erro de conexão (tentativa {tentativa}/{politica.tentativas('conexao')})")
+            print(f"   ⏳ Aguardando {tempo_total:.1f}s antes de tentar novamente...")
+            time.sleep(tempo_total)
 
-def carregar_de_para_unidades():
+
+def _novo_resultado(nome_api, unidade):
     """
-    Carrega o arquivo de DE-PARA de unidades com tratamento correto de encoding
+    Cria o resultado vazio de uma linha e a função que registra eventos do tracker nele
     
     Returns:
-        DataFrame com as informações de unidades ou None se houver erro
+        tuple: (resultado, registrar)
     """
-    try:
-        caminho_base = os.getenv('caminho_de_para_unidades')
-        
-        if not caminho_base:
-            print("⚠️ Variável 'caminho_de_para_unidades' não configurada no .env")
-            return None
-        
-        caminho_arquivo = os.path.join(caminho_base, "Unidades.xlsx")
-        
-        if not os.path.exists(caminho_arquivo):
-            print(f"⚠️ Arquivo de DE-PARA não encontrado: {caminho_arquivo}")
-            return None
-        
-        # Lê o arquivo Excel com engine openpyxl para melhor suporte a encoding
-        df_unidades = pd.read_excel(
-            caminho_arquivo,
-            engine='openpyxl'
-        )
-        
-        # Função para corrigir encoding corrompido
-        def corrigir_encoding(texto):
-            """Corrige encoding corrompido APENAS quando necessário"""
-            if not isinstance(texto, str):
-                return texto
-            
-            # Lista de padrões de encoding corrompido
-            padroes_corrompidos = ['Ã§', 'Ã£', 'Ã©', 'Ã', 'Ã­', 'Ã³', 'Ãº', 'Ã¡', 'Ã¢', 'Ãª', 'Ã´']
+    resultado = {
+        'df': None,
+        'erros': [],
+        'erros_403': [],
+        'registros_tracker': []
+    }
+    
+    def registrar(**kwargs):
+        resultado['registros_tracker'].append({
+            'endpoint': nome_api,
+            'unidade': unidade['nome'],
+            'competencia': unidade['competencia'],
+            'data_hora': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            **kwargs
+        })
+    
+    return resultado, registrar
+
+
+def _interpretar_resposta(status_code, ler_json, tempo_execucao, tentativa, unidade, processar_func, resultado, registrar):
+    """
+    Converte a resposta HTTP de uma linha em DataFrame/erros/registros do tracker
+    
+    Independe do cliente HTTP: recebe apenas o status e uma função que devolve o JSON,
+    para ser usado tanto pelo backend síncrono (requests) quanto pelo assíncrono.
+    
+    Args:
+        status_code: Status HTTP da resposta
+        ler_json: Função sem argumentos que retorna o corpo JSON decodificado
+        tempo_execucao: Tempo da requisição em segundos
+        tentativa: Tentativa em que a resposta foi obtida
+        unidade: Linha do DataFrame de competências
+        processar_func: Função que recebe (dados_json, unidade) e retorna DataFrame
+        resultado: Resultado criado por _novo_resultado
+        registrar: Função de registro criada por _novo_resultado
+    """
+    nome_unidade = unidade['nome']
+    competencia = unidade['competencia']
+    
+    if status_code == 200:
+        try:
+            dados = ler_json()
             
-            # ✅ Se não tem padrões problemáticos, retorna IMEDIATAMENTE
-            if not any(padrao in texto for padrao in padroes_corrompidos):
-                return texto
+            # Processa response (customizado ou padrão)
+            if processar_func:
+                df_dados = processar_func(dados, unidade)
+            else:
+                # Processamento padrão
+                if 'items' in dados and dados['items']:
+                    df_dados = pd.DataFrame(dados['items'])
+                    df_dados['unidade'] = nome_unidade
+                    df_dados['competencia'] = competencia
+                else:
+                    print(f"   ⚠️ Resposta sem dados")
+                    registrar(status='sem_dados', tempo_execucao=tempo_execucao)
+                    return
             
-            # 🔧 Só chega aqui se realmente tiver problemas de encoding
-            # Estratégia 1: UTF-8 mal interpretado como Latin-1
-            try:
-                corrigido = texto.encode('latin-1').decode('utf-8')
-                if not any(padrao in corrigido for padrao in padroes_corrompidos):
-                    return corrigido
-            except (UnicodeDecodeError, UnicodeEncodeError):
-                pass
+            if df_dados is not None and not df_dados.empty:
+                resultado['df'] = df_dados
+                qtd_registros = len(df_dados)
+                print(f"   ✅ {qtd_registros} registros coletados")
+                registrar(status='sucesso', registros=qtd_registros, tempo_execucao=tempo_execucao)
+            else:
+                print(f"   ⚠️ Nenhum dado retornado")
+                registrar(status='sem_dados', tempo_execucao=tempo_execucao)
+                
+        except (ValueError, KeyError) as e:
+            erro_msg = f"Erro ao processar JSON - {e}"
+            resultado['erros'].append(f"{nome_unidade}: {erro_msg}")
+            print(f"   ⚠️ {erro_msg}")
+            registrar(status='erro', erro=erro_msg, tempo_execucao=tempo_execucao)
             
-            # Estratégia 2: CP1252 (Windows)
-            try:
-                corrigido = texto.encode('cp1252').decode('utf-8')
-                if not any(padrao in corrigido for padrao in padroes_corrompidos):
-                    return corrigido
-            except (UnicodeDecodeError, UnicodeEncodeError):
-                pass
+    elif status_code == 401:
+        erro_msg = "Token inválido"
+        resultado['erros'].append(f"{nome_unidade}: {erro_msg}")
+        print(f"   ❌ {erro_msg}")
+        registrar(status='erro', erro=f"HTTP 401 - {erro_msg}", tempo_execucao=tempo_execucao)
+
+    elif status_code == 500:
+        # Erro 500 geralmente indica que:
+        # 1. A competência solicitada não está disponível para extração
+        # 2. O tipo de relatório não é aplicável para esta unidade
+        try:
+            response_data = ler_json()
+            erro_detalhes = response_data.get('message', 'Sem detalhes')
+        except:
+            erro_detalhes = 'Não foi possível obter detalhes do erro'
+        
+        erro_msg = f"Competência indisponível ou relatório não aplicável - {erro_detalhes}"
+        resultado['erros'].append(f"{nome_unidade}: {erro_msg}")
+        print(f"   ⚠️ {erro_msg}")
+        print(f"   💡 Possíveis causas:")
+        print(f"      • Competência {competencia} ainda não processada para este relatório")
+        print(f"      • Tipo de unidade incompatível (ex: UBS/UPA sem linha de contratação)")
+        registrar(status='indisponivel', erro=erro_msg, tempo_execucao=tempo_execucao)
+    
+    elif status_code == 403:
+        erro_msg = f"Erro HTTP 403 (após {tentativa} tentativas)"
+        resultado['erros'].append(f"{nome_unidade}: {erro_msg}")
+        resultado['erros_403'].append(f"{nome_unidade} - {competencia}")
+        registrar(status='erro', erro=erro_msg, tempo_execucao=tempo_execucao)
             
-            # Estratégia 3: ISO-8859-1
-            try:
-                corrigido = texto.encode('iso-8859-1').decode('utf-8')
-                if not any(padrao in corrigido for padrao in padroes_corrompidos):
-                    return corrigido
-            except (UnicodeDecodeError, UnicodeEncodeError):
+    elif status_code == 404:
+        erro_msg = "Endpoint não encontrado"
+        resultado['erros'].append(f"{nome_unidade}: {erro_msg}")
+        print(f"   ❌ {erro_msg}")
+        registrar(status='erro', erro=f"HTTP 404 - {erro_msg}", tempo_execucao=tempo_execucao)
+        
+    else:
+        erro_msg = f"Erro HTTP {status_code}"
+        resultado['erros'].append(f"{nome_unidade}: {erro_msg}")
+        print(f"   ❌ {erro_msg}")
+        registrar(status='erro', erro=erro_msg, tempo_execucao=tempo_execucao)
+
+
+def _registrar_falha_requisicao(tipo, detalhe, unidade, timeout, max_tentativas_403, resultado, registrar):
+    """
+    Registra uma falha sem resposta HTTP (timeout, erro de conexão, erro inesperado
+    ou requisição ignorada por circuito aberto)
+    
+    Args:
+        tipo: 'timeout', 'requisicao', 'inesperado' ou 'circuito'
+        detalhe: Exceção ou mensagem original
+    """
+    nome_unidade = unidade['nome']
+    
+    if tipo == 'circuito':
+        # 'ignorado' não entra no checkpoint: numa retomada a competência é tentada de novo
+        erro_msg = str(detalhe)
+        resultado['erros'].append(f"{nome_unidade}: {erro_msg}")
+        print(f"   ⏭️ {erro_msg} - requisição ignorada")
+        registrar(status='ignorado', erro=erro_msg, tempo_execucao=0)
+    elif tipo == 'timeout':
+        erro_msg = f"Timeout (>{timeout}s) após {max_tentativas_403} tentativas"
+        resultado['erros'].append(f"{nome_unidade}: {erro_msg}")
+        print(f"   ⏱️ {erro_msg}")
+        registrar(status='timeout', erro=erro_msg, tempo_execucao=timeout)
+    elif tipo == 'requisicao':
+        erro_msg = f"Erro na requisição - {str(detalhe)[:100]}"
+        resultado['erros'].append(f"{nome_unidade}: {erro_msg}")
+        print(f"   ❌ {erro_msg}")
+        registrar(status='erro', erro=erro_msg, tempo_execucao=0)
+    else:
+        erro_msg = f"Erro inesperado - {str(detalhe)[:100]}"
+        resultado['erros'].append(f"{nome_unidade}: {erro_msg}")
+        print(f"   ⚠️ {erro_msg}")
+        registrar(status='erro', erro=erro_msg, tempo_execucao=0)
+
+
+def _montar_payload(unidade, payload_func, resultado, registrar):
+    """
+    Monta o payload de uma linha, registrando o erro se payload_func falhar
+    
+    Returns:
+        tuple: (ok, payload)
+    """
+    try:
+        return True, payload_func(unidade)
+    except Exception as e:
+        erro_msg = f"Erro ao montar payload - {e}"
+        resultado['erros'].append(f"{unidade['nome']}: {erro_msg}")
+        print(f"   ⚠️ {erro_msg}")
+        registrar(status='erro', erro=erro_msg)
+        return False, None
+
+
+def _interpretar_stream(response, tempo_execucao, unidade, consumir_stream, resultado, registrar):
+    """
+    Lê em streaming o corpo de uma resposta 200 e registra o resultado da linha
+    
+    Os registros não passam por resultado['df']: consumir_stream grava os lotes
+    direto nos arquivos parciais e devolve quantos registros foram gravados. O
+    tamanho do corpo é contado durante a leitura, para o tracker.
+    
+    Args:
+        response: Resposta 200 ainda não lida (stream=True) ou RespostaCache
+        tempo_execucao: Tempo até o início da resposta, em segundos
+        unidade: Linha do DataFrame de competências
+        consumir_stream: Função que recebe os blocos do corpo e retorna a quantidade de registros
+        resultado: Resultado criado por _novo_resultado
+        registrar: Função de registro criada por _novo_resultado
+    """
+    nome_unidade = unidade['nome']
+    contagem = {'bytes': 0}
+    erro_msg = None
+    
+    try:
+        with getattr(response, 'gravacao_cache', None) or nullcontext() as destino_cache:
+            blocos = blocos_resposta(response, destino_cache, contagem=contagem)
+            qtd_registros = consumir_stream(blocos)
+            # Resto do corpo (espaços após o JSON): completa a cópia do cache
+            for _ in blocos:
                 pass
-            
-            # Se nenhuma estratégia funcionou, retorna original
-            print(f"   ⚠️ Não foi possível corrigir: {texto[:60]}...")
-            return texto
-        
-        # Aplica correção em todas as colunas de texto
-        for col in df_unidades.select_dtypes(include=['object']).columns:
-            df_unidades[col] = df_unidades[col].apply(corrigir_encoding)
-        
-        print(f"✅ Arquivo DE-PARA carregado: {len(df_unidades)} unidades")
-        print(f"   Colunas disponíveis: {', '.join(df_unidades.columns.tolist())}")
-        
-        # Mostra exemplos de nomes para validar encoding
-        if 'unidade' in df_unidades.columns or 'nome' in df_unidades.columns:
-            col_exemplo = 'unidade' if 'unidade' in df_unidades.columns else 'nome'
-            print(f"   Exemplos de nomes (primeiros 5):")
-            for nome in df_unidades[col_exemplo].head(5):
-                print(f"      - {nome}")
-            
-            # Verifica se ainda existem problemas de encoding
-            padroes_corrompidos = ['Ã§', 'Ã£', 'Ã©', 'Ã', 'Ã­', 'Ã³', 'Ãº', 'Ã¡', 'Ã¢', 'Ãª', 'Ã´']
-            problemas = df_unidades[col_exemplo].apply(
-                lambda x: any(padrao in str(x) for padrao in padroes_corrompidos) if pd.notna(x) else False
-            ).sum()
-            
-            if problemas > 0:
-                print(f"   ⚠️ {problemas} registro(s) ainda com possíveis problemas de encoding")
-            else:
-                print(f"   ✅ Nenhum problema de encoding detectado")
         
-        return df_unidades
+    except (ValueError, KeyError) as e:
+        erro_msg = f"Erro ao processar JSON - {e}"
+    
+    finally:
+        response.close()
+    
+    trafego = medir_trafego(response, contagem['bytes'])
+    
+    if erro_msg:
+        resultado['erros'].append(f"{nome_unidade}: {erro_msg}")
+        print(f"   ⚠️ {erro_msg}")
+        registrar(status='erro', erro=erro_msg, tempo_execucao=tempo_execucao, **trafego)
+    elif qtd_registros:
+        print(f"   ✅ {qtd_registros} registros coletados (streaming)")
+        registrar(status='sucesso', registros=qtd_registros, tempo_execucao=tempo_execucao, **trafego)
+    else:
+        print(f"   ⚠️ Resposta sem dados")
+        registrar(status='sem_dados', tempo_execucao=tempo_execucao, **trafego)
+
+
+def _processar_competencia(
+    unidade,
+    url_base,
+    nome_api,
+    payload_func,
+    processar_func,
+    timeout,
+    max_tentativas_403,
+    backoff_inicial,
+    limitador=None,
+    payload=None,
+    situacao=None,
+    competencias=None,
+    politica=None,
+    consumir_stream=None
+):
+    """
+    Executa a requisição de uma única linha (unidade + competência)
+    
+    Não escreve diretamente no tracker: os registros ficam no resultado para
+    serem repassados na ordem original, tanto no modo serial quanto no concorrente.
+    
+    Args:
+        unidade: Linha do DataFrame de competências (unidade_id, token, nome, competencia...)
+        url_base: URL base do endpoint (o id da unidade é concatenado ao final)
+        nome_api: Nome da API (para o tracker)
+        payload_func: Função que recebe (unidade) e retorna payload
+        processar_func: Função que recebe (dados_json, unidade) e retorna DataFrame
+        timeout: Timeout da requisição em segundos
+        max_tentativas_403: Número máximo de tentativas quando receber 403
+        backoff_inicial: Tempo inicial de espera entre tentativas
+        limitador: LimitadorAdaptativo opcional (substitui delays fixos)
+        payload: Payload pronto (opcional); quando omitido, é montado com payload_func
+        situacao: Situação da competência para o cache (padrão: coluna 'situacao' da linha)
+        competencias: Competências cobertas pelo payload (padrão: a da linha)
+        politica: PoliticaRetry do endpoint (retries por status e circuit breakers)
+        consumir_stream: Função opcional que recebe os blocos do corpo de uma resposta 200,
+                         grava os registros em lotes e retorna quantos foram gravados
+                         (leitura em streaming; resultado['df'] fica None)
+    
+    Returns:
+        dict: {'df': DataFrame ou None, 'erros': [...], 'erros_403': [...], 'registros_tracker': [...]}
+    """
+    resultado, registrar = _novo_resultado(nome_api, unidade)
+    
+    if situacao is None:
+        situacao = unidade.get('situacao')
+    
+    # Monta payload específico da API
+    if payload is None:
+        ok, payload = _montar_payload(unidade, payload_func, resultado, registrar)
+        if not ok:
+            return resultado
+    
+    # Circuito aberto: não gasta requisição (nem backoff) com o que não vai dar certo
+    if politica:
+        permitido, motivo = politica.permitir(unidade['unidade_id'])
+        if not permitido:
+            _registrar_falha_requisicao('circuito', motivo, unidade, timeout, max_tentativas_403, resultado, registrar)
+            return resultado
+    
+    tentativas_timeout = politica.tentativas('timeout') if politica else max_tentativas_403
+
+    url = f"{url_base}{unidade['unidade_id']}"
+    headers = {"Authorization": f"Bearer {unidade['token']}"}
+
+    try:
+        # Usa função com retry
+        response, tempo_execucao, tentativa = fazer_requisicao_com_retry(
+            url=url,
+            headers=headers,
+            payload=payload,
+            timeout=timeout,
+            max_tentativas=max_tentativas_403,
+            backoff_inicial=backoff_inicial,
+            nome_unidade=unidade['nome'],
+            competencia=unidade['competencia'],
+            limitador=limitador,
+            nome_api=nome_api,
+            unidade_id=unidade['unidade_id'],
+            situacao=situacao,
+            competencias=competencias,
+            politica=politica,
+            stream=consumir_stream is not None
+        )
+        
+        if politica:
+            politica.registrar_resultado(unidade['unidade_id'], response.status_code)
         
+        if consumir_stream is not None and response.status_code == 200:
+            _interpretar_stream(response, tempo_execucao, unidade, consumir_stream, resultado, registrar)
+        else:
+            # Bytes trafegados vão junto em cada registro do tracker desta resposta
+            trafego = medir_trafego(response)
+            _interpretar_resposta(
+                response.status_code, lambda: carregar_json(response.content), tempo_execucao, tentativa,
+                unidade, processar_func, resultado, lambda **kwargs: registrar(**kwargs, **trafego)
+            )
+
+    except requests.exceptions.Timeout as e:
+        if politica:
+            politica.registrar_resultado(unidade['unidade_id'], 'timeout')
+        _registrar_falha_requisicao('timeout', e, unidade, timeout, tentativas_timeout, resultado, registrar)
+            
+    except requests.exceptions.RequestException as e:
+        if politica:
+            chave = 'conexao' if isinstance(e, requests.exceptions.ConnectionError) else 'requisicao'
+            politica.registrar_resultado(unidade['unidade_id'], chave)
+        _registrar_falha_requisicao('requisicao', e, unidade, timeout, max_tentativas_403, resultado, registrar)
+            
     except Exception as e:
-        print(f"❌ Erro ao carregar arquivo DE-PARA: {e}")
-        import traceback
-        print(f"   Detalhes: {traceback.format_exc()}")
+        if politica:
+            politica.registrar_resultado(unidade['unidade_id'], 'inesperado')
+        _registrar_falha_requisicao('inesperado', e, unidade, timeout, max_tentativas_403, resultado, registrar)
+    
+    return resultado
+
+
+def _competencia_para_tupla(competencia):
+    """
+    Converte competência ('01/2025' ou 'jan/2025') em (ano, mes) para ordenação
+    
+    Returns:
+        tuple: (ano, mes) ou None se o formato não for reconhecido
+    """
+    try:
+        mes, ano = padronizar_competencia(competencia).split('/')
+        return int(ano), int(mes)
+    except (ValueError, AttributeError):
         return None
 
 
-def aplicar_de_para_unidades(df_final, coluna_unidade='unidade'):
+def _agrupar_competencias_contiguas(linhas, max_competencias_por_requisicao):
     """
-    Aplica o DE-PARA de unidades ao DataFrame final com tratamento de encoding
+    Agrupa competências consecutivas (mês a mês) de uma mesma unidade
     
     Args:
-        df_final: DataFrame com os dados extraídos
-        coluna_unidade: Nome da coluna que contém o nome da unidade
+        linhas: Lista de (posicao, unidade) na ordem original
+        max_competencias_por_requisicao: Tamanho máximo de cada faixa
     
     Returns:
-        DataFrame com as informações de unidades mescladas
+        list: Lista de tarefas; cada tarefa é uma lista de (posicao, unidade)
+              com competências contíguas da mesma unidade
     """
-    df_unidades = carregar_de_para_unidades()
+    if max_competencias_por_requisicao <= 1:
+        return [[linha] for linha in linhas]
     
-    if df_unidades is None:
-        print("⚠️ Continuando sem aplicar DE-PARA de unidades")
-        return df_final
+    def chave_ordenacao(linha):
+        posicao, unidade = linha
+        tupla = _competencia_para_tupla(unidade['competencia'])
+        return (str(unidade['unidade_id']), tupla or (0, 0), posicao)
     
-    # Identifica a coluna de nome da unidade no arquivo DE-PARA
-    colunas_possiveis = ['unidade', 'nome', 'nome_unidade', 'Unidade', 'Nome', 'NomeCompletoUnidade']
-    coluna_merge = None
+    tarefas = []
+    atual = []
+    tupla_anterior = None
     
-    for col in colunas_possiveis:
-        if col in df_unidades.columns:
-            coluna_merge = col
-            break
+    for posicao, unidade in sorted(linhas, key=chave_ordenacao):
+        tupla = _competencia_para_tupla(unidade['competencia'])
+        
+        contigua = False
+        if atual and tupla and tupla_anterior and unidade['unidade_id'] == atual[-1][1]['unidade_id']:
+            ano, mes = tupla_anterior
+            proxima = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+            contigua = tupla == proxima and len(atual) < max_competencias_por_requisicao
+        
+        if contigua:
+            atual.append((posicao, unidade))
+        else:
+            if atual:
+                tarefas.append(atual)
+            atual = [(posicao, unidade)]
+        
+        tupla_anterior = tupla
     
-    if coluna_merge is None:
-        print(f"⚠️ Não foi possível identificar a coluna de nome da unidade")
-        print(f"   Colunas disponíveis: {df_unidades.columns.tolist()}")
-        return df_final
+    if atual:
+        tarefas.append(atual)
+    
+    # Mantém a ordem original de processamento (pela primeira linha de cada faixa)
+    tarefas.sort(key=lambda tarefa: tarefa[0][0])
+    return tarefas
+
+
+def _montar_payload_faixa(tarefa, payload_func):
+    """
+    Monta o payload de uma faixa de competências (competenciaInicial → competenciaFinal)
     
+    Returns:
+        dict ou None se o payload do endpoint não aceitar faixa
+    """
     try:
-        # Normaliza strings em ambos os DataFrames antes do merge
-        # Remove espaços extras e padroniza
-        df_final[coluna_unidade] = df_final[coluna_unidade].str.strip()
-        df_unidades[coluna_merge] = df_unidades[coluna_merge].str.strip()
-        
-        # Faz o merge (VLOOKUP)
-        df_final_com_depara = df_final.merge(
-            df_unidades,
-            left_on=coluna_unidade,
-            right_on=coluna_merge,
-            how='left'
-        )
-        
-        # Conta quantas unidades encontraram match
-        total_registros = len(df_final)
-        registros_com_match = df_final_com_depara[coluna_merge].notna().sum()
+        payload = payload_func(tarefa[0][1])
+    except Exception:
+        return None
+    
+    if not isinstance(payload, dict) or 'competenciaInicial' not in payload or 'competenciaFinal' not in payload:
+        return None
+    
+    payload = dict(payload)
+    payload['competenciaInicial'] = tarefa[0][1]['competencia']
+    payload['competenciaFinal'] = tarefa[-1][1]['competencia']
+    return payload
+
+
+def _situacao_faixa(tarefa):
+    """
+    Situação comum a todas as competências de uma faixa
+    
+    Returns:
+        str: A situação, ou None se as competências tiverem situações diferentes
+    """
+    situacoes = {unidade.get('situacao') for _, unidade in tarefa}
+    return situacoes.pop() if len(situacoes) == 1 else None
+
+
+def _repartir_bytes(total, partes):
+    """Divide um total de bytes em partes inteiras que somam exatamente o total"""
+    base, resto = divmod(int(total), partes)
+    return [base + (1 if i < resto else 0) for i in range(partes)]
+
+
+def _dividir_resultado_faixa(resultado, tarefa, nome_api, partes=None):
+    """
+    Separa o resultado de uma requisição com várias competências em um resultado por mês
+    
+    A divisão usa a coluna 'competenciaDescr' da resposta, para que o tracker e o
+    arquivo final continuem com uma linha por competência.
+    
+    Args:
+        resultado: Resultado de _processar_competencia para a faixa inteira
+        tarefa: Lista de (posicao, unidade) da faixa
+        nome_api: Nome da API (para o tracker)
+        partes: Na leitura em streaming, {posicao: ParteEmLotes} já separadas por mês
+                durante a leitura (resultado['df'] fica None)
+    
+    Returns:
+        list: [(posicao, resultado)] ou None se não for possível dividir
+              (erro na requisição, resposta sem 'competenciaDescr' ou com linhas
+              cuja 'competenciaDescr' não é nenhum dos meses pedidos)
+    """
+    registros = resultado['registros_tracker']
+    if not registros or registros[0]['status'] not in ('sucesso', 'sem_dados'):
+        return None
+    
+    df_faixa = resultado['df']
+    if df_faixa is not None and 'competenciaDescr' not in df_faixa.columns:
+        return None
+    
+    registro_faixa = registros[0]
+    tempo_por_competencia = (registro_faixa.get('tempo_execucao') or 0) / len(tarefa)
+    
+    # Bytes da requisição repartidos entre os meses, sem perder o total
+    bytes_por_competencia = {
+        chave: _repartir_bytes(registro_faixa.get(chave) or 0, len(tarefa))
+        for chave in ('bytes_comprimidos', 'bytes_descomprimidos')
+    }
+    
+    if df_faixa is not None:
+        competencias_resposta = padronizar_serie_competencia(df_faixa['competenciaDescr'])
         
-        print(f"📊 DE-PARA aplicado:")
-        print(f"   Total de registros: {total_registros}")
-        print(f"   Registros com match: {registros_com_match}")
+        # Linhas que não caem em nenhum mês pedido seriam perdidas na divisão
+        competencias_faixa = {padronizar_competencia(unidade['competencia']) for _, unidade in tarefa}
+        fora_da_faixa = int((~competencias_resposta.isin(competencias_faixa)).sum())
+        if fora_da_faixa:
+            print(f"   ⚠️ {fora_da_faixa} registro(s) com 'competenciaDescr' fora da faixa pedida")
+            return None
+    
+    divididos = []
+    for indice, (posicao, unidade) in enumerate(tarefa):
+        competencia = unidade['competencia']
+        df_mes = None
+        parte = {}
         
-        if registros_com_match < total_registros:
-            unidades_sem_match = df_final[~df_final[coluna_unidade].isin(df_unidades[coluna_merge])][coluna_unidade].unique()
-            print(f"   ⚠️ {len(unidades_sem_match)} unidade(s) sem match:")
-            for unidade in list(unidades_sem_match)[:5]:
-                print(f"      - {unidade}")
-            if len(unidades_sem_match) > 5:
-                print(f"      ... e mais {len(unidades_sem_match) - 5}")
+        if df_faixa is not None:
+            df_mes = df_faixa[competencias_resposta == padronizar_competencia(competencia)].copy()
+            df_mes['competencia'] = competencia
         
-        return df_final_com_depara
+        if df_mes is not None and not df_mes.empty:
+            status, qtd_registros = 'sucesso', len(df_mes)
+        elif partes is not None and partes[posicao].registros:
+            df_mes, status, qtd_registros = None, 'sucesso', partes[posicao].registros
+            parte = {
+                'arquivo_parcial': partes[posicao].caminho,
+                'colunas': partes[posicao].colunas,
+                'registros': qtd_registros
+            }
+        else:
+            df_mes, status, qtd_registros = None, 'sem_dados', 0
         
-    except Exception as e:
-        print(f"❌ Erro ao aplicar DE-PARA: {e}")
-        import traceback
-        print(f"   Detalhes: {traceback.format_exc()}")
-        return df_final
+        divididos.append((posicao, {
+            'df': df_mes,
+            **parte,
+            'erros': [],
+            'erros_403': [],
+            'registros_tracker': [{
+                'endpoint': nome_api,
+                'unidade': unidade['nome'],
+                'competencia': competencia,
+                'data_hora': registro_faixa['data_hora'],
+                'status': status,
+                'registros': qtd_registros,
+                'tempo_execucao': tempo_por_competencia,
+                'bytes_comprimidos': bytes_por_competencia['bytes_comprimidos'][indice],
+                'bytes_descomprimidos': bytes_por_competencia['bytes_descomprimidos'][indice],
+                'codificacao': registro_faixa.get('codificacao')
+            }]
+        }))
+    
+    return divididos
 
-def padronizar_competencia(competencia):
+
+def _executar_em_lanes(tarefas, processar_tarefa, total_linhas, max_workers, delay_entre_chamadas, delay_entre_unidades):
     """
-    Converte competência de 'jan/2025' para '01/2025'
+    Executa as tarefas em paralelo, com uma "lane" por unidade
+    
+    Cada unidade tem seu próprio token, então as competências de uma mesma
+    unidade continuam sequenciais (com delay_entre_chamadas e o backoff de 403
+    dentro da lane) e unidades diferentes rodam em paralelo. Quando uma thread
+    termina uma unidade e pega a próxima, aguarda delay_entre_unidades, como no
+    modo serial.
     
     Args:
-        competencia: String no formato 'mes/ano' ou já no formato 'MM/YYYY'
+        tarefas: Lista de tarefas (cada uma, lista de (posicao, unidade)) na ordem original
+        processar_tarefa: Função que recebe a tarefa e retorna [(posicao, resultado)]
+        total_linhas: Quantidade total de linhas (competências)
+        max_workers: Número máximo de unidades processadas ao mesmo tempo
+        delay_entre_chamadas: Delay entre requisições da mesma unidade
+        delay_entre_unidades: Delay ao trocar de unidade na mesma thread
     
     Returns:
-        String no formato 'MM/YYYY'
+        list: Resultados indexados pela posição original de cada linha
     """
-    if pd.isna(competencia):
-        return competencia
+    lanes = {}
+    for tarefa in tarefas:
+        lanes.setdefault(tarefa[0][1]['unidade_id'], []).append(tarefa)
     
-    competencia_str = str(competencia).strip()
+    resultados = [None] * total_linhas
+    estado_thread = threading.local()
     
-    # Dicionário de meses
-    meses = {
-        'jan': '01', 'fev': '02', 'mar': '03', 'abr': '04',
-        'mai': '05', 'jun': '06', 'jul': '07', 'ago': '08',
-        'set': '09', 'out': '10', 'nov': '11', 'dez': '12'
-    }
+    def executar_lane(tarefas_lane):
+        if getattr(estado_thread, 'ja_executou', False):
+            time.sleep(delay_entre_unidades)
+        estado_thread.ja_executou = True
+        
+        for i, tarefa in enumerate(tarefas_lane):
+            for posicao, resultado in processar_tarefa(tarefa):
+                resultados[posicao] = resultado
+            if i < len(tarefas_lane) - 1:
+                time.sleep(delay_entre_chamadas)
     
-    # Se já está no formato numérico, retorna
-    if '/' in competencia_str:
-        partes = competencia_str.split('/')
-        if len(partes) == 2 and partes[0].isdigit() and len(partes[0]) == 2:
-            return competencia_str
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # list() propaga exceções levantadas dentro das lanes
+        list(executor.map(executar_lane, lanes.values()))
     
-    # Converte de texto para numérico
-    for mes_texto, mes_numero in meses.items():
-        if mes_texto.lower() in competencia_str.lower():
-            ano = competencia_str.split('/')[-1].strip()
-            return f"{mes_numero}/{ano}"
+    return resultados
+
+
+class ExtracaoEndpoint:
+    """
+    Extração de um endpoint já preparada: tarefas pendentes, execução e consolidação
+    
+    Separa o que extrair_dados_api fazia de uma vez só para que as tarefas possam
+    ser executadas tanto pelo próprio endpoint (serial/threads/async) quanto pelo
+    AgendadorGlobal, que intercala tarefas de todos os endpoints numa única fila.
+    """
+    
+    def __init__(self,
+                 df_consolidado,
+                 caminho_to_save,
+                 nome_api,
+                 url_base,
+                 payload_func,
+                 processar_func=None,
+                 timeout=60,
+                 tracker=None,
+                 delay_entre_chamadas=0.5,
+                 max_tentativas_403=4,
+                 backoff_inicial=2.0,
+                 delay_entre_unidades=2.0,
+                 limitador=None,
+                 max_competencias_por_requisicao=1,
+                 usar_checkpoint=True,
+                 politica_retry=None,
+                 schema=None,
+                 streaming=None):
+        """
+        Args:
+            df_consolidado: Competências a processar (já filtradas e ordenadas)
+            Demais argumentos: os mesmos de extrair_dados_api
+        """
+        self.caminho_to_save = caminho_to_save
+        self.nome_api = nome_api
+        self.url_base = url_base
+        self.payload_func = payload_func
+        self.processar_func = processar_func
+        self.timeout = timeout
+        self.tracker = tracker
+        self.delay_entre_chamadas = delay_entre_chamadas
+        self.max_tentativas_403 = max_tentativas_403
+        self.backoff_inicial = backoff_inicial
+        self.delay_entre_unidades = delay_entre_unidades
+        self.limitador = limitador
+        self.politica = PoliticaRetry(politica_retry, max_tentativas_403, backoff_inicial, nome_api)
+        self.schema = schema
+        
+        # Leitura em streaming só no processamento padrão de 'items'
+        self.tamanho_lote = None
+        if streaming and processar_func is None:
+            self.tamanho_lote = (streaming if isinstance(streaming, dict) else {}).get('tamanho_lote', TAMANHO_LOTE_PADRAO)
+        
+        self.total = len(df_consolidado)
+        self.erros = []
+        self.erros_403_persistentes = []
+        
+        # Cada resposta vai para um arquivo parcial em disco assim que chega
+        self.escritor = EscritorPartes(caminho_to_save, nome_api)
+        
+        # Competência reaberta pode ter dados alterados: descarta o que estava no cache
+        self.cache = obter_cache()
+        if self.cache:
+            self.estatisticas_cache_inicio = self.cache.obter_estatisticas(nome_api)
+            reabertas = df_consolidado[df_consolidado['situacao'] == 'REABERTA']
+            invalidadas = sum(
+                self.cache.invalidar(linha['unidade_id'], linha['competencia'])
+                for _, linha in reabertas.iterrows()
+            )
+            if invalidadas:
+                print(f"💾 Cache: {invalidadas} resposta(s) de competências reabertas invalidada(s)")
+        
+        linhas = [(posicao, unidade) for posicao, (_, unidade) in enumerate(df_consolidado.iterrows())]
+        self.unidades_por_posicao = dict(linhas)
+        
+        # Retomada: competências concluídas numa execução interrompida não são refeitas
+        self.journal = JournalExtracao(caminho_to_save, nome_api) if usar_checkpoint else None
+        if self.journal:
+            recuperados, linhas = self.journal.recuperar(linhas)
+            if recuperados:
+                print(f"♻️ Retomando execução anterior: {len(recuperados)} competência(s) recuperada(s) do checkpoint")
+                print(f"   Restantes para requisitar: {len(linhas)}\n")
+                for posicao in sorted(recuperados):
+                    resultado = recuperados[posicao]
+                    if resultado['arquivo_parcial']:
+                        self.escritor.adotar(posicao, resultado['arquivo_parcial'], resultado['colunas'], resultado['registros'])
+                    self.acumular_resultado(resultado)
+        
+        # Competências consecutivas da mesma unidade viram uma única requisição
+        # (só no processamento padrão, que permite separar por competenciaDescr)
+        self.tarefas = _agrupar_competencias_contiguas(
+            linhas,
+            max_competencias_por_requisicao if processar_func is None else 1
+        )
+    
+    def _consumidor_stream(self, tarefa):
+        """
+        Cria o consumir_stream de uma tarefa: lê 'items' em lotes e grava cada lote
+        direto na parte da competência (numa faixa, separado por competenciaDescr)
+        
+        Returns:
+            tuple: (consumir_stream, {posicao: ParteEmLotes})
+        """
+        partes = {posicao: self.escritor.abrir(posicao, unidade) for posicao, unidade in tarefa}
+        primeira = tarefa[0][1]
+        competencias_faixa = {padronizar_competencia(unidade['competencia']) for _, unidade in tarefa}
+        
+        def consumir_stream(blocos):
+            try:
+                for lote in iterar_lotes(blocos, self.tamanho_lote):
+                    df_lote = pd.DataFrame(lote)
+                    del lote
+                    df_lote['unidade'] = primeira['nome']
+                    df_lote['competencia'] = primeira['competencia']
+                    
+                    if len(tarefa) == 1:
+                        partes[tarefa[0][0]].anexar(df_lote)
+                        continue
+                    
+                    if 'competenciaDescr' not in df_lote.columns:
+                        raise ValueError("resposta sem 'competenciaDescr' para separar a faixa por mês")
+                    
+                    competencias_lote = padronizar_serie_competencia(df_lote['competenciaDescr'])
+                    if not competencias_lote.isin(competencias_faixa).all():
+                        raise ValueError("resposta com 'competenciaDescr' fora da faixa pedida")
+                    for posicao, unidade in tarefa:
+                        df_mes = df_lote[competencias_lote == padronizar_competencia(unidade['competencia'])]
+                        if not df_mes.empty:
+                            df_mes = df_mes.copy()
+                            df_mes['competencia'] = unidade['competencia']
+                            partes[posicao].anexar(df_mes)
+                
+                # Lê o corpo até o fim antes de dar as partes por concluídas
+                for _ in blocos:
+                    pass
+            except BaseException:
+                for parte in partes.values():
+                    parte.descartar()
+                raise
+            
+            for parte in partes.values():
+                parte.concluir()
+            return sum(parte.registros for parte in partes.values())
+        
+        return consumir_stream, partes
+    
+    def _processar_linha(self, posicao, unidade):
+        print(f"🔄 [{posicao + 1}/{self.total}] {unidade['nome']} - {unidade['competencia']}")
+        
+        consumir_stream, partes = None, None
+        if self.tamanho_lote:
+            consumir_stream, partes = self._consumidor_stream([(posicao, unidade)])
+        
+        resultado = _processar_competencia(
+            unidade=unidade,
+            url_base=self.url_base,
+            nome_api=self.nome_api,
+            payload_func=self.payload_func,
+            processar_func=self.processar_func,
+            timeout=self.timeout,
+            max_tentativas_403=self.max_tentativas_403,
+            backoff_inicial=self.backoff_inicial,
+            limitador=self.limitador,
+            politica=self.politica,
+            consumir_stream=consumir_stream
+        )
+        
+        if partes and partes[posicao].registros:
+            resultado['arquivo_parcial'] = partes[posicao].caminho
+            resultado['colunas'] = partes[posicao].colunas
+            resultado['registros'] = partes[posicao].registros
+        
+        return resultado
+    
+    def _executar_tarefa(self, tarefa):
+        if len(tarefa) == 1:
+            posicao, unidade = tarefa[0]
+            return [(posicao, self._processar_linha(posicao, unidade))]
+        
+        primeira = tarefa[0][1]
+        ultima = tarefa[-1][1]
+        payload = _montar_payload_faixa(tarefa, self.payload_func)
+        
+        if payload is not None:
+            print(f"🔄 [{tarefa[0][0] + 1}/{self.total}] {primeira['nome']} - "
+                  f"{primeira['competencia']} → {ultima['competencia']} ({len(tarefa)} competências)")
+            
+            consumir_stream, partes = None, None
+            if self.tamanho_lote:
+                consumir_stream, partes = self._consumidor_stream(tarefa)
+            
+            resultado_faixa = _processar_competencia(
+                unidade=primeira,
+                url_base=self.url_base,
+                nome_api=self.nome_api,
+                payload_func=self.payload_func,
+                processar_func=None,
+                timeout=self.timeout,
+                max_tentativas_403=self.max_tentativas_403,
+                backoff_inicial=self.backoff_inicial,
+                limitador=self.limitador,
+                payload=payload,
+                situacao=_situacao_faixa(tarefa),
+                competencias=[unidade['competencia'] for _, unidade in tarefa],
+                politica=self.politica,
+                consumir_stream=consumir_stream
+            )
+            
+            divididos = _dividir_resultado_faixa(resultado_faixa, tarefa, self.nome_api, partes)
+            if divididos is not None:
+                return divididos
+            
+            print(f"   ↩️ Faixa não pôde ser usada - refazendo mês a mês")
+        
+        # Fallback: uma requisição por competência
+        resultados_tarefa = []
+        for i, (posicao, unidade) in enumerate(tarefa):
+            if i > 0 and self.delay_entre_chamadas:
+                time.sleep(self.delay_entre_chamadas)
+            resultados_tarefa.append((posicao, self._processar_linha(posicao, unidade)))
+        return resultados_tarefa
+    
+    def concluir(self, posicao, resultado):
+        """Grava a parte em disco (liberando o DataFrame) e registra no journal"""
+        if resultado['df'] is not None:
+            df = resultado['df']
+            resultado['arquivo_parcial'] = self.escritor.gravar(posicao, self.unidades_por_posicao[posicao], df)
+            resultado['colunas'] = list(df.columns)
+            resultado['registros'] = len(df)
+            resultado['df'] = None
+        
+        # Grava no journal assim que a competência termina (antes da consolidação)
+        if self.journal:
+            self.journal.registrar(self.unidades_por_posicao[posicao], resultado)
+    
+    def processar_tarefa(self, tarefa):
+        """
+        Executa uma tarefa (uma competência ou uma faixa contígua da mesma unidade)
+        
+        Returns:
+            list: [(posicao, resultado)]
+        """
+        resultados_tarefa = self._executar_tarefa(tarefa)
+        for posicao, resultado in resultados_tarefa:
+            self.concluir(posicao, resultado)
+        return resultados_tarefa
     
-    # Se não encontrou correspondência, retorna original
-    return competencia_str
+    def acumular_resultado(self, resultado):
+        """Repassa erros e registros do tracker de um resultado"""
+        if resultado is None:
+            return
+        self.erros.extend(resultado['erros'])
+        self.erros_403_persistentes.extend(resultado['erros_403'])
+        if self.tracker:
+            for registro in resultado['registros_tracker']:
+                self.tracker.registrar_execucao(**registro)
+    
+    def executar_serial(self, agrupar_por_unidade=True):
+        """Executa as tarefas uma a uma, na ordem (comportamento original)"""
+        unidade_anterior = None
+        
+        # Loop pelas unidades
+        for indice_tarefa, tarefa in enumerate(self.tarefas):
+            id_unidade = tarefa[0][1]['unidade_id']
+            
+            # Detecta mudança de unidade e adiciona delay maior
+            if agrupar_por_unidade and self.delay_entre_unidades and unidade_anterior is not None and unidade_anterior != id_unidade:
+                print(f"\n🔄 Mudando de unidade (delay de {self.delay_entre_unidades}s)...\n")
+                time.sleep(self.delay_entre_unidades)
+            
+            unidade_anterior = id_unidade
+            
+            for _, resultado in sorted(self.processar_tarefa(tarefa), key=lambda item: item[0]):
+                self.acumular_resultado(resultado)
+            
+            # Delay entre requisições (exceto na última)
+            if self.delay_entre_chamadas and indice_tarefa < len(self.tarefas) - 1:
+                print(f"   ⏳ Aguardando {self.delay_entre_chamadas}s antes da próxima requisição...")
+                time.sleep(self.delay_entre_chamadas)
+    
+    def executar_threads(self, max_workers):
+        """Executa as tarefas com uma lane por unidade em paralelo"""
+        # Resultados são acumulados na ordem original,
+        # garantindo o mesmo CSV e os mesmos registros do modo serial
+        resultados = _executar_em_lanes(
+            self.tarefas,
+            self.processar_tarefa,
+            total_linhas=self.total,
+            max_workers=max_workers,
+            delay_entre_chamadas=self.delay_entre_chamadas,
+            delay_entre_unidades=self.delay_entre_unidades
+        )
+        for resultado in resultados:
+            self.acumular_resultado(resultado)
+    
+    def contexto_async(self):
+        """Contexto usado pelo backend assíncrono (por endpoint ou pelo agendador)"""
+        return {
+            'url_base': self.url_base,
+            'nome_api': self.nome_api,
+            'payload_func': self.payload_func,
+            'processar_func': self.processar_func,
+            'timeout': self.timeout,
+            'max_tentativas_403': self.max_tentativas_403,
+            'backoff_inicial': self.backoff_inicial,
+            'limitador': self.limitador,
+            'politica': self.politica,
+            'delay_entre_chamadas': self.delay_entre_chamadas,
+            'total': self.total,
+            'ao_concluir': self.concluir
+        }
+    
+    def executar_async(self, max_concorrencia):
+        """Executa as tarefas num event loop próprio do endpoint (requer aiohttp)"""
+        from modules.api_extractor_async import executar_tarefas_async
+        
+        resultados = executar_tarefas_async(
+            self.tarefas,
+            contexto=self.contexto_async(),
+            max_concorrencia=max_concorrencia
+        )
+        for resultado in resultados:
+            self.acumular_resultado(resultado)
+    
+    def finalizar(self):
+        """
+        Exibe os resumos do endpoint, consolida as partes e salva o CSV
+        
+        Returns:
+            str: Caminho do arquivo salvo ou None
+        """
+        if self.limitador:
+            resumo_limitador = self.limitador.resumo()
+            print(f"\n🪣 Limitador ({self.nome_api}): taxa média final {resumo_limitador['taxa_media']:.2f} req/s por token | "
+                  f"{resumo_limitador['reducoes_403']} redução(ões) por 403/429")
+        
+        resumo_politica = self.politica.resumo()
+        if resumo_politica['retries_usados'] or resumo_politica['aberturas_unidade'] or resumo_politica['aberturas_endpoint']:
+            print(f"🔁 Retries ({self.nome_api}): {resumo_politica['retries_usados']} usado(s) | "
+                  f"circuitos abertos: {resumo_politica['aberturas_unidade']} unidade(s), "
+                  f"{resumo_politica['aberturas_endpoint']} endpoint")
+        
+        if self.cache:
+            self.cache.salvar()
+            estatisticas_cache = {
+                tipo: quantidade - self.estatisticas_cache_inicio[tipo]
+                for tipo, quantidade in self.cache.obter_estatisticas(self.nome_api).items()
+            }
+            print(f"💾 Cache de respostas: {estatisticas_cache['hits']} hit(s) | {estatisticas_cache['misses']} miss(es)")
+            if self.tracker:
+                self.tracker.registrar_cache(self.nome_api, **estatisticas_cache)
+
+        # Consolidação e salvamento
+        caminho_arquivo = _finalizar_extracao(
+            self.escritor, self.erros, self.erros_403_persistentes, self.nome_api, self.caminho_to_save,
+            self.schema
+        )
+        
+        # Arquivo final salvo: o checkpoint do endpoint não é mais necessário.
+        # Sem journal, as partes não servem para retomada e são sempre descartadas
+        if caminho_arquivo and self.journal:
+            self.journal.limpar()
+        if caminho_arquivo or not self.journal:
+            self.escritor.limpar()
+        
+        return caminho_arquivo
+
 
 def extrair_dados_api(
     diretorio_arquivo_competencia,
@@ -311,13 +1136,25 @@ def extrair_dados_api(
     max_tentativas_403=4,
     backoff_inicial=2.0,
     agrupar_por_unidade=True,
-    delay_entre_unidades=2.0
+    delay_entre_unidades=2.0,
+    max_workers=1,
+    limites_taxa=None,
+    max_competencias_por_requisicao=1,
+    backend=None,
+    usar_checkpoint=True,
+    agendador=None,
+    politica_retry=None,
+    schema=None,
+    plano=None,
+    filtro_unidades=None,
+    achatamento=None,
+    streaming=None
 ):
     """
     Função genérica para extrair dados de qualquer API com retry automático
     
     Args:
-        diretorio_arquivo_competencia: Caminho do Excel com competências
+        diretorio_arquivo_competencia: Caminho do Excel com competências (lido só se plano for None)
         caminho_to_save: Diretório para salvar o resultado
         nome_api: Nome da API (ex: "Consumo", "Folha")
         env_var_url: Nome da variável de ambiente com a URL base
@@ -330,6 +1167,36 @@ def extrair_dados_api(
         backoff_inicial: Tempo inicial de espera entre tentativas (dobra a cada retry)
         agrupar_por_unidade: Se True, processa todas competências de uma unidade antes de passar para próxima
         delay_entre_unidades: Delay maior ao mudar de unidade (em segundos)
+        max_workers: Unidades processadas em paralelo (1 = serial, comportamento original)
+        limites_taxa: Dicionário 'rate_limit' do APIS_CONFIG; quando informado, um limitador
+                      adaptativo (token bucket por token + global) substitui os delays fixos
+        max_competencias_por_requisicao: Quantas competências consecutivas de uma unidade podem ir
+                                         numa única requisição (competenciaInicial → competenciaFinal).
+                                         1 = uma requisição por competência
+        backend: 'serial', 'threads' ou 'async'. Padrão: 'threads' se max_workers > 1, senão 'serial'.
+                 No 'async' (requer aiohttp) max_workers é o limite de requisições simultâneas.
+                 Ignorado com agendador: vale o backend do AgendadorGlobal, comum a todos
+        usar_checkpoint: Se True, grava cada competência concluída num journal em disco e, numa
+                         nova execução após queda, retoma sem refazer as requisições concluídas
+        politica_retry: Dicionário 'retry' do APIS_CONFIG (tentativas por status/timeout/conexão,
+                        orçamento de retries e circuit breakers). None = só 403 e timeout
+        schema: Dicionário 'schema' do APIS_CONFIG; os 'tipos' declarados são aplicados
+                às colunas antes de gravar o CSV
+        agendador: AgendadorGlobal opcional. Quando informado, a extração é apenas preparada e
+                   registrada nele (retorna None); as requisições e o CSV ficam a cargo de
+                   agendador.executar(), intercaladas com as dos demais endpoints
+        plano: PlanoExtracao já montado (compartilhado por todos os endpoints da execução);
+               se None, é montado a partir de diretorio_arquivo_competencia
+        filtro_unidades: Dicionário 'filtro_unidades' do APIS_CONFIG (unidades que o endpoint
+                         atende), aplicado em memória sobre o plano
+        achatamento: Dicionário 'achatamento' do APIS_CONFIG (listas aninhadas da resposta
+                     → tabela única); substitui processar_func para respostas sem 'items'
+        streaming: Dicionário 'streaming' do APIS_CONFIG ({'tamanho_lote': N}); a lista 'items'
+                   é lida do socket incrementalmente e gravada em lotes de N registros, com
+                   memória limitada a um lote (backends serial/threads e agendador com threads)
+    
+    Returns:
+        str: Caminho do arquivo salvo ou None
     """
     
     print(f"\n{'='*60}")
@@ -337,7 +1204,7 @@ def extrair_dados_api(
     print(f"{'='*60}\n")
     
     # Validações iniciais
-    if not os.path.exists(diretorio_arquivo_competencia):
+    if plano is None and not os.path.exists(diretorio_arquivo_competencia):
         print(f"❌ Arquivo não encontrado: {diretorio_arquivo_competencia}")
         return None
     
@@ -350,346 +1217,233 @@ def extrair_dados_api(
         print(f"❌ Variável de ambiente '{env_var_url}' não configurada!")
         return None
 
-    # Leitura do arquivo de competências
-    try:
-        df_consolidado = pd.read_excel(diretorio_arquivo_competencia)
-    except Exception as e:
-        print(f"❌ Erro ao ler arquivo de competências: {e}")
-        return None
+    # Leitura do arquivo de competências (só quando o plano não foi montado antes)
+    if plano is None:
+        try:
+            plano = PlanoExtracao.de_arquivo(diretorio_arquivo_competencia)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return None
+        except Exception as e:
+            print(f"❌ Erro ao ler arquivo de competências: {e}")
+            return None
     
-    # Validação de colunas necessárias
-    colunas_necessarias = ['unidade_id', 'token', 'competencia', 'nome', 'situacao']
-    colunas_faltantes = [col for col in colunas_necessarias if col not in df_consolidado.columns]
-    if colunas_faltantes:
-        print(f"❌ Colunas faltantes no arquivo: {colunas_faltantes}")
+    if len(plano) == 0:
+        print("⚠️ Nenhuma competência fechada encontrada")
         return None
-
-    # Filtra apenas competências fechadas
-    df_consolidado = df_consolidado[df_consolidado['situacao'] != "ABERTA"]
+    
+    # Competências do endpoint: já ordenadas por unidade se solicitado
+    df_consolidado = plano.para_endpoint(nome_api, agrupar_por_unidade, filtro_unidades)
     
     if df_consolidado.empty:
-        print("⚠️ Nenhuma competência fechada encontrada")
+        print(f"❌ Nenhuma unidade aplicável encontrada para {nome_api}")
+        if filtro_unidades and filtro_unidades.get('incluir'):
+            print(f"   Este relatório requer unidades com: {', '.join(filtro_unidades['incluir'])}")
         return None
     
-    # Reordena para agrupar por unidade se solicitado
     if agrupar_por_unidade:
-        df_consolidado = df_consolidado.sort_values(['unidade_id', 'competencia']).reset_index(drop=True)
         print(f"📋 Processamento agrupado por unidade")
     
+    # Resposta aninhada declarada no APIS_CONFIG: achatada pelo processador genérico
+    if achatamento and processar_func is None:
+        processar_func = criar_processador(achatamento)
+    
+    limitador = None
+    if limites_taxa:
+        limitador = LimitadorAdaptativo(limites_taxa, nome_api=nome_api)
+        # O ritmo passa a ser controlado pelos buckets
+        delay_entre_chamadas = 0
+        delay_entre_unidades = 0
+    
     print(f"📊 Total de competências a processar: {len(df_consolidado)}")
     print(f"🔄 Retry automático: {max_tentativas_403} tentativas para erros 403")
-    print(f"⏱️ Delay entre requisições: {delay_entre_chamadas}s")
-    if agrupar_por_unidade:
-        print(f"⏱️ Delay entre unidades: {delay_entre_unidades}s")
+    if politica_retry:
+        politicas = ', '.join(str(chave) for chave in politica_retry.get('politicas', {}))
+        print(f"🔁 Política de retry: {politicas or 'padrão'} | "
+              f"orçamento: {politica_retry.get('orcamento_retries', 'ilimitado')} retries")
+    if limitador:
+        print(f"🪣 Limitador adaptativo: {limites_taxa.get('taxa_inicial', 1.0)} req/s por token "
+              f"(mín {limites_taxa.get('taxa_minima', 0.1)} | máx {limites_taxa.get('taxa_maxima', 5.0)})")
+    else:
+        print(f"⏱️ Delay entre requisições: {delay_entre_chamadas}s")
+        if agrupar_por_unidade:
+            print(f"⏱️ Delay entre unidades: {delay_entre_unidades}s")
+    if backend is None:
+        backend = 'threads' if max_workers > 1 else 'serial'
+    
+    if agendador is not None:
+        if backend == 'async' and agendador.backend != 'async':
+            print(f"⚠️ Backend 'async' ignorado: o agendador global usa '{agendador.backend}' para todos os endpoints")
+        backend = 'agendador'
+    
+    if backend == 'async':
+        from modules.api_extractor_async import backend_async_disponivel
+        if not backend_async_disponivel():
+            print("⚠️ Backend 'async' requer o pacote aiohttp - usando o modo serial")
+            backend = 'serial'
+    
+    # Backend assíncrono (próprio ou do agendador): respostas lidas inteiras, sem streaming
+    leitura_async = backend == 'async' or (backend == 'agendador' and agendador.backend == 'async')
+    
+    if backend == 'async':
+        print(f"⚡ Backend assíncrono: até {max_workers} requisições simultâneas")
+    elif backend == 'threads':
+        print(f"🧵 Modo concorrente: até {max_workers} unidades em paralelo")
+    elif backend == 'agendador':
+        print(f"🗓️ Requisições enviadas ao agendador global ({agendador.backend}, intercaladas com os demais endpoints)")
+    if max_competencias_por_requisicao > 1 and processar_func is None:
+        print(f"📦 Agrupamento de competências: até {max_competencias_por_requisicao} por requisição")
+    if streaming and processar_func is None:
+        if leitura_async:
+            print(f"ℹ️ Leitura em streaming indisponível no backend async - respostas lidas inteiras")
+        else:
+            tamanho_lote = (streaming if isinstance(streaming, dict) else {}).get('tamanho_lote', TAMANHO_LOTE_PADRAO)
+            print(f"🌊 Leitura em streaming: lotes de até {tamanho_lote} registros")
     print()
 
-    dados_extraidos = []
-    total = len(df_consolidado)
-    erros = []
-    erros_403_persistentes = []
+    extracao = ExtracaoEndpoint(
+        df_consolidado=df_consolidado,
+        caminho_to_save=caminho_to_save,
+        nome_api=nome_api,
+        url_base=url_base,
+        payload_func=payload_func,
+        processar_func=processar_func,
+        timeout=timeout,
+        tracker=tracker,
+        delay_entre_chamadas=delay_entre_chamadas,
+        max_tentativas_403=max_tentativas_403,
+        backoff_inicial=backoff_inicial,
+        delay_entre_unidades=delay_entre_unidades,
+        limitador=limitador,
+        max_competencias_por_requisicao=max_competencias_por_requisicao,
+        usar_checkpoint=usar_checkpoint,
+        politica_retry=politica_retry,
+        schema=schema,
+        streaming=streaming if not leitura_async else None
+    )
+    
+    if backend == 'agendador':
+        agendador.adicionar(extracao)
+        return None
     
-    # arquivo_curl = os.path.join(caminho_to_save, f"curls_erro_403_{nome_api}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+    if backend == 'async':
+        extracao.executar_async(max_workers)
+    elif backend == 'threads':
+        extracao.executar_threads(max_workers)
+    else:
+        extracao.executar_serial(agrupar_por_unidade)
     
-    unidade_anterior = None
+    return extracao.finalizar()
 
-    # Loop pelas unidades
-    for idx, unidade in df_consolidado.iterrows():
-        id_unidade = unidade['unidade_id']
-        token = unidade['token']
-        nome_unidade = unidade['nome']
-        competencia = unidade['competencia']
-        
-        # Detecta mudança de unidade e adiciona delay maior
-        if agrupar_por_unidade and unidade_anterior is not None and unidade_anterior != id_unidade:
-            print(f"\n🔄 Mudando de unidade (delay de {delay_entre_unidades}s)...\n")
-            time.sleep(delay_entre_unidades)
-        
-        unidade_anterior = id_unidade
-        
-        print(f"🔄 [{idx + 1}/{total}] {nome_unidade} - {competencia}")
+
+# Code points que não existem em UTF-8 (surrogates isolados vindos de JSON malformado)
+_CODEPOINTS_INVALIDOS = '[\ud800-\udfff]'
+
+
+def sanitizar_encoding(df):
+    """
+    Remove code points inválidos em UTF-8 das colunas texto, coluna a coluna
+    
+    Cada coluna é testada de uma vez (um único encode do texto concatenado);
+    só as colunas que falham são percorridas, e só as células com caracteres
+    inválidos são reescritas.
+    
+    Args:
+        df: DataFrame (alterado no lugar)
+    
+    Returns:
+        tuple: (df, quantidade de células alteradas)
+    """
+    celulas_alteradas = 0
+    
+    # 'string' inclui o dtype str padrão do pandas 3 (com armazenamento python,
+    # que aceita surrogates); 'object' cobre as versões anteriores e colunas mistas
+    for col in df.select_dtypes(include=['object', 'string']).columns:
+        serie = df[col]
+        textos = serie.dropna()
+        if pd.api.types.infer_dtype(textos, skipna=True) != 'string':
+            textos = textos[textos.map(type) == str]
+        if textos.empty:
+            continue
         
-        # Monta payload específico da API
         try:
-            payload = payload_func(unidade)
-            # print(f"\n{'='*60}")
-            # print(f"🔍 DEBUG - Detalhes da requisição:")
-            # print(f"   Unidade: {nome_unidade} (ID: {id_unidade})")
-            # print(f"   Competência: {competencia}")
-            # print(f"   URL completa: {url_base}")
-            # print(f"   Payload enviado:")
-            # print(f"   {json.dumps(payload, indent=6, ensure_ascii=False)}")
-            # print(f"{'='*60}\n")
-        except Exception as e:
-            erro_msg = f"Erro ao montar payload - {e}"
-            erros.append(f"{nome_unidade}: {erro_msg}")
-            print(f"   ⚠️ {erro_msg}")
-            
-            if tracker:
-                tracker.registrar_execucao(
-                    endpoint=nome_api,
-                    unidade=nome_unidade,
-                    competencia=competencia,
-                    status='erro',
-                    erro=erro_msg
-                )
+            '\x00'.join(textos).encode('utf-8')
             continue
+        except UnicodeEncodeError:
+            pass
+        
+        mascara = serie.str.contains(_CODEPOINTS_INVALIDOS, regex=True, na=False)
+        df.loc[mascara, col] = serie[mascara].str.encode('utf-8', errors='ignore').str.decode('utf-8')
+        celulas_alteradas += int(mascara.sum())
+    
+    return df, celulas_alteradas
 
-        url = f"{url_base}{id_unidade}"
-        # print(f"   URL completa: {url}")
 
-        headers = {"Authorization": f"Bearer {token}"}
+def _transformar_parte(df_parte, nome_api, df_unidades, estatisticas_de_para, estatisticas_encoding=None,
+                       schema=None, incluir_categorias=False):
+    """
+    Aplica a uma parte as mesmas transformações da consolidação: DE-PARA,
+    padronização da competência, exclusão de colunas e normalização de encoding
+    
+    Returns:
+        DataFrame pronto para ser anexado ao CSV
+    """
+    if df_unidades is not None:
+        df_parte = aplicar_de_para_unidades(
+            df_parte,
+            coluna_unidade='unidade',
+            df_unidades=df_unidades,
+            estatisticas=estatisticas_de_para
+        )
+    
+    # converte a coluna de comptencia para deixar no formato 01/2025
+    if 'competencia' in df_parte.columns:
+        df_parte['competencia'] = padronizar_serie_competencia(df_parte['competencia'])
 
-        # print(f"\n{'='*60}")
-        # print(f"🔍 DEBUG - Detalhes da requisição:")
-        # print(f"   Unidade: {nome_unidade} (ID: {id_unidade})")
-        # print(f"   Competência: {competencia}")
-        # print(f"   URL completa: {url}")
-        # print(f"   Payload enviado:")
-        # print(f"   {json.dumps(payload, indent=6, ensure_ascii=False)}")
-        # print(f"Headers: {headers}")
-        # print(f"{'='*60}\n")
+    # excluir colunas desnecessárias
+    colunas_para_excluir = ['NomeCompletoUnidade', 'competencia']
+    apis_que_precisam_manter_competencia = ['benchmarkcomposicaodecustos', 'painelcomparativodecustos']
+    for coluna in colunas_para_excluir:
+        if coluna in df_parte.columns:
+            if coluna == 'competencia' and nome_api.lower() in apis_que_precisam_manter_competencia:
+                continue    
+            df_parte = df_parte.drop(columns=[coluna])
 
-        try:
-            # Usa função com retry
-            response, tempo_execucao, tentativa = fazer_requisicao_com_retry(
-                url=url,
-                headers=headers,
-                payload=payload,
-                timeout=timeout,
-                max_tentativas=max_tentativas_403,
-                backoff_inicial=backoff_inicial,
-                nome_unidade=nome_unidade,
-                competencia=competencia
-            )
-            
-            if response.status_code == 200:
-                try:
-                    dados = response.json()
-
-                    # # ===== ADICIONE ESTE DEBUG AQUI =====
-                    # print(f"   🔍 DEBUG - Estrutura da resposta:")
-                    # print(f"   Tipo: {type(dados)}")
-                    # print(f"   Chaves: {dados.keys() if isinstance(dados, dict) else 'Não é dict'}")
-                    # print(f"   Conteúdo (primeiros 500 chars): {str(dados)[:500]}")
-                    # # ===================================
-                    
-                    # Processa response (customizado ou padrão)
-                    if processar_func:
-                        df_dados = processar_func(dados, unidade)
-                    else:
-                        # Processamento padrão
-                        if 'items' in dados and dados['items']:
-                            df_dados = pd.DataFrame(dados['items'])
-                            df_dados['unidade'] = nome_unidade
-                            df_dados['competencia'] = competencia
-                        else:
-                            print(f"   ⚠️ Resposta sem dados")
-                            
-                            if tracker:
-                                tracker.registrar_execucao(
-                                    endpoint=nome_api,
-                                    unidade=nome_unidade,
-                                    competencia=competencia,
-                                    status='sem_dados',
-                                    tempo_execucao=tempo_execucao
-                                )
-                            continue
-                    
-                    if df_dados is not None and not df_dados.empty:
-                        dados_extraidos.append(df_dados)
-                        qtd_registros = len(df_dados)
-                        print(f"   ✅ {qtd_registros} registros coletados")
-                        
-                        if tracker:
-                            tracker.registrar_execucao(
-                                endpoint=nome_api,
-                                unidade=nome_unidade,
-                                competencia=competencia,
-                                status='sucesso',
-                                registros=qtd_registros,
-                                tempo_execucao=tempo_execucao
-                            )
-                    else:
-                        print(f"   ⚠️ Nenhum dado retornado")
-                        
-                        if tracker:
-                            tracker.registrar_execucao(
-                                endpoint=nome_api,
-                                unidade=nome_unidade,
-                                competencia=competencia,
-                                status='sem_dados',
-                                tempo_execucao=tempo_execucao
-                            )
-                        
-                except (ValueError, KeyError) as e:
-                    erro_msg = f"Erro ao processar JSON - {e}"
-                    erros.append(f"{nome_unidade}: {erro_msg}")
-                    print(f"   ⚠️ {erro_msg}")
-                    
-                    if tracker:
-                        tracker.registrar_execucao(
-                            endpoint=nome_api,
-                            unidade=nome_unidade,
-                            competencia=competencia,
-                            status='erro',
-                            erro=erro_msg,
-                            tempo_execucao=tempo_execucao
-                        )
-                    
-            elif response.status_code == 401:
-                erro_msg = "Token inválido"
-                erros.append(f"{nome_unidade}: {erro_msg}")
-                print(f"   ❌ {erro_msg}")
-                
-                if tracker:
-                    tracker.registrar_execucao(
-                        endpoint=nome_api,
-                        unidade=nome_unidade,
-                        competencia=competencia,
-                        status='erro',
-                        erro=f"HTTP 401 - {erro_msg}",
-                        tempo_execucao=tempo_execucao
-                    )
+    # excluir as duas ultimas colunas se o nome for Unidade e Competencia
+    if df_parte.columns[-1].lower() == 'competencia' and df_parte.columns[-2].lower() == 'Unidade':
+        df_parte = df_parte.iloc[:, :-2]
 
-            elif response.status_code == 500:
-                # Erro 500 geralmente indica que:
-                # 1. A competência solicitada não está disponível para extração
-                # 2. O tipo de relatório não é aplicável para esta unidade
-                try:
-                    response_data = response.json()
-                    erro_detalhes = response_data.get('message', 'Sem detalhes')
-                except:
-                    erro_detalhes = 'Não foi possível obter detalhes do erro'
-                
-                erro_msg = f"Competência indisponível ou relatório não aplicável - {erro_detalhes}"
-                erros.append(f"{nome_unidade}: {erro_msg}")
-                print(f"   ⚠️ {erro_msg}")
-                print(f"   💡 Possíveis causas:")
-                print(f"      • Competência {competencia} ainda não processada para este relatório")
-                print(f"      • Tipo de unidade incompatível (ex: UBS/UPA sem linha de contratação)")
-                
-                if tracker:
-                    tracker.registrar_execucao(
-                        endpoint=nome_api,
-                        unidade=nome_unidade,
-                        competencia=competencia,
-                        status='indisponivel',
-                        erro=erro_msg,
-                        tempo_execucao=tempo_execucao
-                    )
-            
-            elif response.status_code == 403:
-                # Salva cURL apenas para 403 que persistiram após todas as tentativas
-                erro_msg = f"Erro HTTP 403 (após {tentativa} tentativas)"
-                erros.append(f"{nome_unidade}: {erro_msg}")
-                erros_403_persistentes.append(f"{nome_unidade} - {competencia}")
-                
-                # curl_command = gerar_curl(url, headers, payload)
-                
-                # with open(arquivo_curl, 'a', encoding='utf-8') as f:
-                #     f.write(f"\n{'='*80}\n")
-                #     f.write(f"API: {nome_api}\n")
-                #     f.write(f"Unidade: {nome_unidade}\n")
-                #     f.write(f"Competência: {competencia}\n")
-                #     f.write(f"Data/Hora: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                #     f.write(f"Status: 403 Forbidden (após {tentativa} tentativas)\n")
-                #     # f.write(f"\ncURL:\n{curl_command}\n")
-                #     f.write(f"{'='*80}\n")
-                
-                # print(f"   💾 cURL salvo em: {arquivo_curl}")
-                
-                if tracker:
-                    tracker.registrar_execucao(
-                        endpoint=nome_api,
-                        unidade=nome_unidade,
-                        competencia=competencia,
-                        status='erro',
-                        erro=erro_msg,
-                        tempo_execucao=tempo_execucao
-                    )
-                    
-            elif response.status_code == 404:
-                erro_msg = "Endpoint não encontrado"
-                erros.append(f"{nome_unidade}: {erro_msg}")
-                print(f"   ❌ {erro_msg}")
-                
-                if tracker:
-                    tracker.registrar_execucao(
-                        endpoint=nome_api,
-                        unidade=nome_unidade,
-                        competencia=competencia,
-                        status='erro',
-                        erro=f"HTTP 404 - {erro_msg}",
-                        tempo_execucao=tempo_execucao
-                    )
-            else:
-                erro_msg = f"Erro HTTP {response.status_code}"
-                erros.append(f"{nome_unidade}: {erro_msg}")
-                print(f"   ❌ {erro_msg}")
-                
-                if tracker:
-                    tracker.registrar_execucao(
-                        endpoint=nome_api,
-                        unidade=nome_unidade,
-                        competencia=competencia,
-                        status='erro',
-                        erro=erro_msg,
-                        tempo_execucao=tempo_execucao
-                    )
+    # Normaliza encoding das colunas texto (só as células com caracteres inválidos)
+    df_parte, celulas_alteradas = sanitizar_encoding(df_parte)
+    if estatisticas_encoding is not None:
+        estatisticas_encoding['celulas_alteradas'] += celulas_alteradas
+    
+    # Tipos declarados no schema do endpoint ('category' só compensa fora do CSV)
+    df_parte = aplicar_schema(df_parte, schema, incluir_categorias=incluir_categorias)
+    
+    return df_parte
 
-        except requests.exceptions.Timeout:
-            tempo_execucao = timeout
-            erro_msg = f"Timeout (>{timeout}s) após {max_tentativas_403} tentativas"
-            erros.append(f"{nome_unidade}: {erro_msg}")
-            print(f"   ⏱️ {erro_msg}")
-
-            if tracker:
-                tracker.registrar_execucao(
-                    endpoint=nome_api,
-                    unidade=nome_unidade,
-                    competencia=competencia,
-                    status='timeout',
-                    erro=erro_msg,
-                    tempo_execucao=tempo_execucao
-                )
-                
-        except requests.exceptions.RequestException as e:
-            erro_msg = f"Erro na requisição - {str(e)[:100]}"
-            erros.append(f"{nome_unidade}: {erro_msg}")
-            print(f"   ❌ {erro_msg}")
-            
-            if tracker:
-                tracker.registrar_execucao(
-                    endpoint=nome_api,
-                    unidade=nome_unidade,
-                    competencia=competencia,
-                    status='erro',
-                    erro=erro_msg,
-                    tempo_execucao=0
-                )
-                
-        except Exception as e:
-            erro_msg = f"Erro inesperado - {str(e)[:100]}"
-            erros.append(f"{nome_unidade}: {erro_msg}")
-            print(f"   ⚠️ {erro_msg}")
-            
-            if tracker:
-                tracker.registrar_execucao(
-                    endpoint=nome_api,
-                    unidade=nome_unidade,
-                    competencia=competencia,
-                    status='erro',
-                    erro=erro_msg,
-                    tempo_execucao=0
-                )
-        
-        # Delay entre requisições (exceto na última)
-        if idx < total - 1:
-            print(f"   ⏳ Aguardando {delay_entre_chamadas}s antes da próxima requisição...")
-            time.sleep(delay_entre_chamadas)
-
-    # Consolidação e salvamento
-    if not dados_extraidos:
+
+def _finalizar_extracao(escritor, erros, erros_403_persistentes, nome_api, caminho_to_save, schema=None):
+    """
+    Consolida as partes gravadas em disco, aplica DE-PARA/padronizações e salva o CSV
+    
+    As partes são lidas e anexadas ao CSV (ou gravadas como row groups do
+    Parquet) uma por vez, então o pico de memória é o de uma resposta, não o do
+    endpoint inteiro.
+    
+    Args:
+        escritor: EscritorPartes com as partes (uma por competência com dados)
+        erros: Lista de mensagens de erro da extração
+        erros_403_persistentes: Lista de "unidade - competência" com 403 após os retries
+        nome_api: Nome da API (define o nome do arquivo)
+        caminho_to_save: Diretório para salvar o resultado
+        schema: Schema do endpoint (APIS_CONFIG) aplicado a cada parte
+    
+    Returns:
+        str: Caminho do arquivo salvo ou None
+    """
+    if len(escritor) == 0:
         print(f"\n❌ Nenhum dado de {nome_api} foi extraído")
         if erros:
             print(f"\n⚠️ Erros encontrados ({len(erros)}):")
@@ -701,22 +1455,23 @@ def extrair_dados_api(
             for erro_403 in erros_403_persistentes[:10]:
                 print(f"   - {erro_403}")
         
-        # if os.path.exists(arquivo_curl):
-        #     print(f"\n📋 Arquivo com cURLs de erros 403 gerado:")
-        #     print(f"   {arquivo_curl}")
-        
         return None
     
+    caminho_temporario = None
+    
     try:
-        df_final = pd.concat(dados_extraidos, ignore_index=True)
-
         print(f"\n{'='*60}")
         print(f"🔄 Aplicando DE-PARA de unidades...")
         print(f"{'='*60}")
         
-        df_final = aplicar_de_para_unidades(df_final, coluna_unidade='unidade')
-        
-        print(f"{'='*60}\n")
+        # DE-PARA carregado uma única vez para todas as partes
+        df_unidades = carregar_de_para_unidades()
+        if df_unidades is None:
+            print("⚠️ Continuando sem aplicar DE-PARA de unidades")
+        elif identificar_coluna_de_para(df_unidades) is None:
+            print(f"⚠️ Não foi possível identificar a coluna de nome da unidade")
+            print(f"   Colunas disponíveis: {df_unidades.columns.tolist()}")
+            df_unidades = None
         
         # Calcula mês/ano anterior
         data_execucao = datetime.today()
@@ -732,43 +1487,55 @@ def extrair_dados_api(
 
         mes_e_ano = f"{mes_anterior:02d}_{ano_anterior}"
 
-        # converte a coluna de comptencia para deixar no formato 01/2025
-        if 'competencia' in df_final.columns:
-            print(f"\n🔄 Padronizando formato da competência...")
-            df_final['competencia'] = df_final['competencia'].apply(padronizar_competencia)
-            print(f"✅ Competências padronizadas para formato MM/YYYY")
-
-        # excluir colunas desnecessárias
-        colunas_para_excluir = ['NomeCompletoUnidade', 'competencia']
-        apis_que_precisam_manter_competencia = ['benchmarkcomposicaodecustos', 'painelcomparativodecustos']
-        for coluna in colunas_para_excluir:
-            if coluna in df_final.columns:
-                if coluna == 'competencia' and nome_api.lower() in apis_que_precisam_manter_competencia:
-                    continue    
-                df_final = df_final.drop(columns=[coluna])
-
-        # excluir as duas ultimas colunas se o nome for Unidade e Competencia
-        if df_final.columns[-1].lower() == 'competencia' and df_final.columns[-2].lower() == 'Unidade':
-            df_final = df_final.iloc[:, :-2]
-
         # Define nome e caminho do arquivo
-        nome_arquivo = f"api_{nome_api.lower()}_{mes_e_ano}.csv"
+        nome_arquivo = f"api_{nome_api.lower()}_{mes_e_ano}{extensao_saida()}"
         caminho_arquivo = os.path.join(caminho_to_save, nome_arquivo)
+        caminho_temporario = caminho_arquivo + '.tmp'
 
-        # Normaliza encoding de todas as colunas texto
-        #x não é a coluna inteira, mas sim cada valor individual (cada célula) dentro daquela coluna
-        print(f"🔄 Normalizando encoding dos dados...")
-        for col in df_final.select_dtypes(include=['object']).columns:
-            df_final[col] = df_final[col].apply(
-                lambda x: x.encode('utf-8', errors='ignore').decode('utf-8') if isinstance(x, str) else x
-            )
-
-        # Salva o arquivo
-        df_final.to_csv(caminho_arquivo, index=False, sep=';', encoding='utf-8-sig')
+        print(f"🔄 Consolidando {len(escritor)} parte(s) em disco "
+              f"(padronizando competência e normalizando encoding)...")
+        
+        estatisticas_de_para = {'total': 0, 'com_match': 0, 'sem_match': {}}
+        estatisticas_encoding = {'celulas_alteradas': 0}
+        total_registros = 0
+        
+        if caminho_arquivo.endswith('.parquet'):
+            # Parquet: cada parte transformada (colunas descritivas como 'category')
+            # vira um row group, com o schema do arquivo fixado antes da gravação
+            def partes_transformadas(contabilizar):
+                for df_parte in escritor.ler_partes():
+                    yield _transformar_parte(
+                        df_parte, nome_api, df_unidades,
+                        estatisticas_de_para if contabilizar else {'total': 0, 'com_match': 0, 'sem_match': {}},
+                        estatisticas_encoding if contabilizar else None,
+                        schema, incluir_categorias=True
+                    )
+            
+            total_registros = salvar_partes_parquet(partes_transformadas, caminho_arquivo)
+        else:
+            # Salva o arquivo: cada parte é transformada e anexada ao CSV
+            with open(caminho_temporario, 'w', encoding='utf-8-sig', newline='') as arquivo:
+                for indice, df_parte in enumerate(escritor.ler_partes()):
+                    df_parte = _transformar_parte(
+                        df_parte, nome_api, df_unidades, estatisticas_de_para, estatisticas_encoding, schema
+                    )
+                    df_parte.to_csv(arquivo, index=False, sep=';', header=(indice == 0))
+                    total_registros += len(df_parte)
+                    del df_parte
+            
+            os.replace(caminho_temporario, caminho_arquivo)
+        
+        if df_unidades is not None:
+            imprimir_resumo_de_para(estatisticas_de_para)
+        print(f"✅ Competências padronizadas para formato MM/YYYY")
+        if estatisticas_encoding['celulas_alteradas']:
+            print(f"🔤 Encoding: {estatisticas_encoding['celulas_alteradas']} célula(s) com caracteres inválidos corrigida(s)")
+        else:
+            print(f"🔤 Encoding: nenhuma célula com caracteres inválidos")
         
         print(f"\n{'='*60}")
         print(f"✅ {nome_api} extraído com sucesso!")
-        print(f"📊 Total de registros: {len(df_final)}")
+        print(f"📊 Total de registros: {total_registros}")
         print(f"📍 Arquivo: {caminho_arquivo}")
         if erros:
             print(f"⚠️ Houve {len(erros)} erro(s) durante a extração")
@@ -776,14 +1543,12 @@ def extrair_dados_api(
         if erros_403_persistentes:
             print(f"🚨 {len(erros_403_persistentes)} erro(s) 403 persistentes (após retries)")
         
-        # if os.path.exists(arquivo_curl):
-        #     print(f"📋 Arquivo com cURLs de erros 403:")
-        #     print(f"   {arquivo_curl}")
-        
         print(f"{'='*60}\n")
         
         return caminho_arquivo
         
     except Exception as e:
         print(f"❌ Erro ao salvar arquivo: {e}")
-        return None
\ No newline at end of file
+        if caminho_temporario and os.path.exists(caminho_temporario):
+            os.remove(caminho_temporario)
+        return None
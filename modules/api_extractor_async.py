@@ -0,0 +1,359 @@
+"""
+Backend assíncrono (asyncio + aiohttp) para o extrator genérico
+
+Executa as requisições pendentes de um endpoint num único event loop, com um
+semáforo limitando quantas ficam em voo ao mesmo tempo. Com o agendador global
+(backend='async'), as lanes de todos os endpoints dividem o mesmo loop. Usa os mesmos
+payload_func / processar_func do APIS_CONFIG e as mesmas regras de tratamento
+de resposta do backend síncrono (modules.api_extractor).
+"""
+import asyncio
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from modules.response_cache import obter_cache, SITUACAO_CACHEAVEL
+from modules.retry_policy import PoliticaRetry
+from modules.json_rapido import carregar_json
+from modules.http_session import medir_trafego
+from modules.api_extractor import (
+    _novo_resultado,
+    _interpretar_resposta,
+    _registrar_falha_requisicao,
+    _montar_payload,
+    _montar_payload_faixa,
+    _situacao_faixa,
+    _dividir_resultado_faixa
+)
+
+
+def backend_async_disponivel():
+    """Indica se o aiohttp está instalado"""
+    return aiohttp is not None
+
+
+async def _requisitar_async(
+    sessao,
+    semaforo,
+    url,
+    headers,
+    payload,
+    timeout,
+    politica,
+    limitador=None
+):
+    """
+    Equivalente assíncrono de fazer_requisicao_com_retry
+
+    O aiohttp já anuncia e descomprime gzip/deflate (e brotli, se instalado); os
+    bytes que vieram pela rede são os do Content-Length da resposta comprimida.
+
+    Returns:
+        tuple: (status_code, corpo_bytes, tempo_execucao, tentativa, trafego)
+    """
+    chave_limitador = headers.get("Authorization", "")
+    tentativa = 0
+
+    while True:
+        tentativa += 1
+
+        if limitador:
+            espera = limitador.reservar(chave_limitador)
+            if espera > 0:
+                await asyncio.sleep(espera)
+
+        inicio = time.time()
+
+        try:
+            async with semaforo:
+                async with sessao.post(
+                    url,
+                    headers=headers,
+                    json=payload,
+                    timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as resposta:
+                    status_code = resposta.status
+                    corpo = await resposta.read()
+                    tamanho_declarado = resposta.headers.get('Content-Length', '')
+                    trafego = {
+                        'bytes_comprimidos': int(tamanho_declarado) if tamanho_declarado.isdigit() else len(corpo),
+                        'bytes_descomprimidos': len(corpo),
+                        'codificacao': resposta.headers.get('Content-Encoding', 'identity')
+                    }
+            tempo_execucao = time.time() - inicio
+
+            if limitador:
+                limitador.registrar_resposta(chave_limitador, status_code)
+
+            if status_code == 200 or politica.regra(status_code) is None:
+                if tentativa > 1 and status_code == 200:
+                    print(f"   ✅ Sucesso na tentativa {tentativa}")
+                return status_code, corpo, tempo_execucao, tentativa, trafego
+
+            limite = politica.tentativas(status_code)
+
+            if not politica.deve_repetir(status_code, tentativa):
+                print(f"   ❌ HTTP {status_code} após {tentativa} tentativa(s)")
+                return status_code, corpo, tempo_execucao, tentativa, trafego
+
+            if status_code == 403 and limitador:
+                print(f"   ⚠️ HTTP 403 (tentativa {tentativa}/{limite}) - reduzindo taxa")
+            else:
+                tempo_total = politica.tempo_espera(status_code, tentativa)
+                print(f"   ⚠️ HTTP {status_code} (tentativa {tentativa}/{limite})")
+                print(f"   ⏳ Aguardando {tempo_total:.1f}s antes de tentar novamente...")
+                await asyncio.sleep(tempo_total)
+
+        except asyncio.TimeoutError:
+            if not politica.deve_repetir('timeout', tentativa):
+                raise
+            tempo_total = politica.tempo_espera('timeout', tentativa)
+            print(f"   ⏱️ Timeout (tentativa {tentativa}/{politica.tentativas('timeout')})")
+            print(f"   ⏳ Aguardando {tempo_total:.0f}s antes de tentar novamente...")
+            await asyncio.sleep(tempo_total)
+
+        except aiohttp.ClientConnectionError:
+            if not politica.deve_repetir('conexao', tentativa):
+                raise
+            tempo_total = politica.tempo_espera('conexao', tentativa)
+            print(f"   🔌 Erro de conexão (tentativa {tentativa}/{politica.tentativas('conexao')})")
+            print(f"   ⏳ Aguardando {tempo_total:.1f}s antes de tentar novamente...")
+            await asyncio.sleep(tempo_total)
+
+
+async def _processar_competencia_async(sessao, semaforo, unidade, contexto, payload=None, processar_func=None,
+                                       situacao=None, competencias=None):
+    """
+    Equivalente assíncrono de _processar_competencia
+
+    Returns:
+        dict: Mesmo formato de resultado do backend síncrono
+    """
+    nome_api = contexto['nome_api']
+    resultado, registrar = _novo_resultado(nome_api, unidade)
+
+    if payload is None:
+        ok, payload = _montar_payload(unidade, contexto['payload_func'], resultado, registrar)
+        if not ok:
+            return resultado
+
+    if situacao is None:
+        situacao = unidade.get('situacao')
+
+    url = f"{contexto['url_base']}{unidade['unidade_id']}"
+    headers = {"Authorization": f"Bearer {unidade['token']}"}
+    timeout = contexto['timeout']
+    max_tentativas_403 = contexto['max_tentativas_403']
+    politica = contexto.get('politica') or PoliticaRetry(
+        None, max_tentativas_403, contexto['backoff_inicial'], nome_api
+    )
+
+    # Circuito aberto: não gasta requisição (nem backoff) com o que não vai dar certo
+    permitido, motivo = politica.permitir(unidade['unidade_id'])
+    if not permitido:
+        _registrar_falha_requisicao('circuito', motivo, unidade, timeout, max_tentativas_403, resultado, registrar)
+        return resultado
+
+    # Competência fechada já guardada: responde do cache sem ir à rede
+    cache = obter_cache() if situacao == SITUACAO_CACHEAVEL else None
+    if cache:
+        chave_cache = cache.gerar_chave(nome_api, unidade['unidade_id'], payload, situacao)
+        resposta_cache = cache.obter(chave_cache, nome_api)
+        if resposta_cache is not None:
+            print(f"   💾 Resposta obtida do cache (competência fechada)")
+            politica.registrar_resultado(unidade['unidade_id'], resposta_cache.status_code)
+            trafego = medir_trafego(resposta_cache)
+            _interpretar_resposta(
+                resposta_cache.status_code, resposta_cache.json, 0.0, 1,
+                unidade, processar_func, resultado, lambda **kwargs: registrar(**kwargs, **trafego)
+            )
+            return resultado
+
+    try:
+        status_code, corpo, tempo_execucao, tentativa, trafego = await _requisitar_async(
+            sessao,
+            semaforo,
+            url=url,
+            headers=headers,
+            payload=payload,
+            timeout=timeout,
+            politica=politica,
+            limitador=contexto['limitador']
+        )
+
+        politica.registrar_resultado(unidade['unidade_id'], status_code)
+
+        if cache and status_code == 200:
+            cache.gravar(
+                chave_cache, nome_api, unidade['unidade_id'], competencias or [unidade['competencia']],
+                situacao, status_code, corpo
+            )
+
+        _interpretar_resposta(
+            status_code, lambda: carregar_json(corpo), tempo_execucao, tentativa,
+            unidade, processar_func, resultado, lambda **kwargs: registrar(**kwargs, **trafego)
+        )
+
+    except asyncio.TimeoutError as e:
+        politica.registrar_resultado(unidade['unidade_id'], 'timeout')
+        _registrar_falha_requisicao('timeout', e, unidade, timeout, politica.tentativas('timeout'), resultado, registrar)
+
+    except aiohttp.ClientError as e:
+        chave = 'conexao' if isinstance(e, aiohttp.ClientConnectionError) else 'requisicao'
+        politica.registrar_resultado(unidade['unidade_id'], chave)
+        _registrar_falha_requisicao('requisicao', e, unidade, timeout, max_tentativas_403, resultado, registrar)
+
+    except Exception as e:
+        politica.registrar_resultado(unidade['unidade_id'], 'inesperado')
+        _registrar_falha_requisicao('inesperado', e, unidade, timeout, max_tentativas_403, resultado, registrar)
+
+    return resultado
+
+
+async def _processar_tarefa_async(sessao, semaforo, tarefa, contexto):
+    """
+    Processa uma tarefa (uma competência ou uma faixa contígua da mesma unidade)
+
+    Returns:
+        list: [(posicao, resultado)]
+    """
+    total = contexto['total']
+
+    if len(tarefa) > 1:
+        payload = _montar_payload_faixa(tarefa, contexto['payload_func'])
+
+        if payload is not None:
+            primeira, ultima = tarefa[0][1], tarefa[-1][1]
+            print(f"🔄 [{tarefa[0][0] + 1}/{total}] {primeira['nome']} - "
+                  f"{primeira['competencia']} → {ultima['competencia']} ({len(tarefa)} competências)")
+            resultado_faixa = await _processar_competencia_async(
+                sessao, semaforo, primeira, contexto, payload=payload,
+                situacao=_situacao_faixa(tarefa),
+                competencias=[unidade['competencia'] for _, unidade in tarefa]
+            )
+
+            divididos = _dividir_resultado_faixa(resultado_faixa, tarefa, contexto['nome_api'])
+            if divididos is not None:
+                return divididos
+
+            print(f"   ↩️ Faixa não pôde ser usada - refazendo mês a mês")
+
+    resultados = []
+    for i, (posicao, unidade) in enumerate(tarefa):
+        if i > 0 and contexto['delay_entre_chamadas']:
+            await asyncio.sleep(contexto['delay_entre_chamadas'])
+        print(f"🔄 [{posicao + 1}/{total}] {unidade['nome']} - {unidade['competencia']}")
+        resultado = await _processar_competencia_async(
+            sessao, semaforo, unidade, contexto, processar_func=contexto['processar_func']
+        )
+        resultados.append((posicao, resultado))
+    return resultados
+
+
+async def _executar_lane_async(sessao, semaforo, tarefas_lane, contexto, resultados):
+    """Executa as tarefas de uma lane (mesma unidade, mesmo token) em sequência"""
+    for i, tarefa in enumerate(tarefas_lane):
+        for posicao, resultado in await _processar_tarefa_async(sessao, semaforo, tarefa, contexto):
+            resultados[posicao] = resultado
+            if contexto.get('ao_concluir'):
+                contexto['ao_concluir'](posicao, resultado)
+        if i < len(tarefas_lane) - 1 and contexto['delay_entre_chamadas']:
+            await asyncio.sleep(contexto['delay_entre_chamadas'])
+
+
+async def _executar_async(tarefas, contexto, max_concorrencia):
+    resultados = [None] * contexto['total']
+
+    lanes = {}
+    for tarefa in tarefas:
+        lanes.setdefault(tarefa[0][1]['unidade_id'], []).append(tarefa)
+
+    semaforo = asyncio.Semaphore(max_concorrencia)
+    conector = aiohttp.TCPConnector(limit=max_concorrencia)
+
+    async with aiohttp.ClientSession(connector=conector) as sessao:
+        # Competências da mesma unidade (mesmo token) continuam sequenciais
+        await asyncio.gather(*(
+            _executar_lane_async(sessao, semaforo, tarefas_lane, contexto, resultados)
+            for tarefas_lane in lanes.values()
+        ))
+
+    return resultados
+
+
+def executar_tarefas_async(tarefas, contexto, max_concorrencia=10):
+    """
+    Executa todas as tarefas de um endpoint num event loop
+
+    Cada chamada abre (e fecha) o seu próprio loop: rodando endpoint a endpoint,
+    eles não se intercalam. Para todos os endpoints num único loop, use o
+    AgendadorGlobal com backend='async' (executar_lanes_async).
+
+    Args:
+        tarefas: Lista de tarefas (cada uma, lista de (posicao, unidade))
+        contexto: Dicionário com url_base, nome_api, payload_func, processar_func, timeout,
+                  max_tentativas_403, backoff_inicial, limitador, politica, delay_entre_chamadas, total
+                  e, opcionalmente, ao_concluir(posicao, resultado)
+        max_concorrencia: Máximo de requisições em voo ao mesmo tempo
+
+    Returns:
+        list: Resultados indexados pela posição original de cada linha
+    """
+    return asyncio.run(_executar_async(tarefas, contexto, max(1, max_concorrencia)))
+
+
+async def _executar_lanes_async(lanes, contextos, resultados, max_concorrencia, max_lanes_por_unidade,
+                                ao_terminar_lane):
+    semaforo = asyncio.Semaphore(max_concorrencia)
+    vagas_por_unidade = {}
+    conector = aiohttp.TCPConnector(limit=max_concorrencia)
+
+    async with aiohttp.ClientSession(connector=conector) as sessao:
+
+        async def executar_lane(indice, tarefas_lane):
+            contexto = contextos[indice]
+            unidade_id = tarefas_lane[0][0][1]['unidade_id']
+            vaga = vagas_por_unidade.setdefault(unidade_id, asyncio.Semaphore(max_lanes_por_unidade))
+            erro = None
+
+            # O semáforo da unidade atende na ordem de chegada: respeita a ordem da fila
+            async with vaga:
+                interrompida = contexto.get('interrompida')
+                if not (interrompida and interrompida()):
+                    try:
+                        await _executar_lane_async(sessao, semaforo, tarefas_lane, contexto, resultados[indice])
+                    except Exception as e:
+                        erro = e
+
+            ao_terminar_lane(indice, erro)
+
+        await asyncio.gather(*(executar_lane(indice, tarefas_lane) for indice, tarefas_lane in lanes))
+
+
+def executar_lanes_async(lanes, contextos, resultados, max_concorrencia=10, max_lanes_por_unidade=1,
+                         ao_terminar_lane=None):
+    """
+    Executa as lanes de vários endpoints num único event loop (agendador global)
+
+    Uma sessão e um semáforo de requisições em voo são compartilhados por todos
+    os endpoints; no máximo max_lanes_por_unidade lanes da mesma unidade (mesmo
+    token) rodam ao mesmo tempo, como no agendador com threads.
+
+    Args:
+        lanes: Fila [(indice_extracao, tarefas_lane)] montada pelo agendador
+        contextos: Contexto de cada extração (ver executar_tarefas_async), indexado por
+                   indice_extracao; 'interrompida' (opcional) é uma função que, se
+                   retornar True, faz as lanes restantes do endpoint serem puladas
+        resultados: Lista de resultados de cada extração, preenchida por posição
+        max_concorrencia: Máximo de requisições em voo ao mesmo tempo
+        max_lanes_por_unidade: Lanes da mesma unidade executadas ao mesmo tempo
+        ao_terminar_lane: Função (indice_extracao, erro) chamada no loop ao fim de cada
+                          lane; deve ser rápida (a consolidação vai para outra thread)
+    """
+    asyncio.run(_executar_lanes_async(
+        lanes, contextos, resultados, max(1, max_concorrencia), max(1, max_lanes_por_unidade),
+        ao_terminar_lane or (lambda indice, erro: None)
+    ))
@@ -0,0 +1,167 @@
+"""
+Módulo de checkpoint (journal) para retomar extrações interrompidas
+
+Cada endpoint tem um journal append-only (JSON Lines) em
+<caminho_to_save>/_checkpoint/. Para cada (unidade_id, competência) concluída
+é gravada uma linha com o status, os registros do tracker e o caminho do
+resultado parcial já gravado em disco pelo EscritorPartes. Se o main.py cair no meio (VPN, Ctrl+C,
+reinício do Windows), a próxima execução recarrega essas linhas e não refaz
+as requisições já concluídas.
+"""
+import json
+import os
+import threading
+
+# Status que não precisam ser refeitos numa retomada
+STATUS_CONCLUIDOS = ('sucesso', 'sem_dados', 'indisponivel')
+
+
+class JournalExtracao:
+    """Journal append-only de requisições concluídas de um endpoint"""
+
+    def __init__(self, caminho_to_save, nome_api):
+        """
+        Args:
+            caminho_to_save: Diretório de saída do mês (o journal fica em _checkpoint/)
+            nome_api: Nome da API
+        """
+        self.nome_api = nome_api
+        self.diretorio = os.path.join(caminho_to_save, '_checkpoint')
+        self.diretorio_parciais = os.path.join(self.diretorio, f"parciais_{nome_api.lower()}")
+        self.caminho_journal = os.path.join(self.diretorio, f"journal_{nome_api.lower()}.jsonl")
+        self._lock = threading.Lock()
+        self._final_verificado = False
+
+    @staticmethod
+    def _chave(unidade_id, competencia):
+        return f"{unidade_id}|{competencia}"
+
+    def carregar(self):
+        """
+        Lê o journal existente
+
+        Returns:
+            dict: {chave: entrada} com a última entrada de cada (unidade_id, competência)
+        """
+        entradas = {}
+
+        if not os.path.exists(self.caminho_journal):
+            return entradas
+
+        with open(self.caminho_journal, 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    entrada = json.loads(linha)
+                except json.JSONDecodeError:
+                    # Linha incompleta (queda durante a escrita) - ignora
+                    continue
+                entradas[entrada['chave']] = entrada
+
+        return entradas
+
+    def recuperar(self, linhas):
+        """
+        Separa as linhas já concluídas numa execução anterior
+
+        Args:
+            linhas: Lista de (posicao, unidade)
+
+        Returns:
+            tuple: ({posicao: resultado} recuperados, [(posicao, unidade)] pendentes)
+        """
+        entradas = self.carregar()
+        recuperados = {}
+        pendentes = []
+
+        for posicao, unidade in linhas:
+            entrada = entradas.get(self._chave(unidade['unidade_id'], unidade['competencia']))
+            resultado = self._resultado_da_entrada(entrada) if entrada else None
+
+            if resultado is None:
+                pendentes.append((posicao, unidade))
+            else:
+                recuperados[posicao] = resultado
+
+        return recuperados, pendentes
+
+    def _resultado_da_entrada(self, entrada):
+        arquivo_parcial = entrada.get('arquivo_parcial')
+        if arquivo_parcial and not os.path.exists(arquivo_parcial):
+            # Parcial perdido: refaz a requisição
+            return None
+
+        # O DataFrame não é carregado aqui: a parte é relida só na consolidação
+        return {
+            'df': None,
+            'arquivo_parcial': arquivo_parcial,
+            'colunas': entrada.get('colunas'),
+            'registros': entrada.get('registros'),
+            'erros': entrada.get('erros', []),
+            'erros_403': [],
+            'registros_tracker': entrada.get('registros_tracker', [])
+        }
+
+    def _separador_inicial(self):
+        """
+        '\n' se o journal termina numa linha incompleta (queda durante a escrita),
+        para que a primeira entrada nova não seja colada a ela; senão ''
+        """
+        if self._final_verificado:
+            return ''
+        self._final_verificado = True
+
+        if not os.path.exists(self.caminho_journal) or os.path.getsize(self.caminho_journal) == 0:
+            return ''
+        with open(self.caminho_journal, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return '' if f.read(1) == b'\n' else '\n'
+
+    def registrar(self, unidade, resultado):
+        """
+        Grava no journal uma requisição concluída (erros e timeouts não são gravados,
+        para serem tentados de novo numa retomada)
+
+        Args:
+            unidade: Linha do DataFrame de competências
+            resultado: Resultado da requisição (arquivo_parcial, colunas, erros, registros_tracker)
+        """
+        registros = resultado['registros_tracker']
+        if not registros or registros[-1]['status'] not in STATUS_CONCLUIDOS:
+            return
+
+        chave = self._chave(unidade['unidade_id'], unidade['competencia'])
+
+        with self._lock:
+            os.makedirs(self.diretorio, exist_ok=True)
+
+            entrada = {
+                'chave': chave,
+                'endpoint': self.nome_api,
+                'unidade_id': str(unidade['unidade_id']),
+                'competencia': str(unidade['competencia']),
+                'status': registros[-1]['status'],
+                'arquivo_parcial': resultado.get('arquivo_parcial'),
+                'colunas': resultado.get('colunas'),
+                'registros': resultado.get('registros'),
+                'erros': resultado['erros'],
+                'registros_tracker': registros
+            }
+
+            separador = self._separador_inicial()
+
+            with open(self.caminho_journal, 'a', encoding='utf-8') as f:
+                f.write(separador + json.dumps(entrada, ensure_ascii=False, default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def limpar(self):
+        """Remove journal e parciais após o arquivo final do endpoint ser salvo"""
+        import shutil
+
+        with self._lock:
+            if os.path.exists(self.caminho_journal):
+                os.remove(self.caminho_journal)
+            if os.path.exists(self.diretorio_parciais):
+                shutil.rmtree(self.diretorio_parciais, ignore_errors=True)
+            if os.path.isdir(self.diretorio) and not os.listdir(self.diretorio):
+                os.rmdir(self.diretorio)
@@ -0,0 +1,84 @@
+"""
+Utilitários de competência (formato 'MM/YYYY')
+
+A normalização é memoizada por valor e, para colunas inteiras, aplicada só
+sobre os valores distintos (algumas dezenas por arquivo) e depois mapeada de
+volta - em vez de percorrer o dicionário de meses linha a linha.
+
+Usada onde a competência é produzida ou pedida (arquivos da extração, faixas
+de competências, plano e cache). A consolidação incremental (ponto.py) compara
+os valores como estão gravados, de propósito: os arquivos gerados já saem
+padronizados e a comparação dos antigos fica como sempre foi.
+"""
+from functools import lru_cache
+import pandas as pd
+
+# Dicionário de meses
+MESES = {
+    'jan': '01', 'fev': '02', 'mar': '03', 'abr': '04',
+    'mai': '05', 'jun': '06', 'jul': '07', 'ago': '08',
+    'set': '09', 'out': '10', 'nov': '11', 'dez': '12'
+}
+
+
+@lru_cache(maxsize=4096)
+def _padronizar_texto(competencia_str):
+    # Se já está no formato numérico, retorna
+    if '/' in competencia_str:
+        partes = competencia_str.split('/')
+        if len(partes) == 2 and partes[0].isdigit() and len(partes[0]) == 2:
+            return competencia_str
+
+    # Converte de texto para numérico
+    for mes_texto, mes_numero in MESES.items():
+        if mes_texto in competencia_str.lower():
+            ano = competencia_str.split('/')[-1].strip()
+            return f"{mes_numero}/{ano}"
+
+    # Se não encontrou correspondência, retorna original
+    return competencia_str
+
+
+def padronizar_competencia(competencia):
+    """
+    Converte competência de 'jan/2025' para '01/2025'
+
+    Args:
+        competencia: String no formato 'mes/ano' ou já no formato 'MM/YYYY'
+
+    Returns:
+        String no formato 'MM/YYYY'
+    """
+    if pd.isna(competencia):
+        return competencia
+
+    return _padronizar_texto(str(competencia).strip())
+
+
+def padronizar_serie_competencia(serie):
+    """
+    Padroniza uma coluna inteira de competências
+
+    Args:
+        serie: pd.Series com competências ('jan/2025', '01/2025', ...)
+
+    Returns:
+        pd.Series no formato 'MM/YYYY' (valores nulos são mantidos)
+    """
+    valores = serie.dropna().unique()
+    mapa = {valor: padronizar_competencia(valor) for valor in valores}
+    return serie.map(mapa)
+
+
+def montar_competencia(mes, ano):
+    """
+    Monta a competência 'MM/YYYY' a partir das colunas de mês e ano
+
+    Args:
+        mes: pd.Series com o mês (1-12)
+        ano: pd.Series com o ano
+
+    Returns:
+        pd.Series no formato 'MM/YYYY'
+    """
+    return mes.astype(str).str.zfill(2) + '/' + ano.astype(str)
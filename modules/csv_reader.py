@@ -1,5 +1,4 @@
 import pandas as pd
-import chardet
 import os
 
 def detectar_tipo_arquivo(caminho_arquivo):
@@ -28,7 +27,7 @@ def detectar_tipo_arquivo(caminho_arquivo):
         return 'csv' if caminho_arquivo.lower().endswith('.csv') else 'excel'
 
 
-def ler_csv_robusto(caminho_arquivo, sep=';', encoding='utf-8-sig'):
+def ler_csv_robusto(caminho_arquivo, sep=';', encoding='utf-8-sig', dtype=None):
     """
     Lê CSV ou Excel de forma robusta, detectando automaticamente o tipo
     
@@ -36,6 +35,7 @@ def ler_csv_robusto(caminho_arquivo, sep=';', encoding='utf-8-sig'):
         caminho_arquivo: Caminho do arquivo
         sep: Separador (padrão: ';')
         encoding: Encoding (padrão: 'utf-8-sig')
+        dtype: {coluna: dtype} do schema do endpoint (evita a inferência nessas colunas)
     
     Returns:
         DataFrame ou None em caso de erro
@@ -56,7 +56,7 @@ def ler_csv_robusto(caminho_arquivo, sep=';', encoding='utf-8-sig'):
     if tipo_real == 'excel':
         print(f"   📊 Lendo como Excel...")
         try:
-            df = pd.read_excel(caminho_arquivo, engine='openpyxl')
+            df = pd.read_excel(caminho_arquivo, engine='openpyxl', dtype=dtype)
             print(f"   ✅ Sucesso! {len(df)} linhas, {len(df.columns)} colunas")
             print(f"   📋 Colunas: {', '.join(df.columns[:5].tolist())}{'...' if len(df.columns) > 5 else ''}")
             return df
@@ -97,6 +97,8 @@ def ler_csv_robusto(caminho_arquivo, sep=';', encoding='utf-8-sig'):
     # Detecta encoding se necessário
     encoding_detectado = None
     try:
+        # Importado só aqui: a detecção só é usada quando há um CSV a ler
+        import chardet
         with open(caminho_arquivo, 'rb') as f:
             resultado = chardet.detect(f.read(100000))
             encoding_detectado = resultado['encoding']
@@ -112,7 +114,7 @@ def ler_csv_robusto(caminho_arquivo, sep=';', encoding='utf-8-sig'):
         
         try:
             print(f"   Tentativa {i}: sep='{kwargs.get('sep', ';')}' | encoding={kwargs.get('encoding', 'default')}")
-            df = pd.read_csv(caminho_arquivo, **kwargs)
+            df = pd.read_csv(caminho_arquivo, dtype=dtype, **kwargs)
             
             if df.empty:
                 print(f"   ⚠️ DataFrame vazio")
@@ -0,0 +1,386 @@
+"""
+Módulo do DE-PARA de unidades (Unidades.xlsx)
+
+O arquivo é lido e corrigido (encoding) uma única vez por processo; o
+resultado fica num snapshot em disco, invalidado pelo mtime/tamanho do xlsx
+(e, se só o mtime mudou, pelo hash do conteúdo), então as execuções seguintes
+nem abrem o Excel. O enriquecimento é feito por mapeamento: cada nome de
+unidade distinto é procurado uma vez no índice do DE-PARA e as colunas são
+preenchidas por posição, sem o merge que copiava o DataFrame inteiro.
+"""
+import hashlib
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Versão do formato do snapshot (mudar quando a leitura/correção mudar)
+VERSAO_SNAPSHOT = 1
+
+_diretorio_snapshot = None
+_carregado = None
+_compilados = {}
+_lock = threading.RLock()
+
+
+def configurar_snapshot_de_para(diretorio):
+    """
+    Define onde o snapshot do DE-PARA é guardado entre execuções
+    
+    Args:
+        diretorio: Diretório do snapshot (None = só cache em memória)
+    """
+    global _diretorio_snapshot
+    _diretorio_snapshot = diretorio
+
+
+def _hash_arquivo(caminho_arquivo):
+    sha = hashlib.sha256()
+    with open(caminho_arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _caminho_snapshot():
+    if not _diretorio_snapshot:
+        return None
+    return os.path.join(_diretorio_snapshot, 'de_para_unidades.pkl')
+
+
+def _ler_snapshot(caminho_arquivo, estado_arquivo):
+    """
+    Lê o snapshot se ele corresponder à versão atual do xlsx
+    
+    Returns:
+        DataFrame ou None se não houver snapshot válido
+    """
+    caminho_snapshot = _caminho_snapshot()
+    if not caminho_snapshot or not os.path.exists(caminho_snapshot):
+        return None
+    
+    try:
+        snapshot = pd.read_pickle(caminho_snapshot)
+    except Exception:
+        return None
+    
+    if snapshot.get('versao') != VERSAO_SNAPSHOT or snapshot.get('caminho') != caminho_arquivo:
+        return None
+    if snapshot['tamanho'] != estado_arquivo.st_size:
+        return None
+    
+    if snapshot['mtime_ns'] != estado_arquivo.st_mtime_ns:
+        # Só o mtime mudou (cópia, sincronização): confere o conteúdo
+        if snapshot['sha256'] != _hash_arquivo(caminho_arquivo):
+            return None
+        snapshot['mtime_ns'] = estado_arquivo.st_mtime_ns
+        _gravar_snapshot(snapshot)
+    
+    return snapshot['df_unidades']
+
+
+def _gravar_snapshot(snapshot):
+    caminho_snapshot = _caminho_snapshot()
+    if not caminho_snapshot:
+        return
+    
+    try:
+        os.makedirs(os.path.dirname(caminho_snapshot), exist_ok=True)
+        temporario = caminho_snapshot + '.tmp'
+        pd.to_pickle(snapshot, temporario)
+        os.replace(temporario, caminho_snapshot)
+    except OSError as e:
+        print(f"   ⚠️ Não foi possível gravar o snapshot do DE-PARA: {e}")
+
+
+def carregar_de_para_unidades():
+    """
+    Carrega o DE-PARA de unidades (memória → snapshot em disco → xlsx)
+    
+    Returns:
+        DataFrame com as informações de unidades ou None se houver erro
+    """
+    global _carregado
+    
+    try:
+        caminho_base = os.getenv('caminho_de_para_unidades')
+        
+        if not caminho_base:
+            print("⚠️ Variável 'caminho_de_para_unidades' não configurada no .env")
+            return None
+        
+        caminho_arquivo = os.path.join(caminho_base, "Unidades.xlsx")
+        
+        if not os.path.exists(caminho_arquivo):
+            print(f"⚠️ Arquivo de DE-PARA não encontrado: {caminho_arquivo}")
+            return None
+        
+        estado_arquivo = os.stat(caminho_arquivo)
+        assinatura = (caminho_arquivo, estado_arquivo.st_mtime_ns, estado_arquivo.st_size)
+        
+        with _lock:
+            if _carregado is not None and _carregado['assinatura'] == assinatura:
+                df_unidades = _carregado['df_unidades']
+                print(f"♻️ DE-PARA reutilizado da memória: {len(df_unidades)} unidades")
+                return df_unidades
+            
+            df_unidades = _ler_snapshot(caminho_arquivo, estado_arquivo)
+            if df_unidades is not None:
+                print(f"✅ DE-PARA carregado do snapshot: {len(df_unidades)} unidades")
+            else:
+                df_unidades = _ler_de_para_xlsx(caminho_arquivo)
+                _gravar_snapshot({
+                    'versao': VERSAO_SNAPSHOT,
+                    'caminho': caminho_arquivo,
+                    'mtime_ns': estado_arquivo.st_mtime_ns,
+                    'tamanho': estado_arquivo.st_size,
+                    'sha256': _hash_arquivo(caminho_arquivo),
+                    'df_unidades': df_unidades
+                })
+            
+            _carregado = {'assinatura': assinatura, 'df_unidades': df_unidades}
+            _compilados.clear()
+            return df_unidades
+        
+    except Exception as e:
+        print(f"❌ Erro ao carregar arquivo DE-PARA: {e}")
+        import traceback
+        print(f"   Detalhes: {traceback.format_exc()}")
+        return None
+
+
+def _ler_de_para_xlsx(caminho_arquivo):
+    """
+    Lê o Unidades.xlsx e corrige o encoding corrompido das colunas texto
+    
+    Returns:
+        DataFrame com as informações de unidades
+    """
+    # Lê o arquivo Excel com engine openpyxl para melhor suporte a encoding
+    df_unidades = pd.read_excel(
+        caminho_arquivo,
+        engine='openpyxl'
+    )
+    
+    # Função para corrigir encoding corrompido
+    def corrigir_encoding(texto):
+        """Corrige encoding corrompido APENAS quando necessário"""
+        if not isinstance(texto, str):
+            return texto
+        
+        # Lista de padrões de encoding corrompido
+        padroes_corrompidos = ['Ã§', 'Ã£', 'Ã©', 'Ã', 'Ã­', 'Ã³', 'Ãº', 'Ã¡', 'Ã¢', 'Ãª', 'Ã´']
+        
+        # ✅ Se não tem padrões problemáticos, retorna IMEDIATAMENTE
+        if not any(padrao in texto for padrao in padroes_corrompidos):
+            return texto
+        
+        # 🔧 Só chega aqui se realmente tiver problemas de encoding
+        # Estratégia 1: UTF-8 mal interpretado como Latin-1
+        try:
+            corrigido = texto.encode('latin-1').decode('utf-8')
+            if not any(padrao in corrigido for padrao in padroes_corrompidos):
+                return corrigido
+        except (UnicodeDecodeError, UnicodeEncodeError):
+            pass
+        
+        # Estratégia 2: CP1252 (Windows)
+        try:
+            corrigido = texto.encode('cp1252').decode('utf-8')
+            if not any(padrao in corrigido for padrao in padroes_corrompidos):
+                return corrigido
+        except (UnicodeDecodeError, UnicodeEncodeError):
+            pass
+        
+        # Estratégia 3: ISO-8859-1
+        try:
+            corrigido = texto.encode('iso-8859-1').decode('utf-8')
+            if not any(padrao in corrigido for padrao in padroes_corrompidos):
+                return corrigido
+        except (UnicodeDecodeError, UnicodeEncodeError):
+            pass
+        
+        # Se nenhuma estratégia funcionou, retorna original
+        print(f"   ⚠️ Não foi possível corrigir: {texto[:60]}...")
+        return texto
+    
+    # Aplica correção em todas as colunas de texto
+    for col in df_unidades.select_dtypes(include=['object', 'string']).columns:
+        df_unidades[col] = df_unidades[col].apply(corrigir_encoding)
+    
+    print(f"✅ Arquivo DE-PARA carregado: {len(df_unidades)} unidades")
+    print(f"   Colunas disponíveis: {', '.join(df_unidades.columns.tolist())}")
+    
+    # Mostra exemplos de nomes para validar encoding
+    if 'unidade' in df_unidades.columns or 'nome' in df_unidades.columns:
+        col_exemplo = 'unidade' if 'unidade' in df_unidades.columns else 'nome'
+        print(f"   Exemplos de nomes (primeiros 5):")
+        for nome in df_unidades[col_exemplo].head(5):
+            print(f"      - {nome}")
+        
+        # Verifica se ainda existem problemas de encoding
+        padroes_corrompidos = ['Ã§', 'Ã£', 'Ã©', 'Ã', 'Ã­', 'Ã³', 'Ãº', 'Ã¡', 'Ã¢', 'Ãª', 'Ã´']
+        problemas = df_unidades[col_exemplo].apply(
+            lambda x: any(padrao in str(x) for padrao in padroes_corrompidos) if pd.notna(x) else False
+        ).sum()
+        
+        if problemas > 0:
+            print(f"   ⚠️ {problemas} registro(s) ainda com possíveis problemas de encoding")
+        else:
+            print(f"   ✅ Nenhum problema de encoding detectado")
+    
+    return df_unidades
+
+
+def identificar_coluna_de_para(df_unidades):
+    """Retorna a coluna de nome da unidade no arquivo DE-PARA (ou None)"""
+    colunas_possiveis = ['unidade', 'nome', 'nome_unidade', 'Unidade', 'Nome', 'NomeCompletoUnidade']
+    
+    for col in colunas_possiveis:
+        if col in df_unidades.columns:
+            return col
+    
+    return None
+
+
+def imprimir_resumo_de_para(estatisticas):
+    """Exibe o resumo de um DE-PARA aplicado (total, com match e unidades sem match)"""
+    total_registros = estatisticas['total']
+    registros_com_match = estatisticas['com_match']
+    unidades_sem_match = list(estatisticas['sem_match'])
+    
+    print(f"📊 DE-PARA aplicado:")
+    print(f"   Total de registros: {total_registros}")
+    print(f"   Registros com match: {registros_com_match}")
+    
+    if registros_com_match < total_registros:
+        print(f"   ⚠️ {len(unidades_sem_match)} unidade(s) sem match:")
+        for unidade in unidades_sem_match[:5]:
+            print(f"      - {unidade}")
+        if len(unidades_sem_match) > 5:
+            print(f"      ... e mais {len(unidades_sem_match) - 5}")
+
+
+def _compilar_de_para(df_unidades, coluna_merge):
+    """
+    Monta (uma vez por DE-PARA carregado) o índice de nomes e as colunas em arrays
+    
+    Returns:
+        dict {'indice', 'colunas'} ou None se houver nomes repetidos no DE-PARA
+        (nesse caso o merge, que duplica as linhas, é mantido)
+    """
+    with _lock:
+        entrada = _compilados.get(id(df_unidades))
+        if entrada is not None and entrada[0] is df_unidades and entrada[1] == coluna_merge:
+            return entrada[2]
+        
+        df_unidades[coluna_merge] = df_unidades[coluna_merge].str.strip()
+        indice = pd.Index(df_unidades[coluna_merge])
+        
+        compilado = None
+        if indice.is_unique:
+            compilado = {
+                'indice': indice,
+                'colunas': {col: df_unidades[col].array for col in df_unidades.columns}
+            }
+        
+        _compilados[id(df_unidades)] = (df_unidades, coluna_merge, compilado)
+        return compilado
+
+
+def _mapear_de_para(df_final, coluna_unidade, coluna_merge, compilado):
+    """
+    Equivalente ao merge left com o DE-PARA, por mapeamento
+
+    Cada nome distinto de df_final é procurado uma vez no índice (codificação por
+    dicionário) e as colunas do DE-PARA são preenchidas por posição.
+
+    Returns:
+        DataFrame com as colunas do DE-PARA ou None se houver colunas em conflito
+    """
+    colunas_de_para = [
+        col for col in compilado['colunas']
+        if not (col == coluna_merge and col == coluna_unidade)
+    ]
+    if any(col in df_final.columns for col in colunas_de_para):
+        return None
+    
+    codigos_nomes, nomes = pd.factorize(df_final[coluna_unidade])
+    posicoes_nomes = compilado['indice'].get_indexer(nomes)
+    posicoes = np.where(codigos_nomes >= 0, posicoes_nomes[codigos_nomes], -1)
+    
+    df_final_com_depara = df_final.reset_index(drop=True)
+    for col in colunas_de_para:
+        df_final_com_depara[col] = compilado['colunas'][col].take(posicoes, allow_fill=True)
+    
+    return df_final_com_depara
+
+
+def aplicar_de_para_unidades(df_final, coluna_unidade='unidade', df_unidades=None, estatisticas=None):
+    """
+    Aplica o DE-PARA de unidades ao DataFrame final com tratamento de encoding
+    
+    Args:
+        df_final: DataFrame com os dados extraídos
+        coluna_unidade: Nome da coluna que contém o nome da unidade
+        df_unidades: DE-PARA já carregado (se None, carrega do arquivo)
+        estatisticas: Dicionário {'total', 'com_match', 'sem_match'} para acumular as
+                      contagens entre várias partes; se None, o resumo é exibido na hora
+    
+    Returns:
+        DataFrame com as informações de unidades mescladas
+    """
+    if df_unidades is None:
+        df_unidades = carregar_de_para_unidades()
+    
+    if df_unidades is None:
+        print("⚠️ Continuando sem aplicar DE-PARA de unidades")
+        return df_final
+    
+    # Identifica a coluna de nome da unidade no arquivo DE-PARA
+    coluna_merge = identificar_coluna_de_para(df_unidades)
+    
+    if coluna_merge is None:
+        print(f"⚠️ Não foi possível identificar a coluna de nome da unidade")
+        print(f"   Colunas disponíveis: {df_unidades.columns.tolist()}")
+        return df_final
+    
+    try:
+        # Normaliza strings em ambos os DataFrames antes do merge
+        # Remove espaços extras e padroniza
+        df_final[coluna_unidade] = df_final[coluna_unidade].str.strip()
+        compilado = _compilar_de_para(df_unidades, coluna_merge)
+        
+        # VLOOKUP por mapeamento; merge só se o DE-PARA tiver nomes repetidos
+        # ou colunas com o mesmo nome das do df_final (sufixos _x/_y)
+        df_final_com_depara = None
+        if compilado is not None:
+            df_final_com_depara = _mapear_de_para(df_final, coluna_unidade, coluna_merge, compilado)
+        
+        if df_final_com_depara is None:
+            df_final_com_depara = df_final.merge(
+                df_unidades,
+                left_on=coluna_unidade,
+                right_on=coluna_merge,
+                how='left'
+            )
+        
+        # Conta quantas unidades encontraram match
+        resumo = estatisticas if estatisticas is not None else {'total': 0, 'com_match': 0, 'sem_match': {}}
+        resumo['total'] += len(df_final)
+        resumo['com_match'] += int(df_final_com_depara[coluna_merge].notna().sum())
+        
+        sem_match = df_final[~df_final[coluna_unidade].isin(df_unidades[coluna_merge])][coluna_unidade].unique()
+        for unidade in sem_match:
+            resumo['sem_match'][unidade] = None
+        
+        if estatisticas is None:
+            imprimir_resumo_de_para(resumo)
+        
+        return df_final_com_depara
+        
+    except Exception as e:
+        print(f"❌ Erro ao aplicar DE-PARA: {e}")
+        import traceback
+        print(f"   Detalhes: {traceback.format_exc()}")
+        return df_final
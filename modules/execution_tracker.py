@@ -10,6 +10,7 @@ class ExecutionTracker:
     
     def __init__(self):
         self.execucoes = []
+        self.cache = {}
         self.data_inicio = datetime.now()
         
     def registrar_execucao(self, 
@@ -19,7 +20,11 @@ class ExecutionTracker:
                           status,
                           registros=0,
                           erro=None,
-                          tempo_execucao=None):
+                          tempo_execucao=None,
+                          data_hora=None,
+                          bytes_comprimidos=0,
+                          bytes_descomprimidos=0,
+                          codificacao=None):
         """
         Registra uma execução individual
         
@@ -27,26 +32,49 @@ class ExecutionTracker:
             endpoint: Nome do endpoint/API
             unidade: Nome da unidade
             competencia: Competência processada
-            status: 'sucesso', 'erro', 'timeout', 'sem_dados'
+            status: 'sucesso', 'erro', 'timeout', 'sem_dados', 'indisponivel' ou
+                    'ignorado' (circuito aberto, sem requisição)
             registros: Quantidade de registros extraídos
             erro: Mensagem de erro (se houver)
             tempo_execucao: Tempo de execução em segundos
+            data_hora: Momento da execução (padrão: agora), usado quando o
+                       registro é repassado depois, no modo concorrente
+            bytes_comprimidos: Bytes do corpo da resposta como vieram pela rede
+                               (0 quando atendida pelo cache)
+            bytes_descomprimidos: Bytes do corpo depois de descomprimido
+            codificacao: Content-Encoding da resposta ('gzip', 'br', 'identity', 'cache')
         """
 
         # Formata o tempo de execução
         tempo_formatado = round(tempo_execucao, 2) if tempo_execucao else 0.0
 
         self.execucoes.append({
-            'data_hora': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'data_hora': data_hora if data_hora else datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'endpoint': endpoint,
             'unidade': unidade,
             'competencia': competencia,
             'status': status,
             'registros': registros,
             'erro': erro if erro else '',
-            'tempo_execucao_s': tempo_formatado
+            'tempo_execucao_s': tempo_formatado,
+            'bytes_comprimidos': int(bytes_comprimidos or 0),
+            'bytes_descomprimidos': int(bytes_descomprimidos or 0),
+            'codificacao': codificacao if codificacao else ''
         })
     
+    def registrar_cache(self, endpoint, hits=0, misses=0):
+        """
+        Registra o uso do cache de respostas de um endpoint
+        
+        Args:
+            endpoint: Nome do endpoint/API
+            hits: Requisições atendidas pelo cache (sem acesso à rede)
+            misses: Competências fechadas que não estavam no cache
+        """
+        contagem = self.cache.setdefault(endpoint, {'hits': 0, 'misses': 0})
+        contagem['hits'] += hits
+        contagem['misses'] += misses
+    
     def gerar_relatorio(self, caminho_destino):
         """
         Gera relatório resumo em CSV e TXT
@@ -75,6 +103,7 @@ class ExecutionTracker:
         erros = len(df[df['status'] == 'erro'])
         timeouts = len(df[df['status'] == 'timeout'])
         sem_dados = len(df[df['status'] == 'sem_dados'])
+        ignorados = len(df[df['status'] == 'ignorado'])
         total_registros = df['registros'].sum()
         
         # Estatísticas por endpoint
@@ -90,6 +119,17 @@ class ExecutionTracker:
             'tempo_execucao_s': 'tempo_medio_s'
         })
         
+        # Tráfego por endpoint: a vazão considera só o tempo das requisições que foram à rede
+        df_rede = df[df['bytes_comprimidos'] > 0]
+        trafego_por_endpoint = df.groupby('endpoint').agg(
+            bytes_comprimidos=('bytes_comprimidos', 'sum'),
+            bytes_descomprimidos=('bytes_descomprimidos', 'sum')
+        )
+        trafego_por_endpoint['tempo_rede_s'] = df_rede.groupby('endpoint')['tempo_execucao_s'].sum()
+        trafego_por_endpoint['codificacoes'] = df_rede.groupby('endpoint')['codificacao'].agg(
+            lambda x: ', '.join(sorted(set(x) - {''}))
+        )
+        
         # Nome dos arquivos
         timestamp = self.data_inicio.strftime('%Y%m%d_%H%M%S')
         nome_csv = f"relatorio_execucao_{timestamp}.csv"
@@ -122,6 +162,8 @@ class ExecutionTracker:
             f.write(f"❌ Erros:           {erros} ({erros/total_execucoes*100:.1f}%)\n")
             f.write(f"⏱️  Timeouts:        {timeouts} ({timeouts/total_execucoes*100:.1f}%)\n")
             f.write(f"⚠️  Sem Dados:       {sem_dados} ({sem_dados/total_execucoes*100:.1f}%)\n")
+            if ignorados:
+                f.write(f"⏭️  Ignorados:       {ignorados} ({ignorados/total_execucoes*100:.1f}%) - circuito aberto\n")
             f.write(f"📈 Total Registros: {total_registros:,}\n\n")
             
             # Estatísticas por endpoint
@@ -137,6 +179,39 @@ class ExecutionTracker:
                 taxa_sucesso = (stats['sucessos'] / stats['total_unidades'] * 100) if stats['total_unidades'] > 0 else 0
                 f.write(f"  • Taxa de sucesso: {taxa_sucesso:.1f}%\n")
             
+            # Bytes trafegados por endpoint (onde vai a banda da VPN)
+            total_comprimidos = int(df['bytes_comprimidos'].sum())
+            total_descomprimidos = int(df['bytes_descomprimidos'].sum())
+            if total_descomprimidos:
+                f.write("\n📦 TRÁFEGO DE REDE (corpo das respostas)\n")
+                f.write("-"*80 + "\n")
+                f.write(f"Total pela rede:      {_formatar_bytes(total_comprimidos)}\n")
+                f.write(f"Total descomprimido:  {_formatar_bytes(total_descomprimidos)}\n")
+                for endpoint in trafego_por_endpoint.sort_values('bytes_comprimidos', ascending=False).index:
+                    trafego = trafego_por_endpoint.loc[endpoint]
+                    comprimidos = int(trafego['bytes_comprimidos'])
+                    descomprimidos = int(trafego['bytes_descomprimidos'])
+                    tempo_rede = trafego['tempo_rede_s'] if pd.notna(trafego['tempo_rede_s']) else 0
+                    f.write(f"\n{endpoint}:\n")
+                    f.write(f"  • Pela rede: {_formatar_bytes(comprimidos)} | "
+                            f"descomprimido: {_formatar_bytes(descomprimidos)}\n")
+                    if comprimidos:
+                        f.write(f"  • Compressão: {descomprimidos / comprimidos:.1f}x "
+                                f"({trafego['codificacoes'] or 'identity'})\n")
+                    if tempo_rede > 0:
+                        f.write(f"  • Vazão: {_formatar_bytes(comprimidos / tempo_rede)}/s "
+                                f"em {tempo_rede:.2f}s de requisições\n")
+            
+            # Uso do cache de respostas (se ativado)
+            if self.cache:
+                f.write("\n💾 CACHE DE RESPOSTAS (competências fechadas)\n")
+                f.write("-"*80 + "\n")
+                for endpoint, contagem in self.cache.items():
+                    consultas = contagem['hits'] + contagem['misses']
+                    taxa_hit = (contagem['hits'] / consultas * 100) if consultas > 0 else 0
+                    f.write(f"  • {endpoint}: {contagem['hits']} hit(s) | "
+                            f"{contagem['misses']} miss(es) | taxa de hit {taxa_hit:.1f}%\n")
+            
             # Lista de erros (se houver)
             df_erros = df[df['status'].isin(['erro', 'timeout'])]
             if not df_erros.empty:
@@ -184,7 +259,13 @@ class ExecutionTracker:
                 'erros': 0,
                 'timeouts': 0,
                 'sem_dados': 0,
-                'total_registros': 0
+                'ignorados': 0,
+                'total_registros': 0,
+                'cache_hits': 0,
+                'cache_misses': 0,
+                'bytes_comprimidos': 0,
+                'bytes_descomprimidos': 0,
+                'endpoints': []
             }
         
         df = pd.DataFrame(self.execucoes)
@@ -195,6 +276,20 @@ class ExecutionTracker:
             'erros': len(df[df['status'] == 'erro']),
             'timeouts': len(df[df['status'] == 'timeout']),
             'sem_dados': len(df[df['status'] == 'sem_dados']),
+            'ignorados': len(df[df['status'] == 'ignorado']),
             'total_registros': df['registros'].sum(),
+            'cache_hits': sum(c['hits'] for c in self.cache.values()),
+            'cache_misses': sum(c['misses'] for c in self.cache.values()),
+            'bytes_comprimidos': int(df['bytes_comprimidos'].sum()),
+            'bytes_descomprimidos': int(df['bytes_descomprimidos'].sum()),
             'endpoints': df['endpoint'].unique().tolist()
-        }
\ No newline at end of file
+        }
+
+
+def _formatar_bytes(quantidade):
+    """Formata uma quantidade de bytes em B/KB/MB/GB"""
+    for unidade in ('B', 'KB', 'MB'):
+        if abs(quantidade) < 1024:
+            return f"{quantidade:.0f} {unidade}" if unidade == 'B' else f"{quantidade:.1f} {unidade}"
+        quantidade /= 1024
+    return f"{quantidade:.2f} GB"
@@ -0,0 +1,229 @@
+"""
+Módulo do formato dos arquivos de saída das APIs
+
+'csv' (padrão) mantém o comportamento original: sep=';' e utf-8-sig. Com
+'parquet' (requer pyarrow), a extração, a consolidação incremental e a cópia
+do mês anterior trabalham com Parquet comprimido - arquivos bem menores, lidos
+sem as tentativas do ler_csv_robusto e sem inferência de tipos. O CSV passa a
+ser gerado só para os arquivos que precisam dele (upload ao Google Drive).
+"""
+import os
+import pandas as pd
+
+FORMATOS_VALIDOS = ('csv', 'parquet')
+
+# Ordem de busca dos arquivos de uma API num diretório de mês
+EXTENSOES_BUSCA = ['.parquet', '.csv', '.xlsx']
+
+COMPRESSAO_PARQUET = 'zstd'
+
+_formato = 'csv'
+
+
+def parquet_disponivel():
+    """Retorna True se há um engine Parquet (pyarrow) instalado"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def configurar_formato_saida(formato):
+    """
+    Define o formato dos arquivos gerados pelas APIs
+
+    Args:
+        formato: 'csv' ou 'parquet' (None/vazio = 'csv')
+    """
+    global _formato
+
+    formato = (formato or 'csv').strip().lower()
+
+    if formato not in FORMATOS_VALIDOS:
+        print(f"⚠️ Formato de saída '{formato}' inválido - usando CSV")
+        formato = 'csv'
+
+    if formato == 'parquet' and not parquet_disponivel():
+        print("⚠️ Formato Parquet requer o pacote pyarrow - usando CSV")
+        formato = 'csv'
+
+    _formato = formato
+
+
+def obter_formato_saida():
+    """Retorna o formato configurado ('csv' ou 'parquet')"""
+    return _formato
+
+
+def extensao_saida():
+    """Retorna a extensão dos arquivos gerados ('.csv' ou '.parquet')"""
+    return f".{_formato}"
+
+
+def _textos_mistos_para_str(df):
+    """Converte para texto as colunas object com tipos misturados (o Parquet exige um tipo por coluna)"""
+    for coluna in df.select_dtypes(include=['object']).columns:
+        if pd.api.types.infer_dtype(df[coluna], skipna=True).startswith('mixed'):
+            df[coluna] = df[coluna].map(lambda valor: valor if pd.isna(valor) else str(valor))
+    return df
+
+
+def salvar_dataframe(df, caminho_arquivo):
+    """
+    Salva um DataFrame no formato indicado pela extensão do arquivo
+
+    A gravação é feita num temporário e trocada de uma vez (os.replace), para
+    que uma queda no meio não deixe um arquivo truncado no lugar do anterior.
+
+    Args:
+        df: DataFrame
+        caminho_arquivo: Caminho .parquet, .csv ou .xlsx
+    """
+    extensao = os.path.splitext(caminho_arquivo)[1].lower()
+
+    if extensao == '.xlsx':
+        df.to_excel(caminho_arquivo, index=False)
+        return
+
+    caminho_temporario = caminho_arquivo + '.tmp'
+    try:
+        if extensao == '.parquet':
+            try:
+                df.to_parquet(caminho_temporario, index=False, compression=COMPRESSAO_PARQUET)
+            except (TypeError, ValueError, NotImplementedError):
+                # pyarrow.ArrowTypeError/ArrowInvalid: colunas com tipos misturados
+                df = _textos_mistos_para_str(df.copy())
+                df.to_parquet(caminho_temporario, index=False, compression=COMPRESSAO_PARQUET)
+        else:
+            df.to_csv(caminho_temporario, index=False, sep=';', encoding='utf-8-sig')
+
+        os.replace(caminho_temporario, caminho_arquivo)
+
+    finally:
+        if os.path.exists(caminho_temporario):
+            os.remove(caminho_temporario)
+
+
+def _tabela_arrow(df, somente_schema=False):
+    """Converte um DataFrame para Arrow (colunas com tipos misturados viram texto)"""
+    import pyarrow as pa
+
+    converter = pa.Schema.from_pandas if somente_schema else pa.Table.from_pandas
+    try:
+        return converter(df, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        return converter(_textos_mistos_para_str(df.copy()), preserve_index=False)
+
+
+def _unificar_tipo(tipo_atual, tipo_novo):
+    """Tipo Arrow que comporta os dois (ex.: int64 + double = double); incompatíveis viram texto"""
+    import pyarrow as pa
+
+    if tipo_atual == tipo_novo:
+        return tipo_atual
+    try:
+        return pa.unify_schemas(
+            [pa.schema([('coluna', tipo_atual)]), pa.schema([('coluna', tipo_novo)])],
+            promote_options='permissive'
+        ).field('coluna').type
+    except (pa.ArrowTypeError, pa.ArrowInvalid, NotImplementedError):
+        return pa.large_string()
+
+
+def salvar_partes_parquet(gerar_partes, caminho_arquivo):
+    """
+    Grava um Parquet parte a parte, um row group por parte, sem juntar as partes em memória
+
+    O schema do arquivo é fixado antes do primeiro row group, numa primeira
+    passada que só infere o schema Arrow de cada parte: colunas sem nenhum valor
+    numa parte assumem o tipo das demais e tipos diferentes entre partes são
+    unificados (int + float = float; incompatíveis, texto). Colunas 'category'
+    são gravadas como dicionário, cada row group com o seu, e voltam como
+    'category' na leitura.
+
+    Args:
+        gerar_partes: Função (contabilizar) que devolve os DataFrames das partes, todos
+                      com as mesmas colunas; chamada duas vezes, com contabilizar=False
+                      na passada do schema (estatísticas não devem ser somadas nela)
+        caminho_arquivo: Caminho .parquet
+
+    Returns:
+        int: Total de registros gravados
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    colunas = None
+    tipos = {}
+    metadados = None
+    for df in gerar_partes(False):
+        esquema_parte = _tabela_arrow(df, somente_schema=True)
+        if colunas is None:
+            colunas = esquema_parte.names
+            metadados = esquema_parte.metadata
+        for campo in esquema_parte:
+            tipos[campo.name] = _unificar_tipo(tipos.get(campo.name, campo.type), campo.type)
+
+    if colunas is None:
+        return 0
+
+    campos = []
+    for coluna in colunas:
+        tipo = tipos[coluna]
+        if pa.types.is_null(tipo):
+            tipo = pa.large_string()
+        elif pa.types.is_dictionary(tipo):
+            # Índices de 32 bits: o dicionário de um row group pode crescer além do da primeira parte
+            tipo = pa.dictionary(pa.int32(), tipo.value_type)
+        campos.append(pa.field(coluna, tipo))
+    esquema = pa.schema(campos, metadata=metadados)
+
+    total_registros = 0
+    caminho_temporario = caminho_arquivo + '.tmp'
+    try:
+        with pq.ParquetWriter(caminho_temporario, esquema, compression=COMPRESSAO_PARQUET) as escritor:
+            for df in gerar_partes(True):
+                if df.empty:
+                    continue
+                tabela = _tabela_arrow(df).select(colunas).cast(esquema)
+                escritor.write_table(tabela)
+                total_registros += tabela.num_rows
+
+        os.replace(caminho_temporario, caminho_arquivo)
+
+    finally:
+        if os.path.exists(caminho_temporario):
+            os.remove(caminho_temporario)
+
+    return total_registros
+
+
+def ler_parquet(caminho_arquivo):
+    """
+    Lê um arquivo Parquet (tipos e categorias já vêm gravados no arquivo)
+
+    Returns:
+        DataFrame
+    """
+    return pd.read_parquet(caminho_arquivo)
+
+
+def exportar_csv(caminho_arquivo):
+    """
+    Garante um CSV (sep=';', utf-8-sig) para um arquivo de saída
+
+    Args:
+        caminho_arquivo: Caminho do arquivo gerado (Parquet ou CSV)
+
+    Returns:
+        str: Caminho do CSV (o próprio arquivo se já for CSV)
+    """
+    if not caminho_arquivo.lower().endswith('.parquet'):
+        return caminho_arquivo
+
+    caminho_csv = os.path.splitext(caminho_arquivo)[0] + '.csv'
+    salvar_dataframe(ler_parquet(caminho_arquivo), caminho_csv)
+    print(f"   📄 CSV gerado para upload: {os.path.basename(caminho_csv)}")
+
+    return caminho_csv
@@ -1,5 +1,6 @@
 import os
 import csv
+import threading
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
@@ -165,6 +166,116 @@ def csv_para_google_sheets(service, file_id_csv, nome_planilha, folder_id):
         return None
 
 
+def enviar_arquivo_drive(service, nome_base, diretorio, folder_id, resultados, sobrescrever=True,
+                         limpar_nomes=True, criar_google_sheets=True):
+    """
+    Envia um arquivo ao Drive (e o converte em Google Sheets, se for CSV)
+    
+    Args:
+        service: Serviço do Drive autenticado
+        nome_base: Nome do arquivo local
+        diretorio: Diretório local onde o arquivo está
+        folder_id: ID da pasta no Google Drive
+        resultados: Dicionário {'sucesso', 'erro', 'nao_encontrado'} atualizado com o arquivo
+        sobrescrever: Se True, sobrescreve arquivos existentes
+        limpar_nomes: Se True, remove mês/ano do nome
+        criar_google_sheets: Se True, também cria Google Sheets para CSVs
+    
+    Returns:
+        bool: True se o arquivo foi enviado
+    """
+    caminho_completo = os.path.join(diretorio, nome_base)
+    
+    if not os.path.exists(caminho_completo):
+        print(f"   ⚠️ Arquivo não encontrado localmente")
+        resultados['nao_encontrado'].append(nome_base)
+        return False
+    
+    # Limpa o nome
+    nome_no_drive = limpar_nome_arquivo(nome_base) if limpar_nomes else nome_base
+    
+    if nome_no_drive != nome_base:
+        print(f"   🔄 Renomeando: {nome_base} → {nome_no_drive}")
+    
+    # Upload do CSV
+    file_id_csv = upload_arquivo_com_nome_customizado(
+        service=service,
+        caminho_arquivo=caminho_completo,
+        nome_arquivo_drive=nome_no_drive,
+        folder_id=folder_id,
+        sobrescrever=sobrescrever
+    )
+    
+    file_id_sheets = None
+    
+    # Cria Google Sheets se ativado e for CSV
+    if criar_google_sheets and nome_base.lower().endswith('.csv') and file_id_csv:
+        nome_planilha = limpar_nome_arquivo(nome_base).replace('.csv', '')
+        
+        # Verifica se planilha já existe
+        file_id_existente = verificar_ou_criar_arquivo(service, nome_planilha, folder_id)
+        
+        if file_id_existente and sobrescrever:
+            print(f"   🗑️  Deletando planilha anterior...")
+            try:
+                service.files().delete(
+                    fileId=file_id_existente,
+                    supportsAllDrives=True
+                ).execute()
+                print(f"   ✅ Planilha anterior deletada")
+            except Exception as e:
+                print(f"   ⚠️ Não foi possível deletar: {e}")
+        
+        # Converte o CSV que já está no Drive para Google Sheets
+        file_id_sheets = csv_para_google_sheets(
+            service=service,
+            file_id_csv=file_id_csv,
+            nome_planilha=nome_planilha,
+            folder_id=folder_id
+        )
+    
+    if file_id_csv or file_id_sheets:
+        resultados['sucesso'].append({
+            'arquivo_original': nome_base,
+            'arquivo_drive': nome_no_drive,
+            'file_id_csv': file_id_csv,
+            'file_id_sheets': file_id_sheets
+        })
+    else:
+        resultados['erro'].append(nome_base)
+    
+    return bool(file_id_csv or file_id_sheets)
+
+
+def imprimir_resumo_upload(resultados):
+    """Exibe o resumo de um upload (arquivos enviados, com erro e não encontrados)"""
+    print(f"\n{'='*60}")
+    print(f"📊 Resumo do Upload")
+    print(f"{'='*60}")
+    print(f"✅ Sucesso: {len(resultados['sucesso'])} arquivo(s)")
+    print(f"❌ Erro: {len(resultados['erro'])} arquivo(s)")
+    print(f"⚠️  Não encontrado: {len(resultados['nao_encontrado'])} arquivo(s)")
+
+    if resultados['sucesso']:
+        print(f"\n✅ Arquivos processados:")
+        for item in resultados['sucesso']:
+            print(f"   📁 CSV: {item['arquivo_drive']}")
+            if item['file_id_sheets']:
+                print(f"   📊 Sheets: {item['arquivo_drive'].replace('.csv', '')}")
+
+    if resultados['erro']:
+        print(f"\n❌ Arquivos com erro:")
+        for arquivo in resultados['erro']:
+            print(f"   - {arquivo}")
+
+    if resultados['nao_encontrado']:
+        print(f"\n⚠️ Arquivos não encontrados:")
+        for arquivo in resultados['nao_encontrado']:
+            print(f"   - {arquivo}")
+
+    print(f"{'='*60}\n")
+
+
 def salvar_arquivos_no_drive(bases, diretorio, folder_id=None, sobrescrever=True, credenciais_path=None, limpar_nomes=True, criar_google_sheets=True):
     """
     Upload para Google Drive com opção de converter para Google Sheets
@@ -221,94 +332,94 @@ def salvar_arquivos_no_drive(bases, diretorio, folder_id=None, sobrescrever=True
     
     for idx, nome_base in enumerate(bases, 1):
         print(f"📄 [{idx}/{len(bases)}] Processando: {nome_base}")
-        
-        caminho_completo = os.path.join(diretorio, nome_base)
-        
-        if not os.path.exists(caminho_completo):
-            print(f"   ⚠️ Arquivo não encontrado localmente")
-            resultados['nao_encontrado'].append(nome_base)
-            continue
-        
-        # Limpa o nome
-        nome_no_drive = limpar_nome_arquivo(nome_base) if limpar_nomes else nome_base
-        
-        if nome_no_drive != nome_base:
-            print(f"   🔄 Renomeando: {nome_base} → {nome_no_drive}")
-        
-        # Upload do CSV
-        file_id_csv = upload_arquivo_com_nome_customizado(
-            service=service,
-            caminho_arquivo=caminho_completo,
-            nome_arquivo_drive=nome_no_drive,
-            folder_id=folder_id,
-            sobrescrever=sobrescrever
-        )
-        
-        file_id_sheets = None
-        
-        # Cria Google Sheets se ativado e for CSV
-        if criar_google_sheets and nome_base.lower().endswith('.csv') and file_id_csv:
-            nome_planilha = limpar_nome_arquivo(nome_base).replace('.csv', '')
-            
-            # Verifica se planilha já existe
-            file_id_existente = verificar_ou_criar_arquivo(service, nome_planilha, folder_id)
-            
-            if file_id_existente and sobrescrever:
-                print(f"   🗑️  Deletando planilha anterior...")
-                try:
-                    service.files().delete(
-                        fileId=file_id_existente,
-                        supportsAllDrives=True
-                    ).execute()
-                    print(f"   ✅ Planilha anterior deletada")
-                except Exception as e:
-                    print(f"   ⚠️ Não foi possível deletar: {e}")
-            
-            # Converte o CSV que já está no Drive para Google Sheets
-            file_id_sheets = csv_para_google_sheets(
-                service=service,
-                file_id_csv=file_id_csv,
-                nome_planilha=nome_planilha,
-                folder_id=folder_id
-            )
-        
-        if file_id_csv or file_id_sheets:
-            resultados['sucesso'].append({
-                'arquivo_original': nome_base,
-                'arquivo_drive': nome_no_drive,
-                'file_id_csv': file_id_csv,
-                'file_id_sheets': file_id_sheets
-            })
-        else:
-            resultados['erro'].append(nome_base)
-        
+        enviar_arquivo_drive(service, nome_base, diretorio, folder_id, resultados,
+                             sobrescrever, limpar_nomes, criar_google_sheets)
         print()
     
-    # Resumo final
-    print(f"\n{'='*60}")
-    print(f"📊 Resumo do Upload")
-    print(f"{'='*60}")
-    print(f"✅ Sucesso: {len(resultados['sucesso'])} arquivo(s)")
-    print(f"❌ Erro: {len(resultados['erro'])} arquivo(s)")
-    print(f"⚠️  Não encontrado: {len(resultados['nao_encontrado'])} arquivo(s)")
-    
-    if resultados['sucesso']:
-        print(f"\n✅ Arquivos processados:")
-        for item in resultados['sucesso']:
-            print(f"   📁 CSV: {item['arquivo_drive']}")
-            if item['file_id_sheets']:
-                print(f"   📊 Sheets: {item['arquivo_drive'].replace('.csv', '')}")
+    imprimir_resumo_upload(resultados)
     
-    if resultados['erro']:
-        print(f"\n❌ Arquivos com erro:")
-        for arquivo in resultados['erro']:
-            print(f"   - {arquivo}")
-    
-    if resultados['nao_encontrado']:
-        print(f"\n⚠️ Arquivos não encontrados:")
-        for arquivo in resultados['nao_encontrado']:
-            print(f"   - {arquivo}")
-    
-    print(f"{'='*60}\n")
-    
-    return resultados
\ No newline at end of file
+    return resultados
+
+
+class UploadDrive:
+    """
+    Upload de arquivos para o Drive um a um, à medida que ficam prontos
+
+    Em vez de esperar a lista completa (salvar_arquivos_no_drive), cada arquivo
+    é enviado e convertido assim que a consolidação dele termina, enquanto os
+    outros endpoints ainda extraem. A autenticação é feita uma única vez, no
+    primeiro envio. O serviço do Drive não é thread-safe: os envios são
+    serializados por um lock.
+    """
+
+    def __init__(self, diretorio, folder_id=None, sobrescrever=True, credenciais_path=None,
+                 limpar_nomes=True, criar_google_sheets=True):
+        """
+        Args:
+            diretorio: Diretório local onde os arquivos estão
+            folder_id: ID da pasta no Google Drive (padrão: GOOGLE_DRIVE_FOLDER_ID)
+            sobrescrever: Se True, sobrescreve arquivos existentes
+            credenciais_path: Caminho do arquivo de credenciais
+            limpar_nomes: Se True, remove mês/ano do nome
+            criar_google_sheets: Se True, também cria Google Sheets para CSVs
+        """
+        self.diretorio = diretorio
+        self.folder_id = folder_id or os.getenv('GOOGLE_DRIVE_FOLDER_ID')
+        self.sobrescrever = sobrescrever
+        self.credenciais_path = credenciais_path
+        self.limpar_nomes = limpar_nomes
+        self.criar_google_sheets = criar_google_sheets
+        self.resultados = {
+            'sucesso': [],
+            'erro': [],
+            'nao_encontrado': []
+        }
+        self.enviados = 0
+        self._service = None
+        self._autenticado = False
+        self._lock = threading.Lock()
+
+    def _obter_service(self):
+        if not self._autenticado:
+            self._autenticado = True
+            print(f"\n📤 Upload para Google Drive (à medida que os arquivos ficam prontos)")
+            print(f"📂 Pasta no Drive: {self.folder_id}")
+            self._service = autenticar_google_drive(self.credenciais_path)
+        return self._service
+
+    def enviar(self, nome_base):
+        """
+        Envia um arquivo do diretório (e cria o Google Sheets, se for CSV)
+
+        Args:
+            nome_base: Nome do arquivo local
+
+        Returns:
+            bool: True se o arquivo foi enviado
+        """
+        with self._lock:
+            self.enviados += 1
+
+            if not self.folder_id:
+                print(f"❌ ID da pasta do Google Drive não fornecido - {nome_base} não enviado")
+                self.resultados['erro'].append(nome_base)
+                return False
+
+            service = self._obter_service()
+            if service is None:
+                self.resultados['erro'].append(nome_base)
+                return False
+
+            print(f"\n📄 [upload {self.enviados}] Processando: {nome_base}")
+
+            return enviar_arquivo_drive(
+                service, nome_base, self.diretorio, self.folder_id, self.resultados,
+                self.sobrescrever, self.limpar_nomes, self.criar_google_sheets
+            )
+
+    def imprimir_resumo(self):
+        """Exibe o resumo dos envios feitos até aqui"""
+        if not self.enviados:
+            print("⚠️ Nenhum arquivo foi enviado ao Google Drive\n")
+            return
+        imprimir_resumo_upload(self.resultados)
@@ -0,0 +1,166 @@
+"""
+Módulo de sessão HTTP compartilhada (keep-alive) para todas as APIs
+
+Uma única requests.Session é reaproveitada por todos os wrappers api_* durante
+a execução do main.py, mantendo as conexões TCP/TLS abertas por host. Sobre a
+VPN isso evita um handshake novo a cada requisição.
+
+A sessão pede respostas comprimidas (gzip/deflate, e brotli quando o pacote
+brotli ou brotlicffi estiver instalado - sem ele o urllib3 não descomprime 'br',
+então a codificação não é anunciada). As respostas JSON das APIs costumam
+encolher 5-10x, o que pesa mais que a CPU gasta descomprimindo.
+"""
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import make_headers
+
+_sessao = None
+_lock = threading.Lock()
+_tamanho_pool = 10
+
+# Codificações que o urllib3 sabe descomprimir neste ambiente (gzip, deflate e br opcional)
+ACCEPT_ENCODING = ', '.join(
+    codificacao.strip() for codificacao in make_headers(accept_encoding=True)['accept-encoding'].split(',')
+    if codificacao.strip() in ('gzip', 'deflate', 'br')
+)
+
+
+def configurar_pool(tamanho_pool):
+    """
+    Define o tamanho do pool de conexões por host
+
+    Deve ser chamado antes da primeira requisição; se a sessão já existir,
+    ela é recriada com o novo tamanho.
+
+    Args:
+        tamanho_pool: Máximo de conexões mantidas por host (use >= nível de concorrência)
+    """
+    global _tamanho_pool, _sessao
+
+    with _lock:
+        _tamanho_pool = max(1, int(tamanho_pool))
+        if _sessao is not None:
+            _sessao.close()
+            _sessao = None
+
+
+def obter_sessao():
+    """
+    Retorna a sessão HTTP compartilhada (criada na primeira chamada)
+
+    Returns:
+        requests.Session com pool de conexões keep-alive
+    """
+    global _sessao
+
+    if _sessao is None:
+        with _lock:
+            if _sessao is None:
+                sessao = requests.Session()
+                sessao.headers['Accept-Encoding'] = ACCEPT_ENCODING
+                adapter = HTTPAdapter(
+                    pool_connections=_tamanho_pool,
+                    pool_maxsize=_tamanho_pool,
+                    pool_block=True
+                )
+                sessao.mount('https://', adapter)
+                sessao.mount('http://', adapter)
+                _sessao = sessao
+
+    return _sessao
+
+
+def medir_trafego(response, bytes_descomprimidos=None):
+    """
+    Bytes de uma resposta: como vieram pela rede e depois de descomprimidos
+
+    Respostas do cache não usam a rede (0 bytes comprimidos).
+
+    Args:
+        response: requests.Response já lida (ou fechada) ou RespostaCache
+        bytes_descomprimidos: Tamanho do corpo já contado pelo chamador (leitura em
+                              streaming); quando omitido, usa len(response.content)
+
+    Returns:
+        dict: {'bytes_comprimidos', 'bytes_descomprimidos', 'codificacao'}
+    """
+    if bytes_descomprimidos is None:
+        bytes_descomprimidos = len(response.content or b'')
+
+    if getattr(response, 'from_cache', False):
+        return {'bytes_comprimidos': 0, 'bytes_descomprimidos': bytes_descomprimidos, 'codificacao': 'cache'}
+
+    # O urllib3 conta os bytes lidos do socket antes de descomprimir
+    bytes_comprimidos = None
+    raw = getattr(response, 'raw', None)
+    if raw is not None and hasattr(raw, 'tell'):
+        try:
+            bytes_comprimidos = raw.tell()
+        except (OSError, ValueError):
+            bytes_comprimidos = None
+
+    if not bytes_comprimidos:
+        tamanho_declarado = response.headers.get('Content-Length')
+        bytes_comprimidos = int(tamanho_declarado) if tamanho_declarado and tamanho_declarado.isdigit() \
+            else bytes_descomprimidos
+
+    return {
+        'bytes_comprimidos': bytes_comprimidos,
+        'bytes_descomprimidos': bytes_descomprimidos,
+        'codificacao': response.headers.get('Content-Encoding', 'identity')
+    }
+
+
+def obter_estatisticas_conexoes():
+    """
+    Retorna quantas conexões foram abertas e reaproveitadas por host
+
+    Returns:
+        dict: {host: {'conexoes_abertas', 'requisicoes', 'reutilizadas'}}
+    """
+    if _sessao is None:
+        return {}
+
+    estatisticas = {}
+
+    for adapter in set(_sessao.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for chave in pools.keys():
+            pool = pools[chave]
+            host = f"{pool.host}:{pool.port}" if pool.port else pool.host
+            info = estatisticas.setdefault(host, {
+                'conexoes_abertas': 0,
+                'requisicoes': 0,
+                'reutilizadas': 0
+            })
+            info['conexoes_abertas'] += pool.num_connections
+            info['requisicoes'] += pool.num_requests
+            info['reutilizadas'] += max(0, pool.num_requests - pool.num_connections)
+
+    return estatisticas
+
+
+def imprimir_estatisticas_conexoes():
+    """Exibe no console o reaproveitamento de conexões por host"""
+    estatisticas = obter_estatisticas_conexoes()
+
+    if not estatisticas:
+        print("ℹ️ Nenhuma conexão HTTP registrada")
+        return
+
+    print(f"🔗 CONEXÕES HTTP (pool de {_tamanho_pool} por host):")
+    for host, info in estatisticas.items():
+        print(f"   • {host}: {info['requisicoes']} requisições | "
+              f"{info['conexoes_abertas']} conexões abertas | "
+              f"{info['reutilizadas']} reaproveitadas")
+
+
+def fechar_sessao():
+    """Fecha a sessão compartilhada e libera as conexões"""
+    global _sessao
+
+    with _lock:
+        if _sessao is not None:
+            _sessao.close()
+            _sessao = None
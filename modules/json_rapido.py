@@ -0,0 +1,36 @@
+"""
+Módulo de decodificação rápida das respostas JSON
+
+Usa o orjson quando ele está instalado (opcional - sem ele, o json da
+biblioteca padrão). A lista de itens vai direto para pd.DataFrame: montar as
+colunas à mão não ficou mais rápido que a inferência do pandas.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def carregar_json(conteudo):
+    """
+    Decodifica o corpo de uma resposta
+
+    Args:
+        conteudo: Corpo em bytes (ou str)
+
+    Returns:
+        Objeto JSON decodificado
+
+    Raises:
+        ValueError: Se o corpo não for um JSON válido
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(conteudo)
+        except orjson.JSONDecodeError:
+            # orjson é estrito (só UTF-8, sem NaN/Infinity): o json padrão decide
+            pass
+
+    return json.loads(conteudo)
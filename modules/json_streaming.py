@@ -0,0 +1,181 @@
+"""
+Módulo de leitura incremental (streaming) de respostas JSON
+
+Para os endpoints com respostas muito grandes, o corpo é lido do socket em
+blocos e a lista 'items' é percorrida elemento a elemento, à medida que os
+bytes chegam: os registros saem em lotes de tamanho fixo, sem que o corpo
+inteiro (texto, objetos Python e DataFrame) precise existir em memória ao
+mesmo tempo. O pico fica limitado a um lote, qualquer que seja o tamanho do
+mês de uma unidade.
+
+Só o nível de cima do JSON é interpretado aqui; cada registro de 'items' é
+decodificado pelo json da biblioteca padrão (raw_decode).
+"""
+import codecs
+import json
+
+# Tamanho dos blocos lidos do socket
+TAMANHO_BLOCO = 64 * 1024
+
+# Registros por lote, quando o endpoint não declara outro
+TAMANHO_LOTE_PADRAO = 20000
+
+_ESPACOS = ' \t\n\r'
+_CONTINUACAO_NUMERO = '0123456789.eE+-'
+
+
+class LeitorItems:
+    """
+    Percorre a lista de uma chave do objeto de cima de um JSON, bloco a bloco
+
+    As demais chaves do objeto são decodificadas inteiras e ficam em self.outros
+    (metadados pequenos, como paginação).
+    """
+
+    def __init__(self, blocos, chave='items'):
+        """
+        Args:
+            blocos: Iterável de bytes (ex.: response.iter_content())
+            chave: Chave da lista de registros
+        """
+        self.blocos = iter(blocos)
+        self.chave = chave
+        self.outros = {}
+        self.encontrada = False
+
+        self._decodificador = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._texto = ''
+        self._pos = 0
+        self._fim = False
+
+    def _ler_bloco(self):
+        """Acrescenta o próximo bloco ao texto; False se o corpo terminou"""
+        if self._fim:
+            return False
+
+        # Descarta o que já foi consumido, para o buffer não crescer com o corpo
+        if self._pos:
+            self._texto = self._texto[self._pos:]
+            self._pos = 0
+
+        for bloco in self.blocos:
+            if bloco:
+                self._texto += self._decodificador.decode(bloco)
+                return True
+
+        self._texto += self._decodificador.decode(b'', final=True)
+        self._fim = True
+        return False
+
+    def _proximo_caractere(self):
+        """Pula espaços e retorna o próximo caractere significativo (sem consumi-lo)"""
+        while True:
+            while self._pos < len(self._texto) and self._texto[self._pos] in _ESPACOS:
+                self._pos += 1
+            if self._pos < len(self._texto):
+                return self._texto[self._pos]
+            if not self._ler_bloco():
+                raise ValueError("JSON incompleto: fim inesperado da resposta")
+
+    def _esperar(self, caracteres):
+        caractere = self._proximo_caractere()
+        if caractere not in caracteres:
+            raise ValueError(f"JSON inválido: esperado {caracteres!r}, encontrado {caractere!r} (posição {self._pos})")
+        self._pos += 1
+        return caractere
+
+    def _decodificar_valor(self):
+        """Decodifica um valor JSON completo, lendo mais blocos enquanto ele estiver cortado"""
+        self._proximo_caractere()
+        while True:
+            try:
+                valor, fim = self._json.raw_decode(self._texto, self._pos)
+            except json.JSONDecodeError:
+                # Valor cortado no fim do buffer: lê mais; se o corpo acabou, o erro é real
+                if not self._ler_bloco():
+                    raise
+                continue
+
+            # Número no fim do buffer pode continuar no próximo bloco (ex.: '12' + '34' ou '12.' + '5')
+            if not self._fim and isinstance(valor, (int, float)) and not isinstance(valor, bool) \
+                    and not self._texto[fim:].strip(_CONTINUACAO_NUMERO) and self._ler_bloco():
+                continue
+
+            self._pos = fim
+            return valor
+
+    def __iter__(self):
+        """
+        Yields:
+            Cada registro (dict) da lista, na ordem
+        """
+        self._esperar('{')
+        if self._proximo_caractere() == '}':
+            self._pos += 1
+            return
+
+        while True:
+            chave = self._decodificar_valor()
+            self._esperar(':')
+
+            if chave == self.chave and self._proximo_caractere() == '[':
+                self.encontrada = True
+                self._pos += 1
+                if self._proximo_caractere() == ']':
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._decodificar_valor()
+                        if self._esperar(',]') == ']':
+                            break
+            else:
+                self.outros[chave] = self._decodificar_valor()
+
+            if self._esperar(',}') == '}':
+                return
+
+
+def iterar_lotes(blocos, tamanho_lote=TAMANHO_LOTE_PADRAO, chave='items'):
+    """
+    Agrupa os registros de uma resposta em lotes de tamanho fixo
+
+    Args:
+        blocos: Iterável de bytes do corpo da resposta
+        tamanho_lote: Máximo de registros por lote
+        chave: Chave da lista de registros
+
+    Yields:
+        list: Lote de registros (dicts)
+    """
+    lote = []
+    for item in LeitorItems(blocos, chave):
+        lote.append(item)
+        if len(lote) >= tamanho_lote:
+            yield lote
+            lote = []
+
+    if lote:
+        yield lote
+
+
+def blocos_resposta(response, destino_cache=None, tamanho_bloco=TAMANHO_BLOCO, contagem=None):
+    """
+    Blocos do corpo de uma resposta (requests com stream=True ou RespostaCache)
+
+    Args:
+        response: Resposta HTTP
+        destino_cache: GravacaoCache opcional; cada bloco lido também é gravado nele
+        tamanho_bloco: Tamanho de cada bloco em bytes
+        contagem: Dicionário opcional cujo 'bytes' acumula o tamanho do corpo lido
+                  (já descomprimido)
+
+    Yields:
+        bytes
+    """
+    for bloco in response.iter_content(chunk_size=tamanho_bloco):
+        if destino_cache is not None:
+            destino_cache.write(bloco)
+        if contagem is not None:
+            contagem['bytes'] += len(bloco)
+        yield bloco
@@ -0,0 +1,201 @@
+"""
+Módulo de medição do custo das importações (--profile-startup)
+
+Um finder instalado no início do sys.meta_path cronometra a execução de cada
+módulo importado (create_module + exec_module), separando o tempo próprio do
+tempo acumulado com as importações que ele dispara - o mesmo que o
+python -X importtime, mas disponível também no executável (sys._MEIPASS),
+onde não há como passar opções ao interpretador.
+
+O main.py instala o cronômetro antes das suas importações de topo e, no fim,
+importa os módulos que só são carregados no ponto de uso, para mostrar quanto
+cada etapa adiada custaria.
+"""
+import importlib
+import sys
+import time
+
+# Quantidade de linhas em cada tabela do relatório
+LINHAS_RELATORIO = 15
+
+# Pacotes do projeto: listados módulo a módulo (os demais são somados por pacote)
+PACOTES_PROJETO = ('modules', 'config')
+
+
+class _LoaderCronometrado:
+    """Loader que delega ao loader real e cronometra a criação/execução do módulo"""
+
+    def __init__(self, loader, perfil):
+        self._loader = loader
+        self._perfil = perfil
+
+    def create_module(self, spec):
+        criar = getattr(self._loader, 'create_module', None)
+        if criar is None:
+            return None
+        return self._perfil._medir(spec.name, criar, spec)
+
+    def exec_module(self, modulo):
+        return self._perfil._medir(modulo.__name__, self._loader.exec_module, modulo)
+
+    def __getattr__(self, atributo):
+        # get_source, get_resource_reader, is_package... vão direto ao loader real
+        return getattr(self._loader, atributo)
+
+
+class PerfilImportacoes:
+    """Finder (sys.meta_path) que registra o tempo de importação de cada módulo"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fim_inicializacao = None
+        # {modulo: [tempo_proprio, tempo_acumulado]} em segundos
+        self.tempos = {}
+        self._pilha = []
+        self._buscando = False
+
+    def instalar(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def desinstalar(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, nome, caminho, alvo=None):
+        if self._buscando:
+            return None
+
+        # Pede o spec aos demais finders e só troca o loader
+        self._buscando = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(nome, caminho, alvo)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._buscando = False
+
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _LoaderCronometrado(spec.loader, self)
+        return spec
+
+    def _medir(self, nome, funcao, *args):
+        # Cada nível da pilha acumula o tempo dos módulos importados por ele
+        self._pilha.append(0.0)
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args)
+        finally:
+            total = time.perf_counter() - inicio
+            filhos = self._pilha.pop()
+            if self._pilha:
+                self._pilha[-1] += total
+            tempos = self.tempos.setdefault(nome, [0.0, 0.0])
+            tempos[0] += total - filhos
+            tempos[1] += total
+
+    def marcar_fim_inicializacao(self):
+        """Registra o fim da inicialização (importações de topo do main.py)"""
+        if self.fim_inicializacao is None:
+            self.fim_inicializacao = time.perf_counter()
+
+    def medir_importacoes(self, modulos):
+        """
+        Importa módulos (ainda não carregados) um a um, medindo cada importação
+
+        Dependências já carregadas por um módulo anterior não são contadas de novo.
+
+        Args:
+            modulos: Nomes completos dos módulos, na ordem em que seriam usados
+
+        Returns:
+            list: [(modulo, segundos, erro ou None)]
+        """
+        medicoes = []
+        for modulo in modulos:
+            inicio = time.perf_counter()
+            erro = None
+            try:
+                importlib.import_module(modulo)
+            except Exception as e:
+                erro = f"{type(e).__name__}: {e}"
+            medicoes.append((modulo, time.perf_counter() - inicio, erro))
+        return medicoes
+
+    def por_pacote(self):
+        """
+        Returns:
+            list: [(pacote, segundos)] com o tempo próprio somado por pacote de terceiros
+                  (módulos do projeto aparecem individualmente), do maior para o menor
+        """
+        totais = {}
+        for modulo, (proprio, _) in self.tempos.items():
+            pacote = modulo if modulo.split('.')[0] in PACOTES_PROJETO else modulo.split('.')[0]
+            totais[pacote] = totais.get(pacote, 0.0) + proprio
+        return sorted(totais.items(), key=lambda item: item[1], reverse=True)
+
+    def imprimir(self, medicoes_adiadas=()):
+        """
+        Exibe no console o relatório de custo das importações
+
+        Args:
+            medicoes_adiadas: Resultado de medir_importacoes para os módulos adiados
+        """
+        self.marcar_fim_inicializacao()
+
+        print("\n" + "="*60)
+        print("⏱️ PERFIL DE INICIALIZAÇÃO (custo das importações)")
+        print("="*60)
+        print(f"   • Inicialização do main.py (importações de topo): {(self.fim_inicializacao - self.inicio) * 1000:,.0f} ms")
+        if medicoes_adiadas:
+            total_adiado = sum(segundos for _, segundos, _ in medicoes_adiadas)
+            print(f"   • Importações adiadas até o ponto de uso: {total_adiado * 1000:,.0f} ms")
+        print(f"   • Módulos carregados: {len(self.tempos)}")
+
+        if medicoes_adiadas:
+            print(f"\n📦 IMPORTAÇÕES ADIADAS (na ordem de uso; dependências já carregadas não contam de novo):")
+            for modulo, segundos, erro in medicoes_adiadas:
+                complemento = f"  ⚠️ {erro}" if erro else ''
+                print(f"   {modulo:<62} {segundos * 1000:>8,.0f} ms{complemento}")
+
+        print(f"\n📚 POR PACOTE (tempo próprio somado):")
+        for pacote, segundos in self.por_pacote()[:LINHAS_RELATORIO]:
+            print(f"   {pacote:<62} {segundos * 1000:>8,.0f} ms")
+
+        print(f"\n🐢 MÓDULOS MAIS LENTOS (próprio | acumulado):")
+        mais_lentos = sorted(self.tempos.items(), key=lambda item: item[1][0], reverse=True)
+        for modulo, (proprio, acumulado) in mais_lentos[:LINHAS_RELATORIO]:
+            print(f"   {modulo:<50} {proprio * 1000:>8,.1f} ms | {acumulado * 1000:>8,.1f} ms")
+
+        print("="*60 + "\n")
+
+
+_perfil = None
+
+
+def iniciar_perfil():
+    """
+    Instala o cronômetro de importações (uma vez só)
+
+    Returns:
+        PerfilImportacoes
+    """
+    global _perfil
+
+    if _perfil is None:
+        _perfil = PerfilImportacoes()
+        _perfil.instalar()
+    return _perfil
+
+
+def obter_perfil():
+    """
+    Returns:
+        PerfilImportacoes ativo ou None se o --profile-startup não foi pedido
+    """
+    return _perfil
@@ -0,0 +1,305 @@
+"""
+Módulo de execução das etapas do main.py como um grafo de dependências (DAG)
+
+Cada etapa (extração, consolidação, relatório, upload...) declara de quais
+outras depende, e o executor a dispara assim que todas terminam: a
+consolidação de um endpoint começa quando a extração DELE acaba, sem esperar
+os outros 19. Etapas independentes rodam em paralelo; grupos limitam quantas
+etapas de um mesmo tipo rodam juntas (ex.: uma consolidação por vez, para não
+somar o pico de memória de vários DataFrames grandes).
+
+Etapas externas (sem função) são concluídas por outra etapa, via concluir():
+é assim que o agendador global, que extrai todos os endpoints numa fila
+única, avisa o grafo de que um endpoint terminou.
+
+O grafo e os tempos de cada etapa podem ser impressos para análise.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Situações finais de uma etapa
+STATUS_FINAIS = ('concluida', 'erro', 'ignorada')
+
+
+class Etapa:
+    """Nó do grafo: uma função, suas dependências e os tempos da execução"""
+
+    def __init__(self, nome, funcao, dependencias, grupo, concluida_por):
+        self.nome = nome
+        self.funcao = funcao
+        self.dependencias = list(dependencias)
+        self.grupo = grupo
+        self.concluida_por = concluida_por
+        self.status = 'pendente'
+        self.resultado = None
+        self.erro = None
+        self.inicio = None
+        self.fim = None
+
+    @property
+    def duracao(self):
+        if self.inicio is None or self.fim is None:
+            return None
+        return self.fim - self.inicio
+
+
+class PipelineDAG:
+    """Executor de etapas com dependências, disparando cada uma assim que possível"""
+
+    def __init__(self, max_paralelas=4):
+        """
+        Args:
+            max_paralelas: Máximo de etapas (com função) executadas ao mesmo tempo
+        """
+        self.max_paralelas = max(1, int(max_paralelas))
+        self.etapas = {}
+        self.limites_grupos = {}
+        self.inicio = None
+        self._em_execucao = {}
+        self._condicao = threading.Condition()
+
+    def adicionar(self, nome, funcao=None, dependencias=(), grupo=None, concluida_por=None):
+        """
+        Registra uma etapa
+
+        As dependências precisam ter sido registradas antes, o que garante que o
+        grafo não tem ciclos.
+
+        Args:
+            nome: Nome único da etapa (ex.: 'extrair:Consumo')
+            funcao: Função sem argumentos executada pela etapa; None = etapa externa,
+                    concluída por outra etapa com concluir()
+            dependencias: Nomes das etapas que precisam terminar antes
+            grupo: Grupo da etapa, para limitar_grupo (ex.: 'consolidacao')
+            concluida_por: Etapa que conclui esta etapa externa (só para exibir o grafo)
+
+        Returns:
+            str: O nome da etapa
+
+        Raises:
+            ValueError: Nome repetido ou dependência desconhecida
+        """
+        if nome in self.etapas:
+            raise ValueError(f"Etapa repetida no pipeline: {nome}")
+
+        desconhecidas = [dependencia for dependencia in dependencias if dependencia not in self.etapas]
+        if desconhecidas:
+            raise ValueError(f"Etapa {nome} depende de etapas não registradas: {desconhecidas}")
+
+        self.etapas[nome] = Etapa(nome, funcao, dependencias, grupo, concluida_por)
+        return nome
+
+    def limitar_grupo(self, grupo, max_paralelas):
+        """
+        Limita quantas etapas de um grupo executam ao mesmo tempo
+
+        Args:
+            grupo: Nome do grupo
+            max_paralelas: Máximo de etapas do grupo em execução
+        """
+        self.limites_grupos[grupo] = max(1, int(max_paralelas))
+
+    def concluir(self, nome, resultado=None, erro=None):
+        """
+        Conclui uma etapa externa (chamado pela etapa que faz o trabalho dela)
+
+        Args:
+            nome: Nome da etapa
+            resultado: Resultado da etapa
+            erro: Exceção ou mensagem, se a etapa falhou (as dependentes são ignoradas)
+        """
+        with self._condicao:
+            etapa = self.etapas[nome]
+            if etapa.status in STATUS_FINAIS:
+                return
+            agora = time.time()
+            if etapa.inicio is None:
+                etapa.inicio = agora
+            etapa.fim = agora
+            etapa.resultado = resultado
+            etapa.erro = erro
+            etapa.status = 'erro' if erro is not None else 'concluida'
+            self._condicao.notify_all()
+
+    def resultado(self, nome):
+        """
+        Returns:
+            Resultado da etapa (None se ainda não concluiu, falhou ou foi ignorada)
+        """
+        return self.etapas[nome].resultado
+
+    def _propagar_falhas(self):
+        """Marca como ignoradas as etapas pendentes cuja dependência falhou ou foi ignorada"""
+        for etapa in self.etapas.values():
+            if etapa.status != 'pendente':
+                continue
+            falhas = [d for d in etapa.dependencias if self.etapas[d].status in ('erro', 'ignorada')]
+            if falhas:
+                etapa.status = 'ignorada'
+                etapa.erro = f"dependência não concluída: {falhas[0]}"
+
+    def _prontas(self):
+        """Etapas pendentes com todas as dependências concluídas, na ordem de registro"""
+        return [
+            etapa for etapa in self.etapas.values()
+            if etapa.status == 'pendente'
+            and all(self.etapas[d].status == 'concluida' for d in etapa.dependencias)
+        ]
+
+    def _tem_vaga(self, etapa):
+        if sum(self._em_execucao.values()) >= self.max_paralelas:
+            return False
+        limite = self.limites_grupos.get(etapa.grupo)
+        return limite is None or self._em_execucao.get(etapa.grupo, 0) < limite
+
+    def _rodar(self, etapa):
+        resultado, erro = None, None
+        try:
+            resultado = etapa.funcao()
+        except Exception as e:
+            erro = e
+        finally:
+            # Sempre libera a vaga, mesmo que a etapa termine de forma inesperada
+            with self._condicao:
+                etapa.fim = time.time()
+                etapa.resultado = resultado
+                etapa.erro = erro
+                etapa.status = 'erro' if erro is not None else 'concluida'
+                self._em_execucao[etapa.grupo] -= 1
+                self._condicao.notify_all()
+
+        if erro is not None:
+            print(f"❌ Erro na etapa {etapa.nome}: {erro}")
+
+    def executar(self):
+        """
+        Executa o grafo até todas as etapas terminarem (concluídas, com erro ou ignoradas)
+
+        Returns:
+            dict: {nome_etapa: resultado}
+        """
+        self.inicio = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.max_paralelas) as executor:
+            with self._condicao:
+                while True:
+                    self._propagar_falhas()
+
+                    for etapa in self._prontas():
+                        if etapa.funcao is None:
+                            # Externa: só espera quem a conclui
+                            etapa.status = 'aguardando'
+                            etapa.inicio = time.time()
+                        elif self._tem_vaga(etapa):
+                            etapa.status = 'executando'
+                            etapa.inicio = time.time()
+                            self._em_execucao[etapa.grupo] = self._em_execucao.get(etapa.grupo, 0) + 1
+                            executor.submit(self._rodar, etapa)
+
+                    if all(etapa.status in STATUS_FINAIS for etapa in self.etapas.values()):
+                        break
+
+                    if not any(self._em_execucao.values()):
+                        # Nada executando: as externas restantes não têm mais quem as conclua
+                        for etapa in self.etapas.values():
+                            if etapa.status == 'aguardando':
+                                etapa.status = 'erro'
+                                etapa.erro = "etapa externa não concluída"
+                                etapa.fim = time.time()
+                        continue
+
+                    self._condicao.wait()
+
+        return {nome: etapa.resultado for nome, etapa in self.etapas.items()}
+
+    def _niveis(self):
+        """Nível de cada etapa no grafo (0 = sem dependências)"""
+        niveis = {}
+        for nome, etapa in self.etapas.items():
+            niveis[nome] = 1 + max((niveis[d] for d in etapa.dependencias), default=-1)
+        return niveis
+
+    def imprimir_grafo(self):
+        """Exibe no console as etapas por nível, com as dependências de cada uma"""
+        niveis = self._niveis()
+
+        print(f"🕸️ GRAFO DE ETAPAS ({len(self.etapas)} etapas | até {self.max_paralelas} em paralelo)")
+        for grupo, limite in self.limites_grupos.items():
+            print(f"   • Grupo '{grupo}': até {limite} por vez")
+
+        for nivel in range(max(niveis.values(), default=-1) + 1):
+            print(f"   Nível {nivel}:")
+            for nome, etapa in self.etapas.items():
+                if niveis[nome] != nivel:
+                    continue
+                detalhes = []
+                if etapa.dependencias:
+                    dependencias = etapa.dependencias
+                    if len(dependencias) > 3:
+                        dependencias = dependencias[:3] + [f"+{len(dependencias) - 3}"]
+                    detalhes.append(f"← {', '.join(dependencias)}")
+                if etapa.concluida_por:
+                    detalhes.append(f"(via {etapa.concluida_por})")
+                print(f"      • {nome} {' '.join(detalhes)}".rstrip())
+
+    def caminho_critico(self):
+        """
+        Cadeia de etapas que determinou o fim da execução
+
+        Parte da última etapa a terminar e volta sempre pela dependência que
+        terminou por último (a que a segurou).
+
+        Returns:
+            list: Nomes das etapas, da primeira à última
+        """
+        terminadas = [etapa for etapa in self.etapas.values() if etapa.status == 'concluida']
+        if not terminadas:
+            return []
+
+        etapa = max(terminadas, key=lambda e: e.fim)
+        caminho = [etapa.nome]
+        while True:
+            dependencias = [self.etapas[d] for d in etapa.dependencias if self.etapas[d].status == 'concluida']
+            if not dependencias:
+                break
+            etapa = max(dependencias, key=lambda e: e.fim)
+            caminho.append(etapa.nome)
+
+        return caminho[::-1]
+
+    def tempos(self):
+        """
+        Returns:
+            list: [{'etapa', 'grupo', 'status', 'inicio_s', 'duracao_s', 'erro'}], na ordem de início
+                  (inicio_s relativo ao início do pipeline)
+        """
+        linhas = []
+        for etapa in self.etapas.values():
+            linhas.append({
+                'etapa': etapa.nome,
+                'grupo': etapa.grupo or '',
+                'status': etapa.status,
+                'inicio_s': round(etapa.inicio - self.inicio, 2) if etapa.inicio and self.inicio else None,
+                'duracao_s': round(etapa.duracao, 2) if etapa.duracao is not None else None,
+                'erro': str(etapa.erro) if etapa.erro is not None else ''
+            })
+
+        return sorted(linhas, key=lambda linha: (linha['inicio_s'] is None, linha['inicio_s'] or 0))
+
+    def imprimir_tempos(self):
+        """Exibe no console início, duração e situação de cada etapa, e o caminho crítico"""
+        icones = {'concluida': '✅', 'erro': '❌', 'ignorada': '⏭️', 'pendente': '⏸️'}
+
+        print(f"⏱️ TEMPOS DAS ETAPAS:")
+        for linha in self.tempos():
+            icone = icones.get(linha['status'], '🔄')
+            inicio = f"+{linha['inicio_s']:.1f}s" if linha['inicio_s'] is not None else '-'
+            duracao = f"{linha['duracao_s']:.1f}s" if linha['duracao_s'] is not None else '-'
+            print(f"   {icone} {linha['etapa']:<60} início {inicio:>9} | duração {duracao:>9}")
+            if linha['erro'] and linha['status'] != 'concluida':
+                print(f"      └─ {linha['erro']}")
+
+        caminho = self.caminho_critico()
+        if caminho:
+            print(f"\n   🧭 Caminho crítico: {' → '.join(caminho)}")
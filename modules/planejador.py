@@ -0,0 +1,289 @@
+"""
+Módulo do planejamento de uma execução sem acesso à rede (--plan)
+
+Monta, para cada endpoint, a mesma lista de requisições que a extração faria:
+plano de competências já filtrado pela análise incremental, filtro de
+unidades do APIS_CONFIG, competências recuperáveis do checkpoint, faixas de
+competências contíguas e respostas já guardadas no cache. Nenhuma requisição
+é enviada.
+
+A duração de cada endpoint é estimada com os relatorio_execucao_*.csv de
+execuções anteriores: tempo médio por competência que foi à rede (o tempo de
+uma faixa é repartido entre os meses dela) × fator de ritmo (duração real de
+cada execução ÷ soma dos tempos das requisições - inclui delays, retries e o
+paralelismo).
+"""
+import glob
+import os
+from datetime import datetime
+import pandas as pd
+from config.api_config import APIS_CONFIG
+from modules.api_extractor import _agrupar_competencias_contiguas, _montar_payload_faixa, _situacao_faixa
+from modules.checkpoint import JournalExtracao
+from modules.response_cache import obter_cache, SITUACAO_CACHEAVEL
+
+# Relatórios de execução mais recentes usados na estimativa
+MAX_RELATORIOS_HISTORICO = 10
+
+
+def _origem_requisicao(nome_api, tarefa, payload, situacao, cache, plano):
+    """'cache' se a resposta já está guardada (e continua valendo), senão 'rede'"""
+    if cache is None or situacao != SITUACAO_CACHEAVEL:
+        return 'rede'
+    if any(plano.ignora_cache(unidade['unidade_id'], unidade['competencia']) for _, unidade in tarefa):
+        return 'rede'
+    unidade = tarefa[0][1]
+    chave = cache.gerar_chave(nome_api, unidade['unidade_id'], payload, situacao)
+    return 'cache' if cache.contem(chave) else 'rede'
+
+
+def _requisicao(nome_api, tarefa, origem):
+    primeira = tarefa[0][1]
+    ultima = tarefa[-1][1]
+    return {
+        'endpoint': nome_api,
+        'unidade_id': primeira['unidade_id'],
+        'unidade': primeira['nome'],
+        'competencia_inicial': primeira['competencia'],
+        'competencia_final': ultima['competencia'],
+        'competencias': len(tarefa),
+        'origem': origem
+    }
+
+
+def planejar_endpoint(nome_api, plano, caminho_to_save, agrupar_por_unidade=True, usar_checkpoint=True):
+    """
+    Requisições que a extração de um endpoint faria, sem enviá-las
+
+    Args:
+        nome_api: Nome do endpoint (chave do APIS_CONFIG)
+        plano: PlanoExtracao da execução
+        caminho_to_save: Diretório do mês (onde fica o checkpoint)
+        agrupar_por_unidade: Mesma opção da extração
+        usar_checkpoint: Se True, desconta as competências já concluídas no journal
+
+    Returns:
+        dict: {'endpoint', 'competencias', 'checkpoint', 'requisicoes': [dict]}
+              Cada requisição: endpoint, unidade_id, unidade, competencia_inicial,
+              competencia_final, competencias e origem ('rede', 'cache' ou 'erro_payload')
+    """
+    config = APIS_CONFIG[nome_api]
+    df = plano.para_endpoint(nome_api, agrupar_por_unidade, config.get('filtro_unidades'))
+    linhas = [(posicao, unidade) for posicao, (_, unidade) in enumerate(df.iterrows())]
+    total = len(linhas)
+
+    recuperadas = 0
+    if usar_checkpoint and linhas:
+        recuperados, linhas = JournalExtracao(caminho_to_save, nome_api).recuperar(linhas)
+        recuperadas = len(recuperados)
+
+    # Faixas só no processamento padrão de 'items', como em extrair_dados_api
+    processamento_padrao = config.get('processar_func') is None and not config.get('achatamento')
+    max_faixa = config.get('max_competencias_por_requisicao', 1) if processamento_padrao else 1
+
+    cache = obter_cache()
+    payload_func = config['payload_func']
+    requisicoes = []
+
+    for tarefa in _agrupar_competencias_contiguas(linhas, max_faixa):
+        if len(tarefa) > 1:
+            payload = _montar_payload_faixa(tarefa, payload_func)
+            if payload is not None:
+                origem = _origem_requisicao(nome_api, tarefa, payload, _situacao_faixa(tarefa), cache, plano)
+                requisicoes.append(_requisicao(nome_api, tarefa, origem))
+                continue
+
+        # Uma requisição por competência (também quando o payload não aceita faixa)
+        for posicao, unidade in tarefa:
+            try:
+                payload = payload_func(unidade)
+            except Exception:
+                requisicoes.append(_requisicao(nome_api, [(posicao, unidade)], 'erro_payload'))
+                continue
+            origem = _origem_requisicao(nome_api, [(posicao, unidade)], payload, unidade.get('situacao'), cache, plano)
+            requisicoes.append(_requisicao(nome_api, [(posicao, unidade)], origem))
+
+    return {
+        'endpoint': nome_api,
+        'competencias': total,
+        'checkpoint': recuperadas,
+        'requisicoes': requisicoes
+    }
+
+
+def carregar_historico(diretorio_base, max_relatorios=MAX_RELATORIOS_HISTORICO):
+    """
+    Lê os relatórios de execução mais recentes (relatorio_execucao_*.csv)
+
+    Args:
+        diretorio_base: Diretório buscado recursivamente (ex.: caminho_fixo)
+        max_relatorios: Quantidade de relatórios mais recentes considerados
+
+    Returns:
+        DataFrame com as linhas dos relatórios (coluna 'relatorio' = arquivo de origem) ou None
+    """
+    arquivos = glob.glob(os.path.join(diretorio_base, '**', 'relatorio_execucao_*.csv'), recursive=True)
+
+    # O nome termina no timestamp (AAAAMMDD_HHMMSS): ordem alfabética = cronológica
+    arquivos = sorted(arquivos, key=os.path.basename)[-max_relatorios:]
+
+    dfs = []
+    for arquivo in arquivos:
+        try:
+            df = pd.read_csv(arquivo, sep=';', encoding='utf-8-sig')
+        except Exception as e:
+            print(f"⚠️ Relatório ignorado ({os.path.basename(arquivo)}): {e}")
+            continue
+        if not {'endpoint', 'status', 'tempo_execucao_s'} <= set(df.columns):
+            continue
+        df['relatorio'] = os.path.basename(arquivo)
+        dfs.append(df)
+
+    if not dfs:
+        return None
+
+    return pd.concat(dfs, ignore_index=True)
+
+
+def estimar_tempos(historico):
+    """
+    Tempos de referência calculados a partir do histórico
+
+    Args:
+        historico: Retorno de carregar_historico
+
+    Returns:
+        dict: {'por_endpoint': {endpoint: s por competência}, 'geral': s por competência,
+               'fator_ritmo': float, 'relatorios': int} ou None sem histórico útil
+    """
+    if historico is None or historico.empty:
+        return None
+
+    # Só o que foi à rede: respostas do cache e circuitos abertos não têm tempo de requisição
+    rede = historico[historico['status'] != 'ignorado']
+    if 'codificacao' in rede.columns:
+        rede = rede[rede['codificacao'].fillna('') != 'cache']
+    if rede.empty:
+        return None
+
+    por_endpoint = rede.groupby('endpoint')['tempo_execucao_s'].mean().to_dict()
+    geral = float(rede['tempo_execucao_s'].mean())
+
+    fator_ritmo = 1.0
+    if 'data_hora' in historico.columns:
+        datas = pd.to_datetime(historico['data_hora'], errors='coerce')
+        por_relatorio = datas.groupby(historico['relatorio'])
+        duracao = (por_relatorio.max() - por_relatorio.min()).dt.total_seconds()
+        soma = rede.groupby('relatorio')['tempo_execucao_s'].sum().reindex(duracao.index)
+        validos = (duracao > 0) & (soma > 0)
+        if validos.any():
+            fator_ritmo = float(duracao[validos].sum() / soma[validos].sum())
+
+    return {
+        'por_endpoint': por_endpoint,
+        'geral': geral,
+        'fator_ritmo': fator_ritmo,
+        'relatorios': int(historico['relatorio'].nunique())
+    }
+
+
+def estimar_endpoint(plano_endpoint, tempos):
+    """
+    Duração estimada da extração de um endpoint
+
+    Args:
+        plano_endpoint: Retorno de planejar_endpoint
+        tempos: Retorno de estimar_tempos (None = sem estimativa)
+
+    Returns:
+        float: Segundos, ou None sem histórico
+    """
+    if tempos is None:
+        return None
+
+    competencias_rede = sum(
+        requisicao['competencias'] for requisicao in plano_endpoint['requisicoes']
+        if requisicao['origem'] == 'rede'
+    )
+    tempo_competencia = tempos['por_endpoint'].get(plano_endpoint['endpoint'], tempos['geral'])
+    return competencias_rede * tempo_competencia * tempos['fator_ritmo']
+
+
+def _formatar_duracao(segundos):
+    if segundos is None:
+        return 'sem histórico'
+    segundos = int(round(segundos))
+    if segundos >= 3600:
+        return f"{segundos // 3600}h {segundos % 3600 // 60:02d}m"
+    if segundos >= 60:
+        return f"{segundos // 60}m {segundos % 60:02d}s"
+    return f"{segundos}s"
+
+
+def salvar_requisicoes(planos, caminho_destino):
+    """
+    Grava a lista completa de requisições planejadas em CSV
+
+    Args:
+        planos: Lista de retornos de planejar_endpoint
+        caminho_destino: Diretório de destino
+
+    Returns:
+        str: Caminho do CSV
+    """
+    requisicoes = [requisicao for plano_endpoint in planos for requisicao in plano_endpoint['requisicoes']]
+    colunas = ['endpoint', 'unidade_id', 'unidade', 'competencia_inicial', 'competencia_final', 'competencias', 'origem']
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    caminho_csv = os.path.join(caminho_destino, f"plano_execucao_{timestamp}.csv")
+    pd.DataFrame(requisicoes, columns=colunas).to_csv(caminho_csv, index=False, sep=';', encoding='utf-8-sig')
+    return caminho_csv
+
+
+def imprimir_plano(planos, tempos):
+    """
+    Exibe no console o plano por endpoint e a estimativa de duração
+
+    Args:
+        planos: Lista de retornos de planejar_endpoint
+        tempos: Retorno de estimar_tempos (None = sem estimativa)
+    """
+    print(f"\n🗺️ PLANO DE EXECUÇÃO (nenhuma requisição enviada):")
+    print(f"   {'Endpoint':<48} {'Compet.':>7} {'Checkp.':>7} {'Requis.':>7} {'Cache':>6} {'Rede':>6}  Estimativa")
+
+    totais = {'competencias': 0, 'checkpoint': 0, 'requisicoes': 0, 'cache': 0, 'rede': 0}
+    estimativa_total = 0.0 if tempos else None
+
+    for plano_endpoint in planos:
+        requisicoes = plano_endpoint['requisicoes']
+        cache = sum(1 for requisicao in requisicoes if requisicao['origem'] == 'cache')
+        rede = sum(1 for requisicao in requisicoes if requisicao['origem'] == 'rede')
+        estimativa = estimar_endpoint(plano_endpoint, tempos)
+
+        totais['competencias'] += plano_endpoint['competencias']
+        totais['checkpoint'] += plano_endpoint['checkpoint']
+        totais['requisicoes'] += len(requisicoes)
+        totais['cache'] += cache
+        totais['rede'] += rede
+        if estimativa is not None:
+            estimativa_total += estimativa
+
+        print(f"   {plano_endpoint['endpoint']:<48} {plano_endpoint['competencias']:>7} "
+              f"{plano_endpoint['checkpoint']:>7} {len(requisicoes):>7} {cache:>6} {rede:>6}  "
+              f"{_formatar_duracao(estimativa)}")
+
+        erros_payload = sum(1 for requisicao in requisicoes if requisicao['origem'] == 'erro_payload')
+        if erros_payload:
+            print(f"      └─ ⚠️ {erros_payload} competência(s) sem payload válido (não serão requisitadas)")
+
+    print(f"   {'TOTAL':<48} {totais['competencias']:>7} {totais['checkpoint']:>7} "
+          f"{totais['requisicoes']:>7} {totais['cache']:>6} {totais['rede']:>6}  "
+          f"{_formatar_duracao(estimativa_total)}")
+
+    print()
+    if tempos:
+        print(f"⏱️ Estimativa total: {_formatar_duracao(estimativa_total)} "
+              f"(base: {tempos['relatorios']} relatório(s) anteriores | "
+              f"{tempos['geral']:.2f}s por competência em média | fator de ritmo {tempos['fator_ritmo']:.2f})")
+    else:
+        print("⏱️ Sem relatórios de execuções anteriores: não há como estimar a duração")
@@ -0,0 +1,182 @@
+"""
+Módulo do plano de extração
+
+O arquivo de competências (api_competencia + filtro incremental) é lido uma
+única vez e vira um PlanoExtracao: uma tabela enxuta, só com as colunas que os
+endpoints usam, já sem as competências abertas e já ordenada por unidade. Cada
+endpoint recebe o plano e pede a sua visão dele (ordem e filtro de unidades),
+montada em memória - em vez de cada um reler o Excel com o openpyxl e de a
+Composição de Custos gravar um Excel temporário só para filtrar unidades.
+"""
+import re
+import pandas as pd
+from modules.competencia import padronizar_competencia, padronizar_serie_competencia
+
+# Colunas do arquivo de competências usadas pelos endpoints
+COLUNAS_PLANO = ['unidade_id', 'token', 'competencia', 'nome', 'situacao']
+
+
+class PlanoExtracao:
+    """
+    Competências a extrair, compartilhadas por todos os endpoints de uma execução
+    """
+
+    def __init__(self, df_competencias, arquivo=None, competencias_sem_cache=None):
+        """
+        Args:
+            df_competencias: DataFrame do arquivo de competências
+            arquivo: Caminho do arquivo de origem (informativo)
+            competencias_sem_cache: Pares (unidade_id, competência) cujas respostas guardadas
+                                    no cache não valem mais (reabertas desde a última
+                                    extração ou reextraídas de propósito)
+
+        Raises:
+            ValueError: Se faltarem colunas necessárias
+        """
+        colunas_faltantes = [col for col in COLUNAS_PLANO if col not in df_competencias.columns]
+        if colunas_faltantes:
+            raise ValueError(f"Colunas faltantes no arquivo: {colunas_faltantes}")
+
+        self.arquivo = arquivo
+        self.competencias_sem_cache = {
+            (str(unidade_id), padronizar_competencia(competencia))
+            for unidade_id, competencia in (competencias_sem_cache or ())
+        }
+
+        # Filtra apenas competências fechadas
+        df = df_competencias.loc[df_competencias['situacao'] != "ABERTA", COLUNAS_PLANO]
+        self.df = df.reset_index(drop=True)
+        self.df_por_unidade = df.sort_values(['unidade_id', 'competencia'], kind='stable').reset_index(drop=True)
+
+        self._filtros = {}
+
+    @classmethod
+    def de_arquivo(cls, caminho_arquivo):
+        """
+        Monta o plano a partir de um arquivo de competências (.xlsx)
+
+        Args:
+            caminho_arquivo: Caminho do Excel com competências
+
+        Returns:
+            PlanoExtracao
+        """
+        return cls(pd.read_excel(caminho_arquivo), arquivo=caminho_arquivo)
+
+    def __len__(self):
+        return len(self.df)
+
+    def restringir(self, unidades=None, competencias=None):
+        """
+        Plano só com as unidades e competências pedidas (reextração seletiva)
+
+        Args:
+            unidades: IDs de unidade ou trechos do nome (sem diferenciar maiúsculas);
+                      None = todas
+            competencias: Competências ('MM/YYYY', 'jan/2025'...); None = todas
+
+        Returns:
+            PlanoExtracao com as linhas selecionadas (pode ficar vazio)
+        """
+        df = self.df
+        mascara = pd.Series(True, index=df.index)
+
+        if unidades:
+            ids = df['unidade_id'].astype(str)
+            nomes = df['nome'].astype(str).str.lower()
+            mascara_unidades = pd.Series(False, index=df.index)
+            for unidade in unidades:
+                selecionadas = (ids == str(unidade)) | nomes.str.contains(str(unidade).lower(), regex=False)
+                if not selecionadas.any():
+                    print(f"⚠️ Unidade não encontrada no plano: {unidade}")
+                mascara_unidades |= selecionadas
+            mascara &= mascara_unidades
+
+        if competencias:
+            pedidas = {padronizar_competencia(competencia) for competencia in competencias}
+            competencias_plano = padronizar_serie_competencia(df['competencia'])
+            for competencia in sorted(pedidas - set(competencias_plano.dropna())):
+                print(f"⚠️ Competência não encontrada no plano: {competencia}")
+            mascara &= competencias_plano.isin(pedidas)
+
+        return PlanoExtracao(
+            df[mascara].reset_index(drop=True),
+            arquivo=self.arquivo,
+            competencias_sem_cache=self.competencias_sem_cache
+        )
+
+    def ignora_cache(self, unidade_id, competencia):
+        """
+        Args:
+            unidade_id: ID da unidade
+            competencia: Competência
+
+        Returns:
+            bool: True se a resposta guardada no cache para o par não vale mais
+        """
+        return (str(unidade_id), padronizar_competencia(competencia)) in self.competencias_sem_cache
+
+    def _mascara_unidades(self, filtro_unidades):
+        """
+        Máscara (por linha de self.df) das unidades que passam no filtro
+
+        O filtro é avaliado uma vez por nome de unidade distinto e memoizado,
+        já que vários endpoints podem declarar o mesmo filtro.
+        """
+        incluir = tuple(filtro_unidades.get('incluir', []))
+        excluir = tuple(filtro_unidades.get('excluir', []))
+        chave = (incluir, excluir)
+
+        if chave not in self._filtros:
+            nomes = pd.Series(self.df['nome'].dropna().unique())
+            validos = pd.Series(True, index=nomes.index)
+
+            # Nomes de unidades excluídas (comparação literal, sem diferenciar maiúsculas)
+            if excluir:
+                padrao = '|'.join(re.escape(nome) for nome in excluir)
+                validos &= ~nomes.str.contains(padrao, case=False, na=False, regex=True)
+
+            # Palavras-chave: basta o nome conter uma delas
+            if incluir:
+                padrao = '|'.join(incluir)
+                validos &= nomes.str.contains(padrao, case=False, na=False, regex=True)
+
+            self._filtros[chave] = set(nomes[validos])
+
+        return self._filtros[chave]
+
+    def para_endpoint(self, nome_api=None, agrupar_por_unidade=True, filtro_unidades=None):
+        """
+        Competências a processar por um endpoint
+
+        Args:
+            nome_api: Nome da API (só para as mensagens)
+            agrupar_por_unidade: Se True, ordenadas por unidade e competência
+            filtro_unidades: Dicionário 'filtro_unidades' do APIS_CONFIG
+                             ({'incluir': [palavras-chave], 'excluir': [nomes]}) ou None
+
+        Returns:
+            DataFrame (índice 0..n-1) - vazio se nenhuma competência se aplica
+        """
+        df = self.df_por_unidade if agrupar_por_unidade else self.df
+
+        if not filtro_unidades:
+            return df
+
+        nomes_validos = self._mascara_unidades(filtro_unidades)
+        df_filtrado = df[df['nome'].isin(nomes_validos)].reset_index(drop=True)
+
+        # Unidades excluídas pelo nome não contam como "ignoradas" no aviso
+        nao_excluidas = self._mascara_unidades({'excluir': filtro_unidades.get('excluir', [])})
+        total_antes = int(df['nome'].isin(nao_excluidas).sum())
+        total_depois = len(df_filtrado)
+
+        if total_depois < total_antes:
+            print(f"\n⚠️ AVISO: {nome_api or 'Endpoint'} - Filtro por Nome de Unidade")
+            print(f"   📊 Total de competências no arquivo: {total_antes}")
+            print(f"   ✅ Competências aplicáveis: {total_depois}")
+            print(f"   ⏭️ Competências ignoradas: {total_antes - total_depois}")
+            if filtro_unidades.get('incluir'):
+                print(f"   💡 Filtrado por palavras-chave: {', '.join(filtro_unidades['incluir'])}\n")
+
+        return df_filtrado
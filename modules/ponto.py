@@ -9,6 +9,13 @@ import glob
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from dotenv import load_dotenv
+from modules.competencia import padronizar_competencia
+from modules.schema import obter_schema, dtypes_leitura, concatenar
+from modules.formato_saida import EXTENSOES_BUSCA, obter_formato_saida, salvar_dataframe, ler_parquet
+from modules.plano_extracao import PlanoExtracao
+
+# Subdiretório do mês onde o arquivo completo espera durante uma reextração seletiva
+DIRETORIO_REEXTRACAO = '_reextracao'
 
 
 class AnalisadorIncremental:
@@ -24,6 +31,8 @@ class AnalisadorIncremental:
         self.caminho_atual = caminho_atual
         self.caminho_mes_1 = None  # Mês -1
         self.caminho_mes_2 = None  # Mês -2
+        self.df_filtrado = None    # Competências a processar (após o filtro incremental)
+        self.competencias_reabertas = set()  # (unidade_id, competência) reabertas desde a última extração
         self._obter_caminhos_meses_anteriores()
         
     def _obter_caminhos_meses_anteriores(self):
@@ -116,13 +125,16 @@ class AnalisadorIncremental:
             return None
     
     def filtrar_competencias_nao_processadas(self, arquivo_competencia_atual, 
-                                             processar_somente_fechadas=True):
+                                             processar_somente_fechadas=True,
+                                             salvar=True):
         """
         Filtra competências usando análise de 2 meses anteriores
         
         Args:
             arquivo_competencia_atual: Caminho do arquivo de competências do mês vigente
             processar_somente_fechadas: Se True, processa apenas competências fechadas
+            salvar: Se False, não grava o Excel filtrado (o resultado fica só em
+                    self.df_filtrado, como no --plan)
             
         Returns:
             str: Caminho do arquivo filtrado ou None
@@ -173,11 +185,15 @@ class AnalisadorIncremental:
                 os.path.dirname(arquivo_competencia_atual), 
                 nome_filtrado
             )
-            df_atual_filtrado.to_excel(caminho_filtrado, index=False)
-            print(f"\n💾 Arquivo salvo: {caminho_filtrado}")
+            self.df_filtrado = df_atual_filtrado
+            if salvar:
+                df_atual_filtrado.to_excel(caminho_filtrado, index=False)
+                print(f"\n💾 Arquivo salvo: {caminho_filtrado}")
             return caminho_filtrado
         
-        # Criar chave única para comparação
+        # Criar chave única para comparação. A competência entra como está gravada:
+        # as planilhas de competências já vêm em 'MM/YYYY' (montar_competencia), e
+        # padronizar aqui faria 'jan/2025' de planilhas antigas casar com '01/2025'
         print("\n🔑 Criando chaves de identificação...")
         
         df_atual_filtrado['chave'] = (
@@ -263,6 +279,15 @@ class AnalisadorIncremental:
             ~df_atual_filtrado['chave'].isin(excluir)
         ].copy()
         
+        # Reabertas num dos meses anteriores: o cache de respostas guarda a versão
+        # de antes da reabertura, com a mesma chave da competência fechada de novo
+        df_reabertas = df_final[
+            df_final['chave'].isin(reabertas_mes_1 | reabertas_mes_2 | competencias_para_reprocessar)
+        ]
+        self.competencias_reabertas = set(zip(df_reabertas['unidade_id'], df_reabertas['competencia']))
+        if self.competencias_reabertas:
+            print(f"   • Reabertas desde a última extração (sem cache): {len(self.competencias_reabertas)}")
+        
         df_final = df_final.drop(columns=['chave'])
         
         total_final = len(df_final)
@@ -281,14 +306,16 @@ class AnalisadorIncremental:
             nome_filtrado
         )
         
-        df_final.to_excel(caminho_filtrado, index=False)
-        print(f"\n✅ Arquivo filtrado salvo: {caminho_filtrado}")
+        self.df_filtrado = df_final
+        if salvar:
+            df_final.to_excel(caminho_filtrado, index=False)
+            print(f"\n✅ Arquivo filtrado salvo: {caminho_filtrado}")
         
         return caminho_filtrado
     
     def _buscar_arquivo_api(self, diretorio, nome_base):
         """
-        Busca arquivo de uma API (CSV ou XLSX) de forma robusta
+        Busca arquivo de uma API (Parquet, CSV ou XLSX) de forma robusta
         
         Args:
             diretorio: Diretório onde buscar
@@ -298,7 +325,7 @@ class AnalisadorIncremental:
             tuple: (caminho_completo, extensao) ou (None, None)
         """
         # Tenta encontrar arquivo com qualquer extensão
-        for extensao in ['.csv', '.xlsx']:
+        for extensao in EXTENSOES_BUSCA:
             # Padrão: api_estatistica*.csv ou api_estatistica*.xlsx
             padrao = os.path.join(diretorio, f"{nome_base}*{extensao}")
             arquivos = glob.glob(padrao)
@@ -311,22 +338,29 @@ class AnalisadorIncremental:
     
     def _carregar_arquivo_api(self, caminho_arquivo, extensao):
         """
-        Carrega arquivo CSV ou XLSX de forma robusta
+        Carrega arquivo Parquet, CSV ou XLSX de forma robusta
+        
+        As colunas declaradas no schema do endpoint são lidas já com o tipo
+        certo (descritivas como 'category'), sem inferência.
         
         Args:
             caminho_arquivo: Caminho completo do arquivo
-            extensao: '.csv' ou '.xlsx'
+            extensao: '.parquet', '.csv' ou '.xlsx'
             
         Returns:
             DataFrame ou None
         """
         try:
+            if extensao == '.parquet':
+                return ler_parquet(caminho_arquivo)
+            
+            dtype = dtypes_leitura(obter_schema(caminho_arquivo))
             if extensao == '.csv':
                 # Importa função robusta de leitura CSV
                 from modules.csv_reader import ler_csv_robusto
-                return ler_csv_robusto(caminho_arquivo, sep=';', encoding='utf-8-sig')
+                return ler_csv_robusto(caminho_arquivo, sep=';', encoding='utf-8-sig', dtype=dtype)
             else:  # .xlsx
-                return pd.read_excel(caminho_arquivo)
+                return pd.read_excel(caminho_arquivo, dtype=dtype)
         except Exception as e:
             print(f"   ❌ Erro ao carregar arquivo: {e}")
             return None
@@ -404,7 +438,7 @@ class AnalisadorIncremental:
         try:
             # IMPORTANTE: Novo primeiro, antigo depois
             # Ao remover duplicatas com keep='first', mantém os NOVOS
-            df_consolidado = pd.concat([df_novo, df_antigo], ignore_index=True)
+            df_consolidado = concatenar([df_novo, df_antigo])
             
             tamanho_antes = len(df_consolidado)
             df_consolidado = df_consolidado.drop_duplicates(keep='first')
@@ -418,10 +452,7 @@ class AnalisadorIncremental:
             # ================================================================
             # PASSO 7: Salvar no formato ORIGINAL
             # ================================================================
-            if extensao_novo == '.csv':
-                df_consolidado.to_csv(arquivo_novo, index=False, sep=';', encoding='utf-8-sig')
-            else:
-                df_consolidado.to_excel(arquivo_novo, index=False)
+            salvar_dataframe(df_consolidado, arquivo_novo)
             
             print(f"   💾 Arquivo consolidado salvo: {os.path.basename(arquivo_novo)}")
             
@@ -521,43 +552,21 @@ class AnalisadorIncremental:
         
         if not colunas_chave:
             print(f"   ⚠️ Não foi possível identificar colunas-chave")
-            df_consolidado = pd.concat([df_antigo, df_novo], ignore_index=True)
+            df_consolidado = concatenar([df_antigo, df_novo])
         else:
             print(f"   🔑 Colunas-chave: {', '.join(colunas_chave[:3])}{'...' if len(colunas_chave) > 3 else ''}")
             
             # ✅ NOVA LÓGICA: Filtra base antiga ANTES de consolidar
-            if competencias_reprocessadas and 'competencia' in df_antigo.columns:
-                registros_antes = len(df_antigo)
-                
-                # Cria chave composta no DataFrame antigo
-                chaves_antigas = set(zip(df_antigo['competencia'], df_antigo['unidade']))
-                
-                # Filtra removendo as chaves que foram reprocessadas
-                mascara = df_antigo.apply(
-                    lambda row: (row['competencia'], row['unidade']) not in competencias_reprocessadas,
-                    axis=1
-                )
-                df_antigo = df_antigo[mascara]
-                
-                registros_removidos = registros_antes - len(df_antigo)
-                
-                if registros_removidos > 0:
-                    print(f"   🗑️ Removidos {registros_removidos:,} registros de competências reprocessadas:")
-                    for comp in competencias_reprocessadas:
-                        print(f"      • {comp}")
-
+            df_antigo = self._remover_competencias_reprocessadas(df_antigo, competencias_reprocessadas)
 
-            df_consolidado = pd.concat([df_novo, df_antigo], ignore_index=True)
+            df_consolidado = concatenar([df_novo, df_antigo])
         
         registros_finais = len(df_consolidado)
         print(f"   ✅ Total consolidado: {registros_finais:,}")
         
         # Salvar
         try:
-            if extensao_novo == '.csv':
-                df_consolidado.to_csv(arquivo_novo, index=False, sep=';', encoding='utf-8-sig')
-            else:
-                df_consolidado.to_excel(arquivo_novo, index=False)
+            salvar_dataframe(df_consolidado, arquivo_novo)
             
             print(f"   💾 Arquivo consolidado salvo")
             return True
@@ -566,46 +575,171 @@ class AnalisadorIncremental:
             print(f"   ❌ Erro ao salvar: {e}")
             return False
 
+    def _remover_competencias_reprocessadas(self, df_antigo, competencias_reprocessadas):
+        """
+        Remove da base antiga os registros das (competência, unidade) extraídas de novo
+        
+        Args:
+            df_antigo: DataFrame já consolidado
+            competencias_reprocessadas: Pares (competência, unidade) reprocessados
+        
+        Returns:
+            DataFrame sem os registros reprocessados
+        """
+        if not competencias_reprocessadas or 'competencia' not in df_antigo.columns:
+            return df_antigo
+        
+        registros_antes = len(df_antigo)
+        
+        # Cria chave composta (competência, unidade) no DataFrame antigo, com os
+        # valores como estão gravados (mesma comparação da versão linha a linha).
+        # Sem padronizar: os arquivos da extração já saem em 'MM/YYYY'
+        # (_transformar_parte) e padronizar mudaria quais registros antigos saem
+        chaves_antigas = pd.MultiIndex.from_arrays([df_antigo['competencia'], df_antigo['unidade']])
+        
+        # Filtra removendo as chaves que foram reprocessadas
+        mascara = ~chaves_antigas.isin(list(competencias_reprocessadas))
+        df_antigo = df_antigo[mascara]
+        
+        registros_removidos = registros_antes - len(df_antigo)
+        
+        if registros_removidos > 0:
+            print(f"   🗑️ Removidos {registros_removidos:,} registros de competências reprocessadas:")
+            for comp in competencias_reprocessadas:
+                print(f"      • {comp}")
+        
+        return df_antigo
+    
+    def _buscar_arquivo_extraido(self, nome_base):
+        """
+        Busca no mês atual o arquivo gravado pela extração de uma API (api_<nome>_MM_YYYY)
+        
+        Diferente de _buscar_arquivo_api, não aceita outro endpoint com o mesmo
+        prefixo (ex.: api_demonstracaocustounitario × ..._porsaida).
+        
+        Returns:
+            tuple: (caminho_completo, extensao) ou (None, None)
+        """
+        for extensao in EXTENSOES_BUSCA:
+            padrao = os.path.join(self.caminho_atual, f"{nome_base.lower()}_[0-9][0-9]_[0-9][0-9][0-9][0-9]{extensao}")
+            arquivos = glob.glob(padrao)
+            if arquivos:
+                return arquivos[0], extensao
+        
+        return None, None
+    
+    def separar_arquivo_atual(self, nome_arquivo_api):
+        """
+        Reextração seletiva: tira do caminho o arquivo já consolidado do mês atual
+        
+        A extração parcial grava um arquivo só com as unidades/competências pedidas,
+        com o mesmo nome; o arquivo completo fica em DIRETORIO_REEXTRACAO até
+        reconsolidar_reextracao juntar os dois.
+        
+        Args:
+            nome_arquivo_api: Nome base do arquivo (ex: 'api_estatistica.csv')
+        
+        Returns:
+            str: Caminho do arquivo separado ou None se o mês atual ainda não tem o arquivo
+        """
+        nome_base = nome_arquivo_api.replace('.csv', '').replace('.xlsx', '')
+        diretorio = os.path.join(self.caminho_atual, DIRETORIO_REEXTRACAO)
+        
+        # Reextração anterior interrompida: o arquivo completo ainda está separado
+        # (o do mês atual, se houver, é o parcial e será sobrescrito)
+        for extensao in EXTENSOES_BUSCA:
+            pendentes = glob.glob(os.path.join(diretorio, f"{nome_base.lower()}_[0-9][0-9]_[0-9][0-9][0-9][0-9]{extensao}"))
+            if pendentes:
+                print(f"   ℹ️ Usando o arquivo separado por uma reextração interrompida: {os.path.basename(pendentes[0])}")
+                return pendentes[0]
+        
+        arquivo_atual, _ = self._buscar_arquivo_extraido(nome_base)
+        
+        if not arquivo_atual:
+            return None
+        
+        os.makedirs(diretorio, exist_ok=True)
+        arquivo_separado = os.path.join(diretorio, os.path.basename(arquivo_atual))
+        os.replace(arquivo_atual, arquivo_separado)
+        
+        return arquivo_separado
+    
+    def _restaurar_arquivo_separado(self, arquivo_separado):
+        """Devolve ao mês atual um arquivo separado por separar_arquivo_atual"""
+        os.replace(arquivo_separado, os.path.join(self.caminho_atual, os.path.basename(arquivo_separado)))
+        print(f"   ↩️ Arquivo anterior restaurado: {os.path.basename(arquivo_separado)}")
+    
+    def reconsolidar_reextracao(self, nome_arquivo_api, arquivo_separado, competencias_reprocessadas):
+        """
+        Junta a reextração seletiva ao arquivo completo do mês atual
+        
+        Os registros das (competência, unidade) reextraídas são trocados pelos
+        novos; o restante do arquivo fica como estava. Se a extração não gerou
+        arquivo, o anterior é restaurado sem alterações.
+        
+        Args:
+            nome_arquivo_api: Nome base do arquivo (ex: 'api_estatistica.csv')
+            arquivo_separado: Retorno de separar_arquivo_atual
+            competencias_reprocessadas: Pares (competência, unidade) reextraídos
+        
+        Returns:
+            bool: True se consolidou com sucesso
+        """
+        nome_base = nome_arquivo_api.replace('.csv', '').replace('.xlsx', '')
+        
+        print(f"\n🔄 Reconsolidando: {nome_base}")
+        
+        arquivo_novo, extensao_novo = self._buscar_arquivo_extraido(nome_base)
+        
+        if not arquivo_novo:
+            print(f"   ⚠️ Reextração não gerou arquivo")
+            self._restaurar_arquivo_separado(arquivo_separado)
+            return False
+        
+        df_novo = self._carregar_arquivo_api(arquivo_novo, extensao_novo)
+        df_anterior = self._carregar_arquivo_api(arquivo_separado, os.path.splitext(arquivo_separado)[1])
+        
+        if df_novo is None or df_anterior is None:
+            print(f"   ❌ Falha ao carregar os arquivos - mantendo o arquivo anterior")
+            os.remove(arquivo_novo)
+            self._restaurar_arquivo_separado(arquivo_separado)
+            return False
+        
+        print(f"   📊 Registros reextraídos: {len(df_novo):,} | no arquivo anterior: {len(df_anterior):,}")
+        
+        df_anterior = self._remover_competencias_reprocessadas(df_anterior, competencias_reprocessadas)
+        df_consolidado = concatenar([df_novo, df_anterior])
+        
+        print(f"   ✅ Total consolidado: {len(df_consolidado):,}")
+        
+        try:
+            salvar_dataframe(df_consolidado, arquivo_novo)
+        except Exception as e:
+            print(f"   ❌ Erro ao salvar: {e}")
+            os.remove(arquivo_novo)
+            self._restaurar_arquivo_separado(arquivo_separado)
+            return False
+        
+        os.remove(arquivo_separado)
+        print(f"   💾 Arquivo consolidado salvo")
+        return True
+    
     def _identificar_colunas_chave(self, df, nome_api):
         """Identifica colunas-chave para remoção de duplicatas"""
         colunas = df.columns.tolist()
         colunas_lower = [c.lower() for c in colunas]
         
-        # Mapeamento específico por API
-        chaves_especificas = {
-            'custosindividualizadoporcentro': ['centroDeCustoDescr', 'competenciaDescr', 'contaDescr', 'grupoContaDescr', 'tipoDescr', 'classificacaoDescr', 'unidade' ],
-            'folhadepagamento': ['contaDeCustoDescr', 'centroDeCustoDescr', 'competenciaDescr', 'nomeFuncionario', 'unidade'],
-            'notasfiscais': ['contaDeCustoDescr', 'centroDeCustoDescr', 'competenciaDescr', 'numero', 'fornecedor', 'unidade'],
-            'quantidadecirurgia': ['centroDeCustoDescr', 'competenciaDescr', 'unidade'],
-            'quantidadeleito': ['centroDeCustoDescr', 'competenciaDescr', 'unidade'],
-            'consumo': ['contaDeCustoDescr', 'centroDeCustoDescr', 'competenciaDescr', 'itemDeEstoque', 'codigoTUSS' ,'unidade'],
-            'benchmarkcomposicaodecustos': ['tipoCentroCusto', 'unidade', 'competencia'],
-            'demonstracaocustounitariodosservicosauxiliares': ['competenciaDescr', 'grupo', 'descricao', 'unidade'],
-            'custounitarioporponderacao': ['competenciaDescr', 'centroDeCustoDescr', 'criterioDeRateioDescr', 'ponderacaoDeRateioDescr', 'unidade'],
-            'composicaoevolucaodereceita': ['tipo', 'grupoDaContaDescr', 'contaDescr', 'competenciaDescr', 'unidade'],
-            'analisedepartamental': ['grupoContaDeCustoDescr', 'centroDeCustoDescr', 'competenciaDescr', 'unidade'],
-            'custoporespecialidade': ['especialidadeDescr', 'centroCustoDestinoDescr', 'centroCustoOrigenDescr', 'unidadeProducaoDescr', 'competenciaDescr', 'unidade'],
-            'painelcomparativodecustos': ['unidadeDeProducaoId', 'unidadeDeProducaoDescr', 'competencia'],
-            'evolucaodecustos': ['grupoDaContaDescr', 'contaDeCustoDescr', 'competenciaDescr', 'tipoContaDeCustoDescr', 'classificacaoDoCustoDescr', 'unidade'], 
-            'rankingdecusto': ['grupoDoCentroDescr', 'centroDeCustoDescr', 'competenciaDescr', 'unidade'],
-            'estatistica': ['grupoDoCentroDescr','centroDeCustoDescr', 'competenciaDescr', 'criterioDeRateioDescr', 'unidade'],
-            'composicaodecustos': ['grupoDaContaDescr', 'contaDeCustoDescr', 'tipoContaDeCustoDescr', 'competenciaDescr', 'tipo_composicao', 'unidade'],
-            'demonstracaocustounitarioporsaida': ['especialidadeDescr', 'competenciaDescr', 'unidade'],
-            'demonstracaocustounitario': ['centroDeCustoDescr', 'competenciaDescr', 'unidade'],
-            'producoes': ['centroDeCustoDescr', 'competenciaDescr', 'unidadeDeProducaoDescr', 'unidade'],
-        }
-        
-        # Tenta identificar a API
-        for api_key, chaves in chaves_especificas.items():
-            if api_key in nome_api.lower():
-                chaves_encontradas = []
-                for chave in chaves:
-                    if chave.lower() in colunas_lower:
-                        idx = colunas_lower.index(chave.lower())
-                        chaves_encontradas.append(colunas[idx])
-                
-                if chaves_encontradas:
-                    return chaves_encontradas
+        # Colunas-chave declaradas no schema do endpoint (APIS_CONFIG)
+        schema = obter_schema(nome_api)
+        if schema and schema.get('chaves'):
+            chaves_encontradas = []
+            for chave in schema['chaves']:
+                if chave.lower() in colunas_lower:
+                    idx = colunas_lower.index(chave.lower())
+                    chaves_encontradas.append(colunas[idx])
+            
+            if chaves_encontradas:
+                return chaves_encontradas
         
         # Fallback: busca 'competencia' + 'nome'
         chaves_encontradas = []
@@ -675,8 +809,18 @@ class AnalisadorIncremental:
             arquivo_destino = os.path.join(self.caminho_atual, nome_arquivo_real)
             
             try:
-                shutil.copy2(arquivo_origem, arquivo_destino)
-                print(f"✅ {nome_arquivo_real} - copiado com sucesso")
+                if obter_formato_saida() == 'parquet' and extensao != '.parquet':
+                    # Mês anterior ainda em CSV/XLSX: o mês atual já fica em Parquet
+                    df_origem = self._carregar_arquivo_api(arquivo_origem, extensao)
+                    if df_origem is None:
+                        raise ValueError("falha ao carregar o arquivo de origem")
+                    nome_arquivo_real = os.path.splitext(nome_arquivo_real)[0] + '.parquet'
+                    arquivo_destino = os.path.join(self.caminho_atual, nome_arquivo_real)
+                    salvar_dataframe(df_origem, arquivo_destino)
+                    print(f"✅ {nome_arquivo_real} - copiado com sucesso (convertido para Parquet)")
+                else:
+                    shutil.copy2(arquivo_origem, arquivo_destino)
+                    print(f"✅ {nome_arquivo_real} - copiado com sucesso")
                 resultados[nome_arquivo_base] = True
             except Exception as e:
                 print(f"❌ {nome_arquivo_real} - erro ao copiar: {e}")
@@ -694,6 +838,9 @@ def processar_incremental(caminho_atual, arquivo_competencia_atual, nomes_arquiv
                          processar_somente_fechadas=True):
     """
     Função principal para processamento incremental
+    
+    Returns:
+        tuple: (PlanoExtracao ou None, competências reprocessadas/resultados da cópia, modo)
     """
     print("\n" + "="*60)
     print("🚀 INICIANDO PROCESSAMENTO INCREMENTAL")
@@ -723,8 +870,15 @@ def processar_incremental(caminho_atual, arquivo_competencia_atual, nomes_arquiv
     print("📋 MODO: PROCESSAMENTO (há novas competências)")
     print("="*60)
     
+    # O resultado do filtro já está em memória: vira o plano de extração dos endpoints
+    df_filtrado = analisador.df_filtrado
+    plano = PlanoExtracao(
+        df_filtrado,
+        arquivo=arquivo_filtrado,
+        competencias_sem_cache=analisador.competencias_reabertas
+    )
+    
     # Identifica competências que serão reprocessadas
-    df_filtrado = pd.read_excel(arquivo_filtrado)
     competencias_reprocessadas = set(
     zip(df_filtrado['competencia'], df_filtrado['nome'])
 )
@@ -737,8 +891,56 @@ def processar_incremental(caminho_atual, arquivo_competencia_atual, nomes_arquiv
     
     print("\n⚠️ Consolidação será executada após extração dos dados novos")
     
-    # Retorna para usar na consolidação depois
-    return arquivo_filtrado, competencias_reprocessadas, 'processar'
+    # Retorna o plano para a extração e as competências para a consolidação depois
+    return plano, competencias_reprocessadas, 'processar'
+
+
+def planejar_reextracao(arquivo_competencia_atual, unidades=None, competencias=None):
+    """
+    Plano de uma reextração seletiva (--unidades / --competencias)
+    
+    Ignora o histórico dos meses anteriores: as competências pedidas são
+    extraídas de novo mesmo que já tenham sido processadas. Diferente da
+    análise incremental, as competências REABERTAS entram (o caso principal é
+    reextrair o mês reaberto de uma unidade); só as ABERTAS ficam de fora. Nada
+    da seleção é servido do cache de respostas.
+    
+    Args:
+        arquivo_competencia_atual: Caminho do arquivo de competências do mês vigente
+        unidades: IDs ou trechos do nome das unidades (None = todas)
+        competencias: Competências ('MM/YYYY') (None = todas)
+    
+    Returns:
+        tuple: (PlanoExtracao ou None, competências reprocessadas)
+    """
+    print("\n" + "="*60)
+    print("🎯 REEXTRAÇÃO SELETIVA (sem análise do histórico)")
+    print("="*60)
+    
+    # O PlanoExtracao já descarta as ABERTAS; as REABERTAS continuam na seleção
+    df_atual = pd.read_excel(arquivo_competencia_atual)
+    plano = PlanoExtracao(df_atual, arquivo=arquivo_competencia_atual).restringir(unidades, competencias)
+    
+    if len(plano) == 0:
+        print("\n⚠️ Nenhuma competência fechada ou reaberta corresponde à seleção")
+        return None, set()
+    
+    # Reextração pedida de propósito: nada da seleção é servido do cache
+    plano.competencias_sem_cache = {
+        (str(unidade_id), padronizar_competencia(competencia))
+        for unidade_id, competencia in zip(plano.df['unidade_id'], plano.df['competencia'])
+    }
+    
+    competencias_reprocessadas = set(zip(plano.df['competencia'], plano.df['nome']))
+    
+    print(f"   • Unidades: {', '.join(unidades) if unidades else 'todas'}")
+    print(f"   • Competências: {', '.join(competencias) if competencias else 'todas as fechadas e reabertas'}")
+    print(f"   • ✅ Selecionadas: {len(plano)} (competência × unidade)")
+    reabertas = int((plano.df['situacao'] == 'REABERTA').sum())
+    if reabertas:
+        print(f"   • 🔓 Reabertas na seleção: {reabertas}")
+    
+    return plano, competencias_reprocessadas
 
 
 def consolidar_apos_extracao(caminho_atual, nomes_arquivos_apis, competencias_reprocessadas=None):
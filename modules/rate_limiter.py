@@ -0,0 +1,250 @@
+"""
+Módulo de limitação de taxa adaptativa (token bucket + AIMD)
+
+Substitui os delays fixos entre requisições: cada token de unidade tem seu
+próprio bucket e, opcionalmente, todas as requisições passam também por um
+bucket global. Enquanto as respostas vêm limpas a taxa sobe de forma aditiva;
+ao receber 403 ou 429 ela cai de forma multiplicativa.
+
+Os buckets por token são do processo, não do endpoint: com o agendador global
+vários endpoints consultam a mesma unidade ao mesmo tempo, e todos eles
+dividem a taxa do token (e o recuo depois de um bloqueio vale para todos).
+"""
+import threading
+import time
+
+# Status HTTP que indicam excesso de requisições (reduzem a taxa)
+STATUS_BLOQUEIO = (403, 429)
+
+
+class TokenBucket:
+    """Token bucket thread-safe com taxa ajustável (AIMD)"""
+
+    def __init__(self,
+                 taxa_inicial=1.0,
+                 taxa_minima=0.1,
+                 taxa_maxima=5.0,
+                 incremento=0.1,
+                 fator_reducao=0.5,
+                 capacidade=1.0):
+        """
+        Args:
+            taxa_inicial: Requisições por segundo no início
+            taxa_minima: Limite inferior da taxa após reduções
+            taxa_maxima: Limite superior da taxa após aumentos
+            incremento: Quanto a taxa sobe (req/s) a cada resposta sem 403
+            fator_reducao: Fator multiplicativo aplicado à taxa a cada 403
+            capacidade: Máximo de requisições acumuladas para rajadas
+        """
+        self.taxa = float(taxa_inicial)
+        self.taxa_minima = float(taxa_minima)
+        self.taxa_maxima = float(taxa_maxima)
+        self.incremento = float(incremento)
+        self.fator_reducao = float(fator_reducao)
+        self.capacidade = float(capacidade)
+        self.tokens = self.capacidade
+        self.ultimo_abastecimento = time.monotonic()
+        self.total_reducoes = 0
+        self._lock = threading.Lock()
+
+    def _abastecer(self):
+        agora = time.monotonic()
+        decorrido = agora - self.ultimo_abastecimento
+        self.tokens = min(self.capacidade, self.tokens + decorrido * self.taxa)
+        self.ultimo_abastecimento = agora
+
+    def reservar(self):
+        """
+        Reserva uma requisição sem bloquear (usado pelo backend assíncrono)
+
+        Returns:
+            float: Tempo que o chamador deve aguardar antes de enviar, em segundos
+        """
+        with self._lock:
+            self._abastecer()
+            self.tokens -= 1
+            return -self.tokens / self.taxa if self.tokens < 0 else 0.0
+
+    def adquirir(self):
+        """
+        Reserva uma requisição, aguardando o tempo necessário
+
+        Returns:
+            float: Tempo aguardado em segundos
+        """
+        espera = self.reservar()
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+    def registrar_sucesso(self):
+        """Aumento aditivo da taxa"""
+        with self._lock:
+            self._abastecer()
+            self.taxa = min(self.taxa_maxima, self.taxa + self.incremento)
+
+    def registrar_bloqueio(self):
+        """Redução multiplicativa da taxa e descarte da rajada acumulada"""
+        with self._lock:
+            self._abastecer()
+            self.taxa = max(self.taxa_minima, self.taxa * self.fator_reducao)
+            self.tokens = min(self.tokens, 0.0)
+            self.total_reducoes += 1
+
+
+_bucket_global = None
+
+# Buckets por token de unidade, compartilhados por todos os endpoints do processo
+_buckets_token = {}
+_lock_buckets_token = threading.Lock()
+
+
+def configurar_limite_global(taxa_inicial, taxa_minima=0.1, taxa_maxima=None, incremento=0.1, fator_reducao=0.5):
+    """
+    Cria o bucket global compartilhado por todos os endpoints e unidades
+
+    Args:
+        taxa_inicial: Requisições por segundo no início (None ou <= 0 desativa)
+        taxa_minima: Limite inferior da taxa
+        taxa_maxima: Limite superior da taxa (padrão: 4x a inicial)
+        incremento: Aumento aditivo por resposta limpa
+        fator_reducao: Redução multiplicativa por 403
+    """
+    global _bucket_global
+
+    if not taxa_inicial or taxa_inicial <= 0:
+        _bucket_global = None
+        return
+
+    _bucket_global = TokenBucket(
+        taxa_inicial=taxa_inicial,
+        taxa_minima=taxa_minima,
+        taxa_maxima=taxa_maxima if taxa_maxima else taxa_inicial * 4,
+        incremento=incremento,
+        fator_reducao=fator_reducao
+    )
+
+
+def obter_bucket_token(chave, limites):
+    """
+    Bucket do token de uma unidade (um só por processo)
+
+    Endpoints com limites diferentes dividem o mesmo bucket: vale a menor
+    taxa máxima entre os que já o usaram.
+
+    Args:
+        chave: Identificador do bucket (o token da unidade)
+        limites: Dicionário 'rate_limit' do endpoint
+
+    Returns:
+        TokenBucket
+    """
+    with _lock_buckets_token:
+        bucket = _buckets_token.get(chave)
+        if bucket is None:
+            bucket = _buckets_token[chave] = TokenBucket(**limites)
+            return bucket
+
+    taxa_maxima = limites.get('taxa_maxima')
+    if taxa_maxima is not None and taxa_maxima < bucket.taxa_maxima:
+        with bucket._lock:
+            bucket.taxa_maxima = float(taxa_maxima)
+            bucket.taxa = min(bucket.taxa, bucket.taxa_maxima)
+    return bucket
+
+
+def limpar_buckets_token():
+    """Descarta os buckets por token (nova execução no mesmo processo)"""
+    with _lock_buckets_token:
+        _buckets_token.clear()
+
+
+class LimitadorAdaptativo:
+    """Limitador de um endpoint sobre os buckets por token do processo + o bucket global"""
+
+    def __init__(self, limites, nome_api=""):
+        """
+        Args:
+            limites: Dicionário 'rate_limit' do APIS_CONFIG
+                     (taxa_inicial, taxa_minima, taxa_maxima, incremento, fator_reducao)
+            nome_api: Nome da API (para logs)
+        """
+        self.limites = dict(limites)
+        self.nome_api = nome_api
+        # Buckets (do processo) usados por este endpoint e bloqueios recebidos por ele
+        self.buckets = {}
+        self.reducoes_403 = 0
+        self._lock = threading.Lock()
+
+    def _bucket(self, chave):
+        with self._lock:
+            if chave not in self.buckets:
+                self.buckets[chave] = obter_bucket_token(chave, self.limites)
+            return self.buckets[chave]
+
+    def adquirir(self, chave):
+        """
+        Aguarda liberação no bucket do token e no bucket global
+
+        Args:
+            chave: Identificador do bucket (o token da unidade)
+
+        Returns:
+            float: Tempo total aguardado em segundos
+        """
+        espera = self._bucket(chave).adquirir()
+        if _bucket_global is not None:
+            espera += _bucket_global.adquirir()
+        return espera
+
+    def reservar(self, chave):
+        """
+        Reserva no bucket do token e no global sem bloquear
+
+        Args:
+            chave: Identificador do bucket (o token da unidade)
+
+        Returns:
+            float: Tempo que o chamador deve aguardar, em segundos
+        """
+        espera = self._bucket(chave).reservar()
+        if _bucket_global is not None:
+            espera = max(espera, _bucket_global.reservar())
+        return espera
+
+    def registrar_resposta(self, chave, status_code):
+        """
+        Ajusta as taxas conforme a resposta (403/429 reduzem, demais aumentam)
+
+        Args:
+            chave: Identificador do bucket (o token da unidade)
+            status_code: Status HTTP recebido
+        """
+        bucket = self._bucket(chave)
+
+        if status_code in STATUS_BLOQUEIO:
+            bucket.registrar_bloqueio()
+            with self._lock:
+                self.reducoes_403 += 1
+            if _bucket_global is not None:
+                _bucket_global.registrar_bloqueio()
+        else:
+            bucket.registrar_sucesso()
+            if _bucket_global is not None:
+                _bucket_global.registrar_sucesso()
+
+    def resumo(self):
+        """
+        Returns:
+            dict: Taxas finais dos buckets usados pelo endpoint e bloqueios (403/429) recebidos por ele
+        """
+        with self._lock:
+            buckets = list(self.buckets.values())
+            reducoes_403 = self.reducoes_403
+
+        return {
+            'buckets': len(buckets),
+            'taxa_media': sum(b.taxa for b in buckets) / len(buckets) if buckets else 0.0,
+            'reducoes_403': reducoes_403,
+            'taxa_global': _bucket_global.taxa if _bucket_global is not None else None
+        }
@@ -0,0 +1,110 @@
+"""
+Módulo de registro dos endpoints extraídos pelo main.py
+
+Cada endpoint é declarado só pelo nome e pelo módulo do seu wrapper
+(modules.api_<...>), sem importá-lo: o wrapper - e com ele o extrator
+genérico, o APIS_CONFIG e as suas dependências - só é carregado na primeira
+chamada. O início do programa e as execuções que terminam antes da extração
+(modo cópia, --profile-startup) não pagam a importação dos 20 wrappers.
+
+Como os wrappers são importados pelo nome, o executável (PyInstaller) precisa
+incluí-los explicitamente: --collect-submodules modules.
+"""
+import importlib
+
+# (nome do endpoint, módulo do wrapper em modules/); a função tem o nome do módulo
+ENDPOINTS = [
+    ("Consumo", "api_consumo"),
+    ("QuantidadeLeito", "api_quantidadeLeito"),
+    ("QuantidadeCirurgia", "api_quantidadeCirurgia"),
+    ("NotasFiscais", "api_notasFiscais"),
+    ("FolhadePagamento", "api_folhadepagamento"),
+    ("custosIndividualizadoPorCentro", "api_custosIndividualizadoPorCentro"),
+    ("producoes", "api_producoes"),
+    ("estatistica", "api_estatistica"),
+    ("rankingDeCusto", "api_rankingDeCusto"),
+    ("evolucaoDeCustos", "api_evolucaoDeCustos"),
+    ("demonstracaoCustoUnitario", "api_demonstracaoCustoUnitario"),
+    ("demonstracaoCustoUnitarioPorSaida", "api_demonstracaoCustoUnitarioPorSaida"),
+    ("painelComparativoDeCustos", "api_painelComparativoDeCustos"),
+    ("custoPorEspecialidade", "api_custoPorEspecialidade"),
+    ("analisedepartamental", "api_analisedepartamental"),
+    ("composicaoDeCustos", "api_composicaoDeCustos"),
+    ("composicaoEvolucaoDeReceita", "api_composicaoEvolucaoDeReceita"),
+    ("custoUnitarioPorPonderacao", "api_custoUnitarioPorPonderacao"),
+    ("demonstracaoCustoUnitarioDosServicosAuxiliares", "api_demonstracaoCustoUnitarioDosServicosAuxiliares"),
+    ("benchmarkComposicaoDeCustos", "api_benchmarkComposicaoDeCustos")
+]
+
+
+class EndpointPreguicoso:
+    """Função de um wrapper de endpoint, importado só na primeira chamada"""
+
+    def __init__(self, nome_modulo):
+        """
+        Args:
+            nome_modulo: Módulo do wrapper em modules/ (ex.: 'api_consumo')
+        """
+        self.nome_modulo = nome_modulo
+        self._funcao = None
+
+    @property
+    def carregado(self):
+        return self._funcao is not None
+
+    def carregar(self):
+        """
+        Importa o wrapper (uma vez só)
+
+        Returns:
+            Função do wrapper (ex.: modules.api_consumo.api_consumo)
+        """
+        if self._funcao is None:
+            modulo = importlib.import_module(f"modules.{self.nome_modulo}")
+            self._funcao = getattr(modulo, self.nome_modulo)
+        return self._funcao
+
+    def __call__(self, *args, **kwargs):
+        return self.carregar()(*args, **kwargs)
+
+    def __repr__(self):
+        situacao = 'carregado' if self.carregado else 'não carregado'
+        return f"<EndpointPreguicoso modules.{self.nome_modulo} ({situacao})>"
+
+
+def obter_endpoints(nomes=None):
+    """
+    Endpoints a executar, na ordem do registro
+
+    Args:
+        nomes: Nomes dos endpoints desejados, sem diferenciar maiúsculas
+               (None = todos)
+
+    Returns:
+        list: [(nome_endpoint, EndpointPreguicoso)] na ordem de execução
+
+    Raises:
+        ValueError: Nome de endpoint desconhecido
+    """
+    if nomes:
+        registrados = {nome_api.lower() for nome_api, _ in ENDPOINTS}
+        desconhecidos = [nome for nome in nomes if nome.lower() not in registrados]
+        if desconhecidos:
+            raise ValueError(
+                f"Endpoint(s) desconhecido(s): {', '.join(desconhecidos)}. "
+                f"Disponíveis: {', '.join(nome_api for nome_api, _ in ENDPOINTS)}"
+            )
+        selecionados = {nome.lower() for nome in nomes}
+
+    return [
+        (nome_api, EndpointPreguicoso(nome_modulo)) for nome_api, nome_modulo in ENDPOINTS
+        if not nomes or nome_api.lower() in selecionados
+    ]
+
+
+def modulos_endpoints():
+    """
+    Returns:
+        list: Nomes completos dos módulos dos wrappers (ex.: 'modules.api_consumo')
+    """
+    return [f"modules.{nome_modulo}" for _, nome_modulo in ENDPOINTS]
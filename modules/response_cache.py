@@ -0,0 +1,417 @@
+"""
+Módulo de cache em disco das respostas de competências FECHADAS
+
+Depois que uma competência é fechada, os dados de uma unidade não mudam mais;
+reprocessamentos e backfills não precisam pedir tudo de novo pela VPN. Cada
+resposta 200 é gravada num arquivo cujo nome é o hash de (endpoint, unidade,
+payload, situação da competência). O cache tem tamanho máximo com descarte
+LRU.
+
+Uma competência reaberta e fechada de novo volta como FECHADA, com o mesmo
+payload e portanto a mesma chave: as entradas dela são invalidadas antes da
+extração (invalidar_competencias), a partir das reaberturas detectadas na
+análise incremental e das reextrações pedidas com --unidades/--competencias.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from modules.json_rapido import carregar_json
+from modules.competencia import padronizar_competencia
+
+# Única situação de competência cujas respostas são guardadas
+SITUACAO_CACHEAVEL = 'FECHADA'
+
+
+class RespostaCache:
+    """Resposta servida do cache, com a mesma interface usada de requests.Response"""
+
+    def __init__(self, status_code, content=None, arquivo=None):
+        """
+        Args:
+            status_code: Status HTTP guardado
+            content: Corpo em bytes
+            arquivo: Arquivo já aberto com o corpo (leitura em streaming, em vez de content)
+        """
+        self.status_code = status_code
+        self._content = content
+        self._arquivo = arquivo
+        self.from_cache = True
+
+    @property
+    def content(self):
+        if self._content is None and self._arquivo is not None:
+            with self._arquivo:
+                self._content = self._arquivo.read()
+            self._arquivo = None
+        return self._content
+
+    def iter_content(self, chunk_size=64 * 1024):
+        """Corpo em blocos, lido do arquivo do cache sem carregá-lo inteiro"""
+        if self._arquivo is None:
+            conteudo = self.content
+            for inicio in range(0, len(conteudo), chunk_size):
+                yield conteudo[inicio:inicio + chunk_size]
+            return
+
+        with self._arquivo:
+            while True:
+                bloco = self._arquivo.read(chunk_size)
+                if not bloco:
+                    break
+                yield bloco
+        self._arquivo = None
+
+    def close(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return carregar_json(self.content)
+
+
+class CacheRespostas:
+    """Cache de respostas em disco, endereçado por conteúdo, com descarte LRU"""
+
+    def __init__(self, diretorio, tamanho_maximo_mb=500):
+        """
+        Args:
+            diretorio: Diretório do cache (persistente entre execuções)
+            tamanho_maximo_mb: Tamanho máximo somado das respostas guardadas
+        """
+        self.diretorio = diretorio
+        self.tamanho_maximo = int(tamanho_maximo_mb * 1024 * 1024)
+        self.caminho_indice = os.path.join(diretorio, 'indice.json')
+        self.estatisticas = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(diretorio, exist_ok=True)
+        self.indice = self._carregar_indice()
+
+    def _carregar_indice(self):
+        if not os.path.exists(self.caminho_indice):
+            return {}
+
+        try:
+            with open(self.caminho_indice, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+        except (OSError, ValueError):
+            # Índice corrompido: recomeça vazio (os arquivos órfãos são sobrescritos)
+            return {}
+
+        # Descarta entradas cujo arquivo sumiu
+        return {
+            chave: entrada for chave, entrada in indice.items()
+            if os.path.exists(self._caminho_resposta(chave))
+        }
+
+    def _salvar_indice(self):
+        temporario = self.caminho_indice + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.indice, f, ensure_ascii=False)
+        os.replace(temporario, self.caminho_indice)
+
+    def _caminho_resposta(self, chave):
+        return os.path.join(self.diretorio, chave[:2], f"{chave}.json")
+
+    def _contar(self, nome_api, tipo):
+        contagem = self.estatisticas.setdefault(nome_api, {'hits': 0, 'misses': 0})
+        contagem[tipo] += 1
+
+    @staticmethod
+    def gerar_chave(nome_api, unidade_id, payload, situacao):
+        """
+        Gera a chave (hash SHA-256) de uma requisição
+
+        Args:
+            nome_api: Nome da API
+            unidade_id: ID da unidade
+            payload: Payload JSON enviado
+            situacao: Situação da competência no arquivo de competências
+
+        Returns:
+            str: Chave hexadecimal
+        """
+        conteudo = json.dumps(
+            {
+                'endpoint': nome_api,
+                'unidade_id': str(unidade_id),
+                'payload': payload,
+                'situacao': situacao
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+    def obter(self, chave, nome_api, stream=False):
+        """
+        Busca uma resposta no cache (sem nenhum acesso à rede)
+
+        Args:
+            chave: Chave gerada por gerar_chave
+            nome_api: Nome da API (para as estatísticas)
+            stream: Se True, o corpo não é lido agora: a resposta guarda o arquivo
+                    aberto e o entrega em blocos (iter_content)
+
+        Returns:
+            RespostaCache ou None se não estiver no cache
+        """
+        with self._lock:
+            entrada = self.indice.get(chave)
+
+            if entrada is None:
+                self._contar(nome_api, 'misses')
+                return None
+
+            try:
+                arquivo = open(self._caminho_resposta(chave), 'rb')
+            except OSError:
+                del self.indice[chave]
+                self._contar(nome_api, 'misses')
+                return None
+
+            entrada['ultimo_acesso'] = time.time()
+            self._contar(nome_api, 'hits')
+
+        if stream:
+            return RespostaCache(entrada['status_code'], arquivo=arquivo)
+
+        with arquivo:
+            return RespostaCache(entrada['status_code'], arquivo.read())
+
+    def contem(self, chave):
+        """
+        Indica se há resposta guardada para a chave, sem ler o arquivo nem contar
+        hit/miss (usado pelo planejamento --plan)
+
+        Args:
+            chave: Chave gerada por gerar_chave
+
+        Returns:
+            bool
+        """
+        with self._lock:
+            return chave in self.indice
+
+    def gravar(self, chave, nome_api, unidade_id, competencias, situacao, status_code, conteudo):
+        """
+        Guarda uma resposta e aplica o descarte LRU se o tamanho máximo for excedido
+
+        Args:
+            chave: Chave gerada por gerar_chave
+            nome_api: Nome da API
+            unidade_id: ID da unidade
+            competencias: Competências cobertas pela requisição (para invalidação)
+            situacao: Situação da competência
+            status_code: Status HTTP da resposta
+            conteudo: Corpo da resposta em bytes
+        """
+        if len(conteudo) > self.tamanho_maximo:
+            return
+
+        with self.gravacao(chave, nome_api, unidade_id, competencias, situacao, status_code) as destino:
+            destino.write(conteudo)
+
+    def gravacao(self, chave, nome_api, unidade_id, competencias, situacao, status_code):
+        """
+        Guarda uma resposta escrita em blocos, à medida que é lida (streaming)
+
+        Uso: with cache.gravacao(...) as destino: destino.write(bloco). A entrada só
+        entra no índice se o bloco with terminar sem erro.
+
+        Returns:
+            GravacaoCache
+        """
+        return GravacaoCache(self, chave, {
+            'endpoint': nome_api,
+            'unidade_id': str(unidade_id),
+            'competencias': [str(c) for c in competencias],
+            'situacao': situacao,
+            'status_code': status_code
+        })
+
+    def _registrar_entrada(self, chave, temporario, entrada):
+        """Move o arquivo gravado para o cache e o registra no índice"""
+        with self._lock:
+            os.replace(temporario, self._caminho_resposta(chave))
+
+            self.indice[chave] = {**entrada, 'ultimo_acesso': time.time()}
+
+            self._descartar_excedente()
+            self._salvar_indice()
+
+    def _descartar_excedente(self):
+        tamanho_total = sum(entrada['tamanho'] for entrada in self.indice.values())
+        if tamanho_total <= self.tamanho_maximo:
+            return
+
+        # Menos usadas recentemente primeiro
+        for chave, entrada in sorted(self.indice.items(), key=lambda item: item[1]['ultimo_acesso']):
+            if tamanho_total <= self.tamanho_maximo:
+                break
+            self._remover(chave)
+            tamanho_total -= entrada['tamanho']
+
+    def _remover(self, chave):
+        self.indice.pop(chave, None)
+        try:
+            os.remove(self._caminho_resposta(chave))
+        except OSError:
+            pass
+
+    def invalidar(self, unidade_id, competencia):
+        """
+        Remove todas as respostas (de qualquer endpoint) que cobrem uma competência da unidade
+
+        Args:
+            unidade_id: ID da unidade
+            competencia: Competência que foi reaberta
+
+        Returns:
+            int: Quantidade de entradas removidas
+        """
+        return self.invalidar_varias([(unidade_id, competencia)])
+
+    def invalidar_varias(self, pares):
+        """
+        Remove as respostas (de qualquer endpoint) que cobrem algum dos pares
+
+        Uma resposta de faixa sai inteira se qualquer mês dela estiver nos pares.
+
+        Args:
+            pares: Iterável de (unidade_id, competência)
+
+        Returns:
+            int: Quantidade de entradas removidas
+        """
+        pares = {(str(unidade_id), padronizar_competencia(competencia)) for unidade_id, competencia in pares}
+        if not pares:
+            return 0
+
+        with self._lock:
+            chaves = [
+                chave for chave, entrada in self.indice.items()
+                if any(
+                    (entrada['unidade_id'], padronizar_competencia(competencia)) in pares
+                    for competencia in entrada['competencias']
+                )
+            ]
+            for chave in chaves:
+                self._remover(chave)
+            if chaves:
+                self._salvar_indice()
+
+        return len(chaves)
+
+    def salvar(self):
+        """Persiste o índice (inclui os horários de último acesso dos hits)"""
+        with self._lock:
+            self._salvar_indice()
+
+    def obter_estatisticas(self, nome_api):
+        """
+        Returns:
+            dict: {'hits', 'misses'} do endpoint nesta execução
+        """
+        with self._lock:
+            return dict(self.estatisticas.get(nome_api, {'hits': 0, 'misses': 0}))
+
+
+class GravacaoCache:
+    """Escrita de uma resposta no cache, bloco a bloco"""
+
+    def __init__(self, cache, chave, entrada):
+        self.cache = cache
+        self.chave = chave
+        self.entrada = entrada
+        self.tamanho = 0
+        self.temporario = f"{cache._caminho_resposta(chave)}.{threading.get_ident()}.tmp"
+        self._arquivo = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.temporario), exist_ok=True)
+        self._arquivo = open(self.temporario, 'wb')
+        return self
+
+    def write(self, bloco):
+        if self._arquivo is None:
+            return
+        self.tamanho += len(bloco)
+        # Respostas maiores que o cache inteiro não são guardadas
+        if self.tamanho > self.cache.tamanho_maximo:
+            self._descartar()
+            return
+        self._arquivo.write(bloco)
+
+    def _descartar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+            try:
+                os.remove(self.temporario)
+            except OSError:
+                pass
+
+    def __exit__(self, tipo_excecao, excecao, traceback):
+        if self._arquivo is None:
+            return False
+
+        if tipo_excecao is not None:
+            self._descartar()
+            return False
+
+        self._arquivo.close()
+        self._arquivo = None
+        self.cache._registrar_entrada(self.chave, self.temporario, {**self.entrada, 'tamanho': self.tamanho})
+        return False
+
+
+_cache = None
+
+
+def configurar_cache(diretorio, tamanho_maximo_mb=500):
+    """
+    Ativa o cache de respostas para todas as APIs
+
+    Args:
+        diretorio: Diretório do cache (None desativa)
+        tamanho_maximo_mb: Tamanho máximo em MB (<= 0 desativa)
+    """
+    global _cache
+
+    if not diretorio or tamanho_maximo_mb <= 0:
+        _cache = None
+        return
+
+    _cache = CacheRespostas(diretorio, tamanho_maximo_mb)
+
+
+def obter_cache():
+    """
+    Returns:
+        CacheRespostas configurado ou None se o cache estiver desativado
+    """
+    return _cache
+
+
+def invalidar_competencias(pares):
+    """
+    Descarta do cache ativo as respostas das competências que vão ser extraídas de novo
+
+    Args:
+        pares: Iterável de (unidade_id, competência) (PlanoExtracao.competencias_sem_cache)
+
+    Returns:
+        int: Quantidade de entradas removidas (0 com o cache desativado)
+    """
+    if _cache is None:
+        return 0
+    return _cache.invalidar_varias(pares)
@@ -0,0 +1,263 @@
+"""
+Módulo de políticas de retry e circuit breakers por endpoint
+
+Cada endpoint declara no APIS_CONFIG ("retry") quantas tentativas e qual espera
+usar para cada tipo de falha (status HTTP, 'timeout' ou 'conexao'), um
+orçamento total de retries para a execução e os circuit breakers:
+
+- circuito_unidade: abre para uma (endpoint, unidade) após falhas seguidas com
+  os status listados (ex.: 500 "relatório não aplicável" em UBS/UPA);
+- circuito_endpoint: abre para o endpoint inteiro após falhas seguidas em
+  qualquer unidade (ex.: 404, VPN caída).
+
+Com o circuito aberto as requisições são ignoradas sem ir à rede; depois de
+'reabrir_apos_s' segundos o circuito fica meio aberto e deixa passar uma
+requisição de teste, que o fecha (sucesso) ou reabre (falha).
+"""
+import random
+import threading
+import time
+
+
+class CircuitBreaker:
+    """Circuit breaker thread-safe: fechado → aberto → meio aberto"""
+
+    FECHADO = 'fechado'
+    ABERTO = 'aberto'
+    MEIO_ABERTO = 'meio_aberto'
+
+    def __init__(self, falhas=3, reabrir_apos_s=300):
+        """
+        Args:
+            falhas: Falhas seguidas que abrem o circuito
+            reabrir_apos_s: Tempo com o circuito aberto até liberar uma requisição de teste
+        """
+        self.limite_falhas = int(falhas)
+        self.reabrir_apos_s = float(reabrir_apos_s)
+        self.estado = self.FECHADO
+        self.falhas_seguidas = 0
+        self.aberto_em = None
+        self.total_aberturas = 0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        """
+        Returns:
+            bool: True se a requisição pode ser enviada
+        """
+        with self._lock:
+            if self.estado == self.FECHADO:
+                return True
+
+            if self.estado == self.ABERTO and time.monotonic() - self.aberto_em >= self.reabrir_apos_s:
+                self.estado = self.MEIO_ABERTO
+                self._teste_em_andamento = False
+
+            # Meio aberto: apenas uma requisição de teste por vez
+            if self.estado == self.MEIO_ABERTO and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return True
+
+            return False
+
+    def registrar_sucesso(self):
+        """Fecha o circuito e zera as falhas seguidas"""
+        with self._lock:
+            self.estado = self.FECHADO
+            self.falhas_seguidas = 0
+            self._teste_em_andamento = False
+
+    def liberar_teste(self):
+        """Libera a requisição de teste do estado meio aberto sem decidir o circuito"""
+        with self._lock:
+            self._teste_em_andamento = False
+
+    def registrar_falha(self):
+        """
+        Conta uma falha; abre o circuito ao atingir o limite (ou se o teste falhar)
+
+        Returns:
+            bool: True se o circuito acabou de abrir
+        """
+        with self._lock:
+            self.falhas_seguidas += 1
+            self._teste_em_andamento = False
+
+            if self.estado == self.MEIO_ABERTO or (
+                self.estado == self.FECHADO and self.falhas_seguidas >= self.limite_falhas
+            ):
+                self.estado = self.ABERTO
+                self.aberto_em = time.monotonic()
+                self.total_aberturas += 1
+                return True
+
+            return False
+
+
+class PoliticaRetry:
+    """Política de retry, orçamento de retries e circuit breakers de um endpoint"""
+
+    def __init__(self, config=None, max_tentativas_403=4, backoff_inicial=2.0, nome_api=""):
+        """
+        Args:
+            config: Dicionário 'retry' do APIS_CONFIG (None = comportamento original:
+                    retry só para 403 e timeout, sem orçamento e sem circuit breakers)
+            max_tentativas_403: Tentativas para 403 quando a política não declara "403"
+            backoff_inicial: Espera inicial do 403 quando a política não declara "403"
+            nome_api: Nome da API (para logs)
+        """
+        config = config or {}
+        self.nome_api = nome_api
+
+        self.regras = {
+            '403': {'tentativas': max_tentativas_403, 'espera_inicial': backoff_inicial, 'fator': 2.0},
+            'timeout': {'tentativas': max_tentativas_403, 'espera_inicial': 3.0, 'fator': 1.0}
+        }
+        for chave, regra in config.get('politicas', {}).items():
+            self.regras[str(chave)] = dict(regra)
+
+        self.orcamento_retries = config.get('orcamento_retries')
+        self.retries_usados = 0
+        self._orcamento_avisado = False
+
+        self.config_circuito_unidade = config.get('circuito_unidade')
+        self.config_circuito_endpoint = config.get('circuito_endpoint')
+        self.circuitos_unidade = {}
+        self.circuito_endpoint = None
+        if self.config_circuito_endpoint:
+            self.circuito_endpoint = CircuitBreaker(
+                falhas=self.config_circuito_endpoint.get('falhas', 5),
+                reabrir_apos_s=self.config_circuito_endpoint.get('reabrir_apos_s', 120)
+            )
+
+        self._lock = threading.Lock()
+
+    def regra(self, chave):
+        """
+        Args:
+            chave: Status HTTP (int) ou 'timeout' / 'conexao'
+
+        Returns:
+            dict: {'tentativas', 'espera_inicial', 'fator'} ou None se a falha não tem retry
+        """
+        return self.regras.get(str(chave))
+
+    def tentativas(self, chave):
+        """Máximo de tentativas para um tipo de falha (1 = sem retry)"""
+        regra = self.regra(chave)
+        return regra['tentativas'] if regra else 1
+
+    def deve_repetir(self, chave, tentativa):
+        """
+        Decide se a tentativa que falhou deve ser repetida (consome o orçamento)
+
+        Args:
+            chave: Status HTTP (int) ou 'timeout' / 'conexao'
+            tentativa: Número da tentativa que acabou de falhar
+
+        Returns:
+            bool: True se deve tentar de novo
+        """
+        if tentativa >= self.tentativas(chave):
+            return False
+
+        with self._lock:
+            if self.orcamento_retries is not None and self.retries_usados >= self.orcamento_retries:
+                if not self._orcamento_avisado:
+                    self._orcamento_avisado = True
+                    print(f"   🧾 Orçamento de {self.orcamento_retries} retries de {self.nome_api} esgotado - "
+                          f"falhas seguintes não serão repetidas")
+                return False
+            self.retries_usados += 1
+            return True
+
+    def tempo_espera(self, chave, tentativa):
+        """
+        Espera antes da próxima tentativa (backoff com jitter)
+
+        Args:
+            chave: Status HTTP (int) ou 'timeout' / 'conexao'
+            tentativa: Número da tentativa que acabou de falhar
+
+        Returns:
+            float: Segundos a aguardar
+        """
+        regra = self.regra(chave)
+        espera = regra.get('espera_inicial', 2.0) * (regra.get('fator', 2.0) ** (tentativa - 1))
+        if regra.get('fator', 2.0) > 1:
+            espera += random.uniform(0, 0.5)
+        return espera
+
+    def _circuito_unidade(self, unidade_id):
+        with self._lock:
+            chave = str(unidade_id)
+            if chave not in self.circuitos_unidade:
+                self.circuitos_unidade[chave] = CircuitBreaker(
+                    falhas=self.config_circuito_unidade.get('falhas', 3),
+                    reabrir_apos_s=self.config_circuito_unidade.get('reabrir_apos_s', 300)
+                )
+            return self.circuitos_unidade[chave]
+
+    def permitir(self, unidade_id):
+        """
+        Consulta os circuit breakers antes de uma requisição
+
+        Args:
+            unidade_id: ID da unidade
+
+        Returns:
+            tuple: (permitido, motivo) - motivo explica por que foi ignorada
+        """
+        circuito_unidade = self._circuito_unidade(unidade_id) if self.config_circuito_unidade else None
+
+        if circuito_unidade and not circuito_unidade.permitir():
+            return False, f"Circuito aberto para a unidade no endpoint {self.nome_api}"
+
+        if self.circuito_endpoint and not self.circuito_endpoint.permitir():
+            if circuito_unidade:
+                circuito_unidade.liberar_teste()
+            return False, f"Circuito aberto para o endpoint {self.nome_api}"
+
+        return True, None
+
+    def registrar_resultado(self, unidade_id, chave):
+        """
+        Atualiza os circuit breakers com o desfecho final de uma requisição
+
+        Args:
+            unidade_id: ID da unidade
+            chave: Status HTTP final (int) ou 'timeout' / 'conexao' / 'inesperado'
+        """
+        chave = str(chave)
+
+        for circuito, config, alvo in (
+            (self.circuito_endpoint, self.config_circuito_endpoint, f"endpoint {self.nome_api}"),
+            (self._circuito_unidade(unidade_id) if self.config_circuito_unidade else None,
+             self.config_circuito_unidade, f"unidade {unidade_id} em {self.nome_api}")
+        ):
+            if circuito is None:
+                continue
+
+            if chave in [str(status) for status in config.get('status', [])]:
+                if circuito.registrar_falha():
+                    print(f"   🔌 Circuito aberto para {alvo} após {circuito.falhas_seguidas} falha(s) "
+                          f"seguida(s) ({chave}) - novas tentativas em {circuito.reabrir_apos_s:.0f}s")
+            elif chave == '200':
+                circuito.registrar_sucesso()
+            else:
+                circuito.liberar_teste()
+
+    def resumo(self):
+        """
+        Returns:
+            dict: Retries usados e quantas vezes os circuitos abriram
+        """
+        with self._lock:
+            circuitos = list(self.circuitos_unidade.values())
+
+        return {
+            'retries_usados': self.retries_usados,
+            'aberturas_unidade': sum(c.total_aberturas for c in circuitos),
+            'aberturas_endpoint': self.circuito_endpoint.total_aberturas if self.circuito_endpoint else 0
+        }
@@ -0,0 +1,124 @@
+"""
+Módulo de schemas por endpoint
+
+Cada entrada do APIS_CONFIG pode declarar um "schema" opcional:
+
+- tipos: {coluna: dtype} aplicados na extração e na leitura dos arquivos, para
+  colunas cujo tipo é conhecido (ex.: IDs inteiros que, com linhas vazias, a
+  inferência leria como float). Colunas sem tipo declarado, como as de valor e
+  quantidade, continuam com a inferência do pandas;
+- categorias: colunas descritivas repetitivas (centro de custo, conta, unidade,
+  competência...) lidas como 'category', que ocupam uma fração da memória;
+- chaves: colunas que identificam um registro, usadas na consolidação
+  incremental (ponto.py).
+
+Colunas declaradas que não existem no arquivo são ignoradas.
+"""
+import os
+import re
+import pandas as pd
+
+
+def obter_schema(nome_api):
+    """
+    Busca o schema de um endpoint pelo nome da API ou pelo nome do arquivo
+
+    Args:
+        nome_api: Nome da API ('Consumo') ou do arquivo ('api_consumo_09_2025.csv')
+
+    Returns:
+        dict do schema ou None se o endpoint não declarar um
+    """
+    from config.api_config import APIS_CONFIG
+
+    nome = os.path.splitext(os.path.basename(str(nome_api)))[0].lower()
+    nome = re.sub(r'^api_', '', nome)
+    nome = re.sub(r'_\d{2}_\d{4}$', '', nome)
+
+    for chave, config in APIS_CONFIG.items():
+        if chave.lower() == nome:
+            return config.get('schema')
+
+    return None
+
+
+def dtypes_leitura(schema, colunas=None):
+    """
+    Monta o dtype= do read_csv a partir do schema
+
+    Args:
+        schema: Schema do endpoint (ou None)
+        colunas: Colunas do arquivo (se informadas, só elas entram no dicionário)
+
+    Returns:
+        dict {coluna: dtype} ou None
+    """
+    if not schema:
+        return None
+
+    dtypes = dict(schema.get('tipos', {}))
+    for coluna in schema.get('categorias', []):
+        dtypes[coluna] = 'category'
+
+    if colunas is not None:
+        dtypes = {coluna: dtype for coluna, dtype in dtypes.items() if coluna in colunas}
+
+    return dtypes or None
+
+
+def aplicar_schema(df, schema, incluir_categorias=True):
+    """
+    Converte as colunas de um DataFrame para os tipos do schema
+
+    Args:
+        df: DataFrame
+        schema: Schema do endpoint (ou None)
+        incluir_categorias: Se False, aplica só os 'tipos' (ex.: antes de gravar CSV,
+                            onde 'category' não muda nada)
+
+    Returns:
+        DataFrame convertido
+    """
+    if not schema:
+        return df
+
+    for coluna, dtype in schema.get('tipos', {}).items():
+        if coluna in df.columns and str(df[coluna].dtype) != str(dtype):
+            try:
+                df[coluna] = df[coluna].astype(dtype)
+            except (ValueError, TypeError) as e:
+                print(f"   ⚠️ Coluna '{coluna}' mantida como {df[coluna].dtype} (schema pede {dtype}): {e}")
+
+    if incluir_categorias:
+        for coluna in schema.get('categorias', []):
+            if coluna in df.columns and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+                df[coluna] = df[coluna].astype('category')
+
+    return df
+
+
+def concatenar(dfs):
+    """
+    pd.concat que preserva colunas 'category' (unindo as categorias antes)
+
+    Sem isso, categorias diferentes entre os DataFrames viram object no concat.
+    Os DataFrames recebidos não são alterados (as categorias unidas vão em cópias rasas).
+
+    Args:
+        dfs: Lista de DataFrames
+
+    Returns:
+        DataFrame concatenado (ignore_index=True)
+    """
+    dfs = [df.copy(deep=False) for df in dfs if df is not None]
+    if len(dfs) > 1:
+        for coluna in dfs[0].columns:
+            series = [df[coluna] for df in dfs if coluna in df.columns]
+            if len(series) == len(dfs) and all(isinstance(s.dtype, pd.CategoricalDtype) for s in series):
+                categorias = series[0].cat.categories
+                for serie in series[1:]:
+                    categorias = categorias.union(serie.cat.categories, sort=False)
+                for df in dfs:
+                    df[coluna] = df[coluna].cat.set_categories(categorias)
+
+    return pd.concat(dfs, ignore_index=True)
@@ -0,0 +1,201 @@
+"""
+Módulo de escrita incremental dos resultados de um endpoint
+
+Cada resposta é gravada em disco como um arquivo parcial assim que chega, em
+vez de ficar numa lista de DataFrames até o fim da extração. Na consolidação
+as partes são lidas uma a uma, na ordem original das linhas, e anexadas ao
+CSV final - o pico de memória fica limitado a uma resposta, não ao endpoint
+inteiro.
+
+Respostas lidas em streaming (json_streaming) chegam em lotes: cada lote é
+anexado ao arquivo parcial da competência como um pickle a mais, em sequência,
+e relido lote a lote.
+"""
+import os
+import pickle
+import shutil
+import threading
+
+
+def ler_lotes(caminho):
+    """
+    Lê os DataFrames gravados em sequência num arquivo parcial
+
+    Yields:
+        DataFrame de cada lote (um só para as partes gravadas de uma vez)
+    """
+    with open(caminho, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+class ParteEmLotes:
+    """Arquivo parcial de uma competência escrito lote a lote (respostas em streaming)"""
+
+    def __init__(self, escritor, posicao, unidade):
+        self.escritor = escritor
+        self.posicao = posicao
+        self.caminho = os.path.join(escritor.diretorio, escritor.nome_parte(unidade))
+        self.temporario = self.caminho + '.tmp'
+        self.colunas = []
+        self.registros = 0
+        self._arquivo = None
+
+    def anexar(self, df):
+        """Anexa um lote (DataFrame) ao arquivo parcial"""
+        if self._arquivo is None:
+            os.makedirs(self.escritor.diretorio, exist_ok=True)
+            self._arquivo = open(self.temporario, 'wb')
+
+        pickle.dump(df, self._arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+
+        vistas = set(self.colunas)
+        self.colunas.extend(coluna for coluna in df.columns if coluna not in vistas)
+        self.registros += len(df)
+
+    def concluir(self):
+        """
+        Fecha o arquivo e registra a parte no escritor
+
+        Returns:
+            str: Caminho do arquivo parcial ou None se nenhum lote foi anexado
+        """
+        if self._arquivo is None:
+            return None
+
+        self._arquivo.close()
+        os.replace(self.temporario, self.caminho)
+        self.escritor.adotar(self.posicao, self.caminho, self.colunas, self.registros)
+        return self.caminho
+
+    def descartar(self):
+        """Remove o que foi gravado (erro no meio da resposta)"""
+        self.colunas = []
+        self.registros = 0
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+            if os.path.exists(self.temporario):
+                os.remove(self.temporario)
+
+
+class EscritorPartes:
+    """Grava e relê, em ordem, os DataFrames parciais de um endpoint"""
+
+    def __init__(self, caminho_to_save, nome_api):
+        """
+        Args:
+            caminho_to_save: Diretório de saída do mês (as partes ficam em _checkpoint/)
+            nome_api: Nome da API
+        """
+        self.nome_api = nome_api
+        self.diretorio = os.path.join(caminho_to_save, '_checkpoint', f"parciais_{nome_api.lower()}")
+        self.partes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.partes)
+
+    @staticmethod
+    def nome_parte(unidade):
+        """Nome do arquivo parcial de uma (unidade_id, competência)"""
+        return f"{unidade['unidade_id']}_{str(unidade['competencia']).replace('/', '-')}.pkl"
+
+    def gravar(self, posicao, unidade, df):
+        """
+        Grava o DataFrame de uma competência em disco
+
+        Args:
+            posicao: Posição da linha no arquivo de competências (define a ordem final)
+            unidade: Linha do DataFrame de competências
+            df: DataFrame da resposta
+
+        Returns:
+            str: Caminho do arquivo parcial
+        """
+        os.makedirs(self.diretorio, exist_ok=True)
+
+        caminho = os.path.join(self.diretorio, self.nome_parte(unidade))
+        temporario = caminho + '.tmp'
+        df.to_pickle(temporario)
+        os.replace(temporario, caminho)
+
+        self.adotar(posicao, caminho, list(df.columns), len(df))
+        return caminho
+
+    def abrir(self, posicao, unidade):
+        """
+        Abre a parte de uma competência para gravação em lotes
+
+        Args:
+            posicao: Posição da linha no arquivo de competências
+            unidade: Linha do DataFrame de competências
+
+        Returns:
+            ParteEmLotes
+        """
+        return ParteEmLotes(self, posicao, unidade)
+
+    def adotar(self, posicao, caminho, colunas=None, registros=None):
+        """
+        Registra uma parte já existente em disco (ex.: recuperada do checkpoint)
+
+        Args:
+            posicao: Posição da linha no arquivo de competências
+            caminho: Caminho do arquivo parcial
+            colunas: Colunas da parte (se None, são lidas do arquivo)
+            registros: Quantidade de linhas da parte
+        """
+        if colunas is None:
+            colunas, registros = [], 0
+            for df in ler_lotes(caminho):
+                colunas.extend(coluna for coluna in df.columns if coluna not in colunas)
+                registros += len(df)
+
+        with self._lock:
+            self.partes[posicao] = {
+                'caminho': caminho,
+                'colunas': list(colunas),
+                'registros': registros
+            }
+
+    def colunas(self):
+        """
+        União das colunas de todas as partes, na mesma ordem que o pd.concat produziria
+
+        Returns:
+            list: Nomes das colunas
+        """
+        colunas = []
+        vistas = set()
+        for posicao in sorted(self.partes):
+            for coluna in self.partes[posicao]['colunas']:
+                if coluna not in vistas:
+                    vistas.add(coluna)
+                    colunas.append(coluna)
+        return colunas
+
+    def ler_partes(self):
+        """
+        Lê as partes uma por vez, na ordem das linhas, com as colunas alinhadas
+
+        Yields:
+            DataFrame de cada parte (ou de cada lote, nas partes gravadas em streaming)
+        """
+        colunas = self.colunas()
+        for posicao in sorted(self.partes):
+            for df in ler_lotes(self.partes[posicao]['caminho']):
+                yield df.reindex(columns=colunas)
+
+    def limpar(self):
+        """Remove as partes gravadas"""
+        with self._lock:
+            self.partes = {}
+            if os.path.exists(self.diretorio):
+                shutil.rmtree(self.diretorio, ignore_errors=True)
+            diretorio_pai = os.path.dirname(self.diretorio)
+            if os.path.isdir(diretorio_pai) and not os.listdir(diretorio_pai):
+                os.rmdir(diretorio_pai)
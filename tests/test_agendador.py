@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from modules import api_extractor_async
+from modules.agendador import AgendadorGlobal
+
+
+class ExtracaoFalsa:
+    """Interface de ExtracaoEndpoint usada pelo agendador, registrando a concorrência por unidade"""
+
+    def __init__(self, nome_api, unidades, monitor):
+        self.nome_api = nome_api
+        self.delay_entre_unidades = 0
+        self.delay_entre_chamadas = 0
+        linhas = [(posicao, {'unidade_id': unidade_id, 'competencia': '01/2026'})
+                  for posicao, unidade_id in enumerate(unidades)]
+        self.tarefas = [[linha] for linha in linhas]
+        self.total = len(linhas)
+        self.acumulados = []
+        self.monitor = monitor
+
+    def processar_tarefa(self, tarefa):
+        unidade_id = tarefa[0][1]['unidade_id']
+        self.monitor.entrar(unidade_id)
+        time.sleep(0.02)
+        self.monitor.sair(unidade_id)
+        return [(posicao, {'unidade_id': unidade['unidade_id']}) for posicao, unidade in tarefa]
+
+    def contexto_async(self):
+        return {'nome_api': self.nome_api, 'total': self.total, 'delay_entre_chamadas': 0}
+
+    def acumular_resultado(self, resultado):
+        self.acumulados.append(resultado)
+
+    def finalizar(self):
+        return f"{self.nome_api}.csv"
+
+
+class Monitor:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.atuais = {}
+        self.maximo_por_unidade = {}
+        self.maximo_total = 0
+
+    def entrar(self, unidade_id):
+        with self.lock:
+            self.atuais[unidade_id] = self.atuais.get(unidade_id, 0) + 1
+            self.maximo_por_unidade[unidade_id] = max(self.maximo_por_unidade.get(unidade_id, 0), self.atuais[unidade_id])
+            self.maximo_total = max(self.maximo_total, sum(self.atuais.values()))
+
+    def sair(self, unidade_id):
+        with self.lock:
+            self.atuais[unidade_id] -= 1
+
+
+def _executar(max_workers, max_lanes_por_unidade, endpoints=6, unidades=(1, 2)):
+    monitor = Monitor()
+    agendador = AgendadorGlobal(max_workers=max_workers, max_lanes_por_unidade=max_lanes_por_unidade)
+    extracoes = [ExtracaoFalsa(f"api_{i}", unidades, monitor) for i in range(endpoints)]
+    for extracao in extracoes:
+        agendador.adicionar(extracao)
+    return agendador.executar(), extracoes, monitor
+
+
+def test_uma_lane_por_unidade_mesmo_com_muitos_endpoints():
+    resultados, extracoes, monitor = _executar(max_workers=8, max_lanes_por_unidade=1)
+
+    assert monitor.maximo_por_unidade == {1: 1, 2: 1}
+    assert monitor.maximo_total == 2
+    assert all(resultado == {'sucesso': True, 'arquivo': f"{nome}.csv"} for nome, resultado in resultados.items())
+    # Resultados acumulados na ordem original de cada endpoint
+    assert all([r['unidade_id'] for r in extracao.acumulados] == [1, 2] for extracao in extracoes)
+
+
+def test_limite_por_unidade_configuravel():
+    _, _, monitor = _executar(max_workers=8, max_lanes_por_unidade=3)
+
+    assert max(monitor.maximo_por_unidade.values()) <= 3
+    assert monitor.maximo_total > 2
+
+
+def test_consolidacao_nao_segura_a_vaga_da_unidade():
+    monitor = Monitor()
+    agendador = AgendadorGlobal(max_workers=1, max_lanes_por_unidade=1)
+    eventos = []
+
+    class ExtracaoLenta(ExtracaoFalsa):
+        def processar_tarefa(self, tarefa):
+            eventos.append(('inicio', self.nome_api))
+            return super().processar_tarefa(tarefa)
+
+        def finalizar(self):
+            eventos.append(('consolidando', self.nome_api))
+            time.sleep(0.2)
+            eventos.append(('consolidado', self.nome_api))
+            return super().finalizar()
+
+    for nome in ("api_a", "api_b"):
+        agendador.adicionar(ExtracaoLenta(nome, [1], monitor))
+
+    resultados = agendador.executar()
+
+    assert all(resultado['sucesso'] for resultado in resultados.values())
+    # O único worker segue para api_b enquanto api_a ainda consolida
+    assert eventos.index(('inicio', 'api_b')) < eventos.index(('consolidado', 'api_a'))
+
+
+@pytest.mark.skipif(not api_extractor_async.backend_async_disponivel(), reason="requer aiohttp")
+def test_backend_async_um_loop_para_todos_os_endpoints(monkeypatch):
+    monitor = Monitor()
+    loops = set()
+
+    async def processar_tarefa_falsa(sessao, semaforo, tarefa, contexto):
+        loops.add(id(asyncio.get_running_loop()))
+        unidade_id = tarefa[0][1]['unidade_id']
+        monitor.entrar(unidade_id)
+        await asyncio.sleep(0.02)
+        monitor.sair(unidade_id)
+        return [(posicao, {'unidade_id': unidade['unidade_id']}) for posicao, unidade in tarefa]
+
+    monkeypatch.setattr(api_extractor_async, '_processar_tarefa_async', processar_tarefa_falsa)
+
+    agendador = AgendadorGlobal(max_workers=8, max_lanes_por_unidade=1, backend='async')
+    extracoes = [ExtracaoFalsa(f"api_{i}", (1, 2), monitor) for i in range(4)]
+    for extracao in extracoes:
+        agendador.adicionar(extracao)
+
+    resultados = agendador.executar()
+
+    assert len(loops) == 1
+    assert monitor.maximo_por_unidade == {1: 1, 2: 1}
+    assert monitor.maximo_total == 2
+    assert all(resultado == {'sucesso': True, 'arquivo': f"{nome}.csv"} for nome, resultado in resultados.items())
+    assert all([r['unidade_id'] for r in extracao.acumulados] == [1, 2] for extracao in extracoes)
@@ -0,0 +1,77 @@
+import os
+
+from modules.checkpoint import JournalExtracao
+
+
+def _unidade(unidade_id, competencia):
+    return {'unidade_id': unidade_id, 'nome': f"HOSP {unidade_id}", 'competencia': competencia}
+
+
+def _resultado(status, arquivo_parcial=None, registros=1):
+    return {
+        'arquivo_parcial': arquivo_parcial,
+        'colunas': ['valor'],
+        'registros': registros,
+        'erros': [],
+        'registros_tracker': [{'status': status, 'registros': registros}]
+    }
+
+
+def _parcial(tmp_path, nome):
+    caminho = tmp_path / nome
+    caminho.write_text('valor\n1\n', encoding='utf-8')
+    return str(caminho)
+
+
+def test_retomada_ignora_ultima_linha_truncada(tmp_path):
+    journal = JournalExtracao(str(tmp_path), 'Consumo')
+    journal.registrar(_unidade(1, '01/2026'), _resultado('sucesso', _parcial(tmp_path, 'a.csv')))
+    journal.registrar(_unidade(1, '02/2026'), _resultado('sem_dados', registros=0))
+
+    # Queda no meio da escrita da terceira entrada
+    with open(journal.caminho_journal, 'a', encoding='utf-8') as f:
+        f.write('{"chave": "2|01/2026", "status": "suc')
+
+    linhas = [(0, _unidade(1, '01/2026')), (1, _unidade(1, '02/2026')), (2, _unidade(2, '01/2026'))]
+    recuperados, pendentes = JournalExtracao(str(tmp_path), 'Consumo').recuperar(linhas)
+
+    assert sorted(recuperados) == [0, 1]
+    assert recuperados[0]['df'] is None and recuperados[0]['registros'] == 1
+    assert pendentes == [(2, _unidade(2, '01/2026'))]
+
+
+def test_entrada_gravada_depois_da_linha_truncada_e_recuperada(tmp_path):
+    journal = JournalExtracao(str(tmp_path), 'Consumo')
+    journal.registrar(_unidade(1, '01/2026'), _resultado('sucesso', registros=3))
+    with open(journal.caminho_journal, 'a', encoding='utf-8') as f:
+        f.write('{"chave": "2|01/20')
+
+    # Execução retomada conclui a competência que estava sendo gravada
+    retomado = JournalExtracao(str(tmp_path), 'Consumo')
+    retomado.registrar(_unidade(2, '01/2026'), _resultado('sucesso', registros=5))
+
+    entradas = JournalExtracao(str(tmp_path), 'Consumo').carregar()
+    assert set(entradas) == {'1|01/2026', '2|01/2026'}
+    assert entradas['2|01/2026']['registros'] == 5
+
+
+def test_erros_nao_sao_gravados_e_parcial_perdido_e_refeito(tmp_path):
+    journal = JournalExtracao(str(tmp_path), 'Consumo')
+    parcial = _parcial(tmp_path, 'b.csv')
+    journal.registrar(_unidade(1, '01/2026'), _resultado('sucesso', parcial))
+    journal.registrar(_unidade(1, '02/2026'), _resultado('erro'))
+    os.remove(parcial)
+
+    recuperados, pendentes = journal.recuperar([(0, _unidade(1, '01/2026')), (1, _unidade(1, '02/2026'))])
+
+    assert recuperados == {}
+    assert [posicao for posicao, _ in pendentes] == [0, 1]
+
+
+def test_limpar_remove_journal(tmp_path):
+    journal = JournalExtracao(str(tmp_path), 'Consumo')
+    journal.registrar(_unidade(1, '01/2026'), _resultado('sucesso'))
+
+    journal.limpar()
+
+    assert not os.path.exists(journal.diretorio)
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from modules.api_extractor import _dividir_resultado_faixa
+
+TAREFA = [
+    (0, {'nome': 'HOSP A', 'competencia': '01/2026'}),
+    (1, {'nome': 'HOSP A', 'competencia': '02/2026'})
+]
+
+
+def _resultado(competencias):
+    return {
+        'df': pd.DataFrame({'competenciaDescr': competencias, 'valor': range(len(competencias))}),
+        'erros': [],
+        'erros_403': [],
+        'registros_tracker': [{'status': 'sucesso', 'data_hora': '2026-10-01 10:00:00', 'tempo_execucao': 2.0}]
+    }
+
+
+def test_faixa_dividida_por_competencia():
+    divididos = _dividir_resultado_faixa(_resultado(['01/2026', '02/2026', '02/2026']), TAREFA, 'Consumo')
+
+    assert [len(resultado['df']) for _, resultado in divididos] == [1, 2]
+    assert [resultado['registros_tracker'][0]['tempo_execucao'] for _, resultado in divididos] == [1.0, 1.0]
+
+
+def test_linhas_fora_da_faixa_refazem_mes_a_mes():
+    assert _dividir_resultado_faixa(_resultado(['01/2026', '03/2026']), TAREFA, 'Consumo') is None
@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+from modules.formato_saida import salvar_partes_parquet
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def _partes():
+    return [
+        pd.DataFrame({
+            'centroDeCustoDescr': pd.Categorical(['UTI', 'CENTRO CIRURGICO']),
+            'quantidade': [1, 2],
+            'observacao': [None, None]
+        }),
+        pd.DataFrame({
+            'centroDeCustoDescr': pd.Categorical(['FARMACIA']),
+            'quantidade': [2.5],
+            'observacao': ['revisado']
+        })
+    ]
+
+
+def test_um_row_group_por_parte_com_schema_unificado(tmp_path):
+    caminho = str(tmp_path / "api_teste.parquet")
+    chamadas = []
+
+    def gerar_partes(contabilizar):
+        chamadas.append(contabilizar)
+        return iter(_partes())
+
+    total = salvar_partes_parquet(gerar_partes, caminho)
+
+    assert total == 3
+    assert chamadas == [False, True]
+    assert pq.ParquetFile(caminho).num_row_groups == 2
+
+    df = pd.read_parquet(caminho)
+    assert isinstance(df['centroDeCustoDescr'].dtype, pd.CategoricalDtype)
+    assert list(df['centroDeCustoDescr']) == ['UTI', 'CENTRO CIRURGICO', 'FARMACIA']
+    assert list(df['quantidade']) == [1.0, 2.0, 2.5]
+    assert df['observacao'].isna().tolist() == [True, True, False]
+
+
+def test_tipos_incompativeis_entre_partes_viram_texto(tmp_path):
+    caminho = str(tmp_path / "api_teste.parquet")
+    partes = [pd.DataFrame({'codigo': [10, 20]}), pd.DataFrame({'codigo': ['A30']})]
+
+    salvar_partes_parquet(lambda contabilizar: iter(partes), caminho)
+
+    assert list(pd.read_parquet(caminho)['codigo']) == ['10', '20', 'A30']
@@ -0,0 +1,90 @@
+import json
+import random
+
+import pytest
+
+from modules.json_streaming import LeitorItems, iterar_lotes
+
+ITEMS = [
+    {"unidade": "São José \"Centro\"", "valor": 1234.5, "codigo": -17, "ativo": True, "obs": None},
+    {"unidade": "HOSP \\ A\\\\", "valor": 1e-7, "codigo": 0, "ativo": False, "obs": "tab\tquebra\nfim"},
+    {"unidade": "emoji 😀 e ção", "valor": -0.0, "codigo": 12345678901234567890, "obs": "/"},
+    {"aninhado": {"lista": [1, [2, {"x": "]}"}]], "vazio": {}}, "texto": "{\"items\": []}"},
+    {"valor": 3.14159e+10, "escapes": "\\u00e9 \\\" \\n"}
+]
+
+
+def _corpo(items=ITEMS, ensure_ascii=True, antes=None, depois=None):
+    objeto = dict(antes or {})
+    objeto['items'] = items
+    objeto.update(depois or {})
+    return json.dumps(objeto, ensure_ascii=ensure_ascii, indent=1).encode('utf-8')
+
+
+def _fatiar(corpo, tamanhos):
+    blocos, inicio = [], 0
+    tamanhos = iter(tamanhos)
+    while inicio < len(corpo):
+        tamanho = next(tamanhos)
+        blocos.append(corpo[inicio:inicio + tamanho])
+        inicio += tamanho
+    return blocos
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("tamanho_bloco", [1, 2, 3, 5, 7, 64])
+def test_blocos_de_tamanho_fixo_iguais_ao_json_loads(ensure_ascii, tamanho_bloco):
+    corpo = _corpo(ensure_ascii=ensure_ascii, antes={"pagina": 1}, depois={"total": 5, "meta": {"a": [1, 2]}})
+    leitor = LeitorItems(_fatiar(corpo, iter(lambda: tamanho_bloco, None)))
+
+    assert list(leitor) == json.loads(corpo)['items']
+    assert leitor.encontrada
+    assert leitor.outros == {"pagina": 1, "total": 5, "meta": {"a": [1, 2]}}
+
+
+def test_cortes_aleatorios_dentro_de_strings_escapes_e_numeros():
+    gerador = random.Random(1234)
+    corpo = _corpo(ITEMS * 20, ensure_ascii=False, antes={"total": 100})
+
+    for _ in range(200):
+        blocos = _fatiar(corpo, iter(lambda: gerador.randint(1, 40), None))
+        assert list(LeitorItems(blocos)) == json.loads(corpo)['items']
+
+
+def test_todos_os_cortes_de_um_item_com_escapes():
+    corpo = b'{"items": [{"a": "x\\\\\\"y\\u00e9\\ud83d\\ude00", "n": 12.5e3}, 7890]}'
+    esperado = json.loads(corpo)['items']
+
+    for corte in range(1, len(corpo)):
+        assert list(LeitorItems([corpo[:corte], corpo[corte:]])) == esperado
+
+
+def test_caractere_multibyte_dividido_entre_blocos():
+    corpo = '{"items": [{"unidade": "Hospital São João"}]}'.encode('utf-8')
+    corte = corpo.index('ã'.encode('utf-8')) + 1
+
+    assert list(LeitorItems([corpo[:corte], corpo[corte:]])) == [{"unidade": "Hospital São João"}]
+
+
+def test_lista_vazia_objeto_vazio_e_chave_ausente():
+    assert list(LeitorItems([b'{"items": []}'])) == []
+    assert list(LeitorItems([b'{}'])) == []
+
+    leitor = LeitorItems([b'{"dados": [1, 2]}'])
+    assert list(leitor) == []
+    assert not leitor.encontrada and leitor.outros == {"dados": [1, 2]}
+
+
+@pytest.mark.parametrize("corpo", [b'{"items": [{"a": 1}, {"a": 2', b'{"items": [1, 2', b'[1, 2]', b'{"items": [1 2]}'])
+def test_json_incompleto_ou_invalido_gera_erro(corpo):
+    with pytest.raises(ValueError):
+        list(LeitorItems([corpo[:5], corpo[5:]]))
+
+
+def test_lotes_de_tamanho_fixo():
+    corpo = _corpo([{"i": i} for i in range(25)])
+
+    lotes = list(iterar_lotes(_fatiar(corpo, iter(lambda: 11, None)), tamanho_lote=10))
+
+    assert [len(lote) for lote in lotes] == [10, 10, 5]
+    assert [item["i"] for lote in lotes for item in lote] == list(range(25))
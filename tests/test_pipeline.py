@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from modules.pipeline import PipelineDAG
+
+
+def _executar_com_limite(pipeline, segundos=5):
+    """Executa o pipeline numa thread, falhando se ele não terminar (travado)"""
+    saida = {}
+    thread = threading.Thread(target=lambda: saida.setdefault('resultados', pipeline.executar()), daemon=True)
+    thread.start()
+    thread.join(segundos)
+    assert not thread.is_alive(), "pipeline travou"
+    return saida['resultados']
+
+
+def _falhar():
+    raise RuntimeError("falhou")
+
+
+def test_falha_ignora_as_dependentes_em_cadeia():
+    pipeline = PipelineDAG(max_paralelas=2)
+    pipeline.adicionar('extrair', lambda: 'csv')
+    pipeline.adicionar('consolidar', _falhar, dependencias=['extrair'])
+    pipeline.adicionar('upload', lambda: 'enviado', dependencias=['consolidar'])
+    pipeline.adicionar('relatorio', lambda: 'ok', dependencias=['upload', 'extrair'])
+    pipeline.adicionar('independente', lambda: 'ok')
+
+    resultados = _executar_com_limite(pipeline)
+
+    status = {nome: etapa.status for nome, etapa in pipeline.etapas.items()}
+    assert status == {
+        'extrair': 'concluida',
+        'consolidar': 'erro',
+        'upload': 'ignorada',
+        'relatorio': 'ignorada',
+        'independente': 'concluida'
+    }
+    assert pipeline.etapas['upload'].erro == "dependência não concluída: consolidar"
+    assert pipeline.etapas['relatorio'].erro == "dependência não concluída: upload"
+    assert resultados['extrair'] == 'csv' and resultados['upload'] is None
+
+
+def test_etapa_externa_concluida_por_outra_etapa():
+    pipeline = PipelineDAG()
+    pipeline.adicionar('extrair:Consumo', concluida_por='agendador')
+    pipeline.adicionar('agendador', lambda: pipeline.concluir('extrair:Consumo', resultado='api_consumo.csv'))
+    pipeline.adicionar('consolidar:Consumo', lambda: pipeline.resultado('extrair:Consumo') + ' consolidado',
+                       dependencias=['extrair:Consumo'])
+
+    resultados = _executar_com_limite(pipeline)
+
+    assert resultados['consolidar:Consumo'] == 'api_consumo.csv consolidado'
+
+
+def test_etapa_externa_nunca_concluida_vira_erro_sem_travar():
+    pipeline = PipelineDAG()
+    pipeline.adicionar('extrair:Consumo', concluida_por='agendador')
+    pipeline.adicionar('extrair:estatistica', concluida_por='agendador')
+    # O agendador termina sem concluir Consumo
+    pipeline.adicionar('agendador', lambda: pipeline.concluir('extrair:estatistica', resultado='ok'))
+    pipeline.adicionar('consolidar:Consumo', lambda: 'nunca', dependencias=['extrair:Consumo'])
+    pipeline.adicionar('consolidar:estatistica', lambda: 'ok', dependencias=['extrair:estatistica'])
+
+    _executar_com_limite(pipeline)
+
+    assert pipeline.etapas['extrair:Consumo'].status == 'erro'
+    assert pipeline.etapas['extrair:Consumo'].erro == "etapa externa não concluída"
+    assert pipeline.etapas['consolidar:Consumo'].status == 'ignorada'
+    assert pipeline.etapas['consolidar:estatistica'].status == 'concluida'
+
+
+def test_etapa_externa_concluida_com_erro_ignora_as_dependentes():
+    pipeline = PipelineDAG()
+    pipeline.adicionar('extrair:Consumo', concluida_por='agendador')
+    pipeline.adicionar('agendador', lambda: pipeline.concluir('extrair:Consumo', erro='HTTP 500'))
+    pipeline.adicionar('consolidar:Consumo', lambda: 'nunca', dependencias=['extrair:Consumo'])
+
+    _executar_com_limite(pipeline)
+
+    assert pipeline.etapas['extrair:Consumo'].status == 'erro'
+    assert pipeline.etapas['consolidar:Consumo'].status == 'ignorada'
+
+
+def test_limite_do_grupo():
+    pipeline = PipelineDAG(max_paralelas=4)
+    pipeline.limitar_grupo('consolidacao', 1)
+    lock = threading.Lock()
+    contagem = {'atual': 0, 'maximo': 0}
+
+    def consolidar():
+        with lock:
+            contagem['atual'] += 1
+            contagem['maximo'] = max(contagem['maximo'], contagem['atual'])
+        time.sleep(0.02)
+        with lock:
+            contagem['atual'] -= 1
+
+    for i in range(4):
+        pipeline.adicionar(f'consolidar:{i}', consolidar, grupo='consolidacao')
+
+    _executar_com_limite(pipeline)
+
+    assert contagem['maximo'] == 1
+    assert all(etapa.status == 'concluida' for etapa in pipeline.etapas.values())
+
+
+def test_dependencia_desconhecida_ou_nome_repetido():
+    pipeline = PipelineDAG()
+    pipeline.adicionar('a', lambda: None)
+
+    with pytest.raises(ValueError):
+        pipeline.adicionar('b', lambda: None, dependencias=['c'])
+    with pytest.raises(ValueError):
+        pipeline.adicionar('a', lambda: None)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from modules.ponto import AnalisadorIncremental, planejar_reextracao
+
+
+def _analisador(tmp_path, monkeypatch):
+    monkeypatch.setenv('caminho_fixo', str(tmp_path))
+    return AnalisadorIncremental(str(tmp_path / '2026' / '10_2026'))
+
+
+def test_remocao_de_reprocessadas_igual_a_comparacao_linha_a_linha(tmp_path, monkeypatch):
+    df_antigo = pd.DataFrame({
+        'competencia': ['01/2026', '01/2026', '02/2026', 'jan/2026', np.nan],
+        'unidade': ['HOSP A', 'HOSP B', 'HOSP A', 'HOSP A', 'HOSP A'],
+        'valor': [1, 2, 3, 4, 5]
+    })
+    reprocessadas = {('01/2026', 'HOSP A'), ('02/2026', 'HOSP C')}
+
+    resultado = _analisador(tmp_path, monkeypatch)._remover_competencias_reprocessadas(df_antigo, reprocessadas)
+
+    # Comparação original (apply linha a linha): valores como estão gravados
+    esperado = df_antigo[df_antigo.apply(
+        lambda row: (row['competencia'], row['unidade']) not in reprocessadas, axis=1
+    )]
+    pd.testing.assert_frame_equal(resultado, esperado)
+    assert list(resultado['valor']) == [2, 3, 4, 5]
+
+
+def test_sem_reprocessadas_mantem_a_base(tmp_path, monkeypatch):
+    df_antigo = pd.DataFrame({'competencia': ['01/2026'], 'unidade': ['HOSP A']})
+
+    assert _analisador(tmp_path, monkeypatch)._remover_competencias_reprocessadas(df_antigo, set()) is df_antigo
+
+
+def test_reextracao_seletiva_inclui_competencia_reaberta(tmp_path):
+    arquivo = str(tmp_path / 'competencias_todas_unidades.xlsx')
+    pd.DataFrame({
+        'unidade_id': [1, 1, 2, 3],
+        'token': ['t1', 't1', 't2', 't3'],
+        'competencia': ['05/2026', '06/2026', '06/2026', '06/2026'],
+        'nome': ['HOSP A', 'HOSP A', 'HOSP B', 'HOSP C'],
+        'situacao': ['FECHADA', 'REABERTA', 'FECHADA', 'ABERTA']
+    }).to_excel(arquivo, index=False)
+
+    plano, reprocessadas = planejar_reextracao(arquivo, competencias=['06/2026'])
+
+    assert sorted(zip(plano.df['nome'], plano.df['situacao'])) == [('HOSP A', 'REABERTA'), ('HOSP B', 'FECHADA')]
+    assert reprocessadas == {('06/2026', 'HOSP A'), ('06/2026', 'HOSP B')}
+    assert plano.ignora_cache(1, '06/2026') and plano.ignora_cache(2, '06/2026')
+
+
+def test_reextracao_seletiva_so_de_competencia_aberta_fica_vazia(tmp_path):
+    arquivo = str(tmp_path / 'competencias_todas_unidades.xlsx')
+    pd.DataFrame({
+        'unidade_id': [3], 'token': ['t3'], 'competencia': ['06/2026'], 'nome': ['HOSP C'], 'situacao': ['ABERTA']
+    }).to_excel(arquivo, index=False)
+
+    assert planejar_reextracao(arquivo, unidades=['hosp c']) == (None, set())
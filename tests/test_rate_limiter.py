@@ -0,0 +1,46 @@
+import pytest
+
+from modules.rate_limiter import LimitadorAdaptativo, limpar_buckets_token
+
+LIMITES = {"taxa_inicial": 1.0, "taxa_minima": 0.1, "taxa_maxima": 5.0, "incremento": 0.1, "fator_reducao": 0.5}
+LIMITES_LENTO = {"taxa_inicial": 0.5, "taxa_minima": 0.05, "taxa_maxima": 2.0, "incremento": 0.05, "fator_reducao": 0.5}
+
+
+@pytest.fixture(autouse=True)
+def buckets_limpos():
+    limpar_buckets_token()
+    yield
+    limpar_buckets_token()
+
+
+def test_endpoints_dividem_o_bucket_do_token():
+    consumo = LimitadorAdaptativo(LIMITES, "Consumo")
+    estatistica = LimitadorAdaptativo(LIMITES, "estatistica")
+
+    assert consumo._bucket("token-a") is estatistica._bucket("token-a")
+    assert consumo._bucket("token-a") is not consumo._bucket("token-b")
+
+
+@pytest.mark.parametrize("status", [403, 429])
+def test_bloqueio_em_um_endpoint_reduz_a_taxa_dos_demais(status):
+    consumo = LimitadorAdaptativo(LIMITES, "Consumo")
+    estatistica = LimitadorAdaptativo(LIMITES, "estatistica")
+
+    consumo.registrar_resposta("token-a", status)
+
+    assert estatistica._bucket("token-a").taxa == pytest.approx(0.5)
+    assert consumo.resumo()['reducoes_403'] == 1
+    assert estatistica.resumo()['reducoes_403'] == 0
+
+
+def test_bucket_compartilhado_usa_a_menor_taxa_maxima():
+    padrao = LimitadorAdaptativo(LIMITES, "Consumo")
+    bucket = padrao._bucket("token-a")
+    for _ in range(50):
+        padrao.registrar_resposta("token-a", 200)
+    assert bucket.taxa == pytest.approx(5.0)
+
+    LimitadorAdaptativo(LIMITES_LENTO, "QuantidadeLeito")._bucket("token-a")
+
+    assert bucket.taxa_maxima == pytest.approx(2.0)
+    assert bucket.taxa == pytest.approx(2.0)
@@ -0,0 +1,116 @@
+import os
+
+import pandas as pd
+import pytest
+
+from modules import response_cache
+from modules.response_cache import CacheRespostas, configurar_cache, invalidar_competencias
+from modules.ponto import processar_incremental, planejar_reextracao
+
+
+def _gravar(cache, nome_api, unidade_id, competencias, conteudo=b'{"items": []}'):
+    payload = {"competenciaInicial": competencias[0], "competenciaFinal": competencias[-1]}
+    chave = cache.gerar_chave(nome_api, unidade_id, payload, 'FECHADA')
+    cache.gravar(chave, nome_api, unidade_id, competencias, 'FECHADA', 200, conteudo)
+    return chave
+
+
+@pytest.fixture
+def cache_ativo(tmp_path):
+    configurar_cache(str(tmp_path / 'cache'), 1)
+    yield response_cache.obter_cache()
+    configurar_cache(None)
+
+
+def test_descarte_lru_respeita_o_tamanho_maximo(tmp_path):
+    cache = CacheRespostas(str(tmp_path), tamanho_maximo_mb=2500 / (1024 * 1024))
+    antiga = _gravar(cache, 'Consumo', 1, ['01/2026'], b'a' * 1000)
+    usada = _gravar(cache, 'Consumo', 1, ['02/2026'], b'b' * 1000)
+
+    # Acesso recente: a primeira passa a ser a menos usada
+    cache.indice[antiga]['ultimo_acesso'] -= 10
+    assert cache.obter(usada, 'Consumo').content == b'b' * 1000
+
+    nova = _gravar(cache, 'Consumo', 1, ['03/2026'], b'c' * 1000)
+
+    assert not cache.contem(antiga)
+    assert cache.contem(usada) and cache.contem(nova)
+    assert not os.path.exists(cache._caminho_resposta(antiga))
+    assert CacheRespostas(str(tmp_path), 1).contem(nova)
+
+
+def test_resposta_maior_que_o_cache_nao_e_guardada(tmp_path):
+    cache = CacheRespostas(str(tmp_path), tamanho_maximo_mb=100 / (1024 * 1024))
+    chave = _gravar(cache, 'Consumo', 1, ['01/2026'], b'x' * 500)
+
+    assert not cache.contem(chave)
+
+
+def test_invalidacao_remove_faixas_que_cobrem_a_competencia(tmp_path):
+    cache = CacheRespostas(str(tmp_path), 1)
+    faixa = _gravar(cache, 'Consumo', 1, ['01/2026', '02/2026', '03/2026'])
+    outra_unidade = _gravar(cache, 'Consumo', 2, ['02/2026'])
+    outro_endpoint = _gravar(cache, 'estatistica', 1, ['02/2026'])
+
+    assert cache.invalidar(1, 'fev/2026') == 2
+
+    assert not cache.contem(faixa) and not cache.contem(outro_endpoint)
+    assert cache.contem(outra_unidade)
+    assert not CacheRespostas(str(tmp_path), 1).contem(faixa)
+
+
+def _competencias(caminho, linhas):
+    os.makedirs(caminho, exist_ok=True)
+    arquivo = os.path.join(caminho, 'competencias_todas_unidades.xlsx')
+    pd.DataFrame(linhas, columns=['unidade_id', 'token', 'competencia', 'nome', 'situacao']).to_excel(arquivo, index=False)
+    return arquivo
+
+
+def test_competencia_reaberta_e_fechada_de_novo_nao_vem_do_cache(tmp_path, monkeypatch, cache_ativo):
+    monkeypatch.setenv('caminho_fixo', str(tmp_path))
+    # Unidade 1: 06/2026 fechada (mês -2) → reaberta (mês -1) → fechada de novo (mês atual)
+    # Unidade 2: 06/2026 sempre fechada; Unidade 3: 09/2026 fechou agora
+    _competencias(tmp_path / '2026' / '08_2026', [
+        (1, 't1', '06/2026', 'HOSP A', 'FECHADA'),
+        (2, 't2', '06/2026', 'HOSP B', 'FECHADA')
+    ])
+    _competencias(tmp_path / '2026' / '09_2026', [
+        (1, 't1', '06/2026', 'HOSP A', 'REABERTA'),
+        (2, 't2', '06/2026', 'HOSP B', 'FECHADA')
+    ])
+    atual = str(tmp_path / '2026' / '10_2026')
+    arquivo = _competencias(atual, [
+        (1, 't1', '06/2026', 'HOSP A', 'FECHADA'),
+        (2, 't2', '06/2026', 'HOSP B', 'FECHADA'),
+        (3, 't3', '09/2026', 'HOSP C', 'FECHADA')
+    ])
+
+    # Respostas guardadas antes da reabertura (mesma chave da competência fechada de novo)
+    reaberta = _gravar(cache_ativo, 'Consumo', 1, ['06/2026'])
+    inalterada = _gravar(cache_ativo, 'Consumo', 2, ['06/2026'])
+    nova = _gravar(cache_ativo, 'Consumo', 3, ['09/2026'])
+
+    plano, _, modo = processar_incremental(atual, arquivo, [])
+
+    assert modo == 'processar'
+    assert sorted(plano.df['unidade_id']) == [1, 3]
+    assert plano.ignora_cache(1, '06/2026') and not plano.ignora_cache(3, '09/2026')
+
+    assert invalidar_competencias(plano.competencias_sem_cache) == 1
+    assert cache_ativo.obter(reaberta, 'Consumo') is None
+    assert cache_ativo.contem(inalterada) and cache_ativo.contem(nova)
+
+
+def test_reextracao_seletiva_nao_vem_do_cache(tmp_path, cache_ativo):
+    arquivo = _competencias(tmp_path, [
+        (1, 't1', '06/2026', 'HOSP A', 'FECHADA'),
+        (2, 't2', '06/2026', 'HOSP B', 'FECHADA')
+    ])
+    selecionada = _gravar(cache_ativo, 'Consumo', 1, ['06/2026'])
+    outra = _gravar(cache_ativo, 'Consumo', 2, ['06/2026'])
+
+    plano, _ = planejar_reextracao(arquivo, unidades=['hosp a'])
+    invalidar_competencias(plano.competencias_sem_cache)
+
+    assert not cache_ativo.contem(selecionada)
+    assert cache_ativo.contem(outra)
@@ -0,0 +1,29 @@
+from config.api_config import RETRY_PADRAO
+from modules.retry_policy import PoliticaRetry
+
+
+def test_timeout_usa_tentativas_do_wrapper():
+    politica = PoliticaRetry(RETRY_PADRAO, max_tentativas_403=4, backoff_inicial=2.0, nome_api="Teste")
+
+    assert politica.tentativas('timeout') == 4
+    assert politica.tentativas(403) == 4
+
+
+def test_timeouts_seguidos_nao_abrem_o_circuito_do_endpoint():
+    politica = PoliticaRetry(RETRY_PADRAO, max_tentativas_403=4, backoff_inicial=2.0, nome_api="Teste")
+
+    for unidade_id in range(10):
+        politica.registrar_resultado(unidade_id, 'timeout')
+
+    assert politica.permitir(99) == (True, None)
+
+
+def test_conexao_seguida_abre_o_circuito_do_endpoint():
+    politica = PoliticaRetry(RETRY_PADRAO, max_tentativas_403=4, backoff_inicial=2.0, nome_api="Teste")
+
+    for unidade_id in range(RETRY_PADRAO['circuito_endpoint']['falhas']):
+        politica.registrar_resultado(unidade_id, 'conexao')
+
+    permitido, motivo = politica.permitir(99)
+    assert not permitido
+    assert "endpoint" in motivo
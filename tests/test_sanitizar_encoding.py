@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.api_extractor import sanitizar_encoding
+
+
+@pytest.mark.parametrize("dtype", [
+    object,
+    pd.StringDtype('python'),
+    pd.StringDtype('python', na_value=np.nan)
+])
+def test_remove_surrogates_de_colunas_texto(dtype):
+    df = pd.DataFrame({
+        'unidade': pd.Series(['HOSP A', 'HOSP\udcff B', None], dtype=dtype),
+        'valor': [1, 2, 3]
+    })
+
+    df, alteradas = sanitizar_encoding(df)
+
+    assert alteradas == 1
+    assert df['unidade'].iloc[1] == 'HOSP B'
+    assert df['unidade'].iloc[0] == 'HOSP A'
+    assert pd.isna(df['unidade'].iloc[2])
+
+
+def test_colunas_validas_nao_sao_alteradas():
+    df = pd.DataFrame({'unidade': ['HOSP Ã', 'São José'], 'codigo': pd.Series([1, 'x'], dtype=object)})
+
+    df, alteradas = sanitizar_encoding(df)
+
+    assert alteradas == 0
+    assert list(df['unidade']) == ['HOSP Ã', 'São José']
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from modules.schema import concatenar, dtypes_leitura, obter_schema
+
+
+def test_concatenar_une_categorias_sem_alterar_os_originais():
+    df_a = pd.DataFrame({'unidade': pd.Categorical(['A', 'B'])})
+    df_b = pd.DataFrame({'unidade': pd.Categorical(['C'])})
+
+    df = concatenar([df_a, df_b])
+
+    assert isinstance(df['unidade'].dtype, pd.CategoricalDtype)
+    assert list(df['unidade']) == ['A', 'B', 'C']
+    assert list(df_a['unidade'].cat.categories) == ['A', 'B']
+    assert list(df_b['unidade'].cat.categories) == ['C']
+
+
+def test_dtypes_leitura_inclui_tipos_declarados():
+    schema = obter_schema('api_painelComparativoDeCustos_09_2025.csv')
+
+    dtypes = dtypes_leitura(schema, colunas=['unidadeDeProducaoId', 'competencia'])
+
+    assert dtypes == {'unidadeDeProducaoId': 'Int64', 'competencia': 'category'}